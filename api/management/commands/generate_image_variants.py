@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.models import ProgressReportImage, QuarterImage
+from api.utils.image_variants import pending_ids, process_in_worker
+
+
+class Command(BaseCommand):
+    help = "Tworzy miniatury i wersje średnie dla istniejących zdjęć raportów postępu i kwater"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Tworzy wersje ponownie także dla przetworzonych zdjęć")
+        parser.add_argument('--workers', type=int, default=4, help="Liczba równoległych wątków (domyślnie 4)")
+
+    def handle(self, *args, **options):
+        force = options['force']
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            for model in (ProgressReportImage, QuarterImage):
+                ids = pending_ids(model, force=force)
+                results = executor.map(lambda pk: process_in_worker(model, pk, force), ids)
+                processed = sum(1 for created in results if created)
+                self.stdout.write(self.style.SUCCESS(
+                    f"{model._meta.verbose_name_plural}: przetworzono {processed} z {len(ids)}"
+                ))
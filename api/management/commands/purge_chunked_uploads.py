@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.chunked_upload import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Usuwa porzucone przesyłania w częściach wraz z plikami tymczasowymi"
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Usunięto przesyłań: {count}"))
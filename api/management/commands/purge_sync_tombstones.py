@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Usuwa ślady usunięć starsze niż okres przechowywania synchronizacji przyrostowej"
+
+    def handle(self, *args, **options):
+        count = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Usunięto śladów: {count}"))
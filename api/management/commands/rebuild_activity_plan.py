@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.activity_plan import rebuild_activity_plan
+
+
+class Command(BaseCommand):
+    help = "Przebudowuje znormalizowany plan aktywności z konfiguracji projektów"
+
+    def handle(self, *args, **options):
+        count = rebuild_activity_plan()
+        self.stdout.write(self.style.SUCCESS(f"Utworzono wierszy planu aktywności: {count}"))
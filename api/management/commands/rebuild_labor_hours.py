@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.labor_hours import rebuild_labor_hours
+
+
+class Command(BaseCommand):
+    help = "Przebudowuje tabelę godzin pracy (pracownik, projekt, dzień) z raportów postępu"
+
+    def handle(self, *args, **options):
+        count = rebuild_labor_hours()
+        self.stdout.write(self.style.SUCCESS(f"Utworzono wierszy godzin pracy: {count}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Przebudowuje zestawienia wartości zapotrzebowań (projekt, miesiąc, status, typ)"
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Utworzono wierszy zestawień: {count}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.search_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Przebudowuje indeks wyszukiwania zapotrzebowań (tokeny numeru, komentarza, projektu i pozycji)"
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Zaindeksowano zapotrzebowań: {count}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.models import ActivityConfigImport
+from api.utils.config_import import requeue_stale_imports, run_import
+
+
+class Command(BaseCommand):
+    help = "Wykonuje oczekujące importy konfiguracji aktywności (także przerwane restartem serwera)"
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_imports()
+        job_ids = list(ActivityConfigImport.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True))
+        for job_id in job_ids:
+            run_import(job_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wykonano importów: {len(job_ids)} (przywrócono do kolejki: {requeued})"
+        ))
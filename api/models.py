@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models import Q, UniqueConstraint
-import datetime
+from django.db.models import Q, UniqueConstraint, F, Sum, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncMonth
+from .utils.numbering import daily_prefix, next_number
+from .utils.config_index import build_index
+import uuid
 
 class UserProfile(models.Model):
     """Rozszerzenie modelu User o dodatkowe pola"""
@@ -135,6 +138,9 @@ class Project(models.Model):
     class Meta:
         verbose_name = "Projekt"
         verbose_name_plural = "Projekty"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='project_created_id_idx'),
+        ]
 
 class Empl_tag(models.Model):
     """Model for employee NFC tags"""
@@ -192,6 +198,9 @@ class Employee(models.Model):
     class Meta:
         verbose_name = "Pracownik"
         verbose_name_plural = "Pracownicy"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='employee_created_id_idx'),
+        ]
         # Dodaj constraint, który zapewnia unikalność tylko niepustych wartości PESEL
         constraints = [
             UniqueConstraint(
@@ -220,29 +229,92 @@ class Item(models.Model):
     def __str__(self):
         return f"{self.name} ({self.index})"
 
+    # Nazwa licznika (DocumentCounter), z którego przydzielane są indeksy przedmiotów
+    INDEX_SEQUENCE = 'ITEM'
+
+    @classmethod
+    def max_numeric_index(cls):
+        """Najwyższy numeryczny indeks wśród istniejących przedmiotów (wartość startowa sekwencji)"""
+        max_number = 0
+        for index in cls.objects.values_list('index', flat=True).iterator():
+            if index and index.isdigit():
+                max_number = max(max_number, int(index))
+        return max_number
+
+    @staticmethod
+    def format_index(number):
+        """Formatuje numer jako 6-cyfrowy indeks"""
+        return f"{number:06d}"
+
     def save(self, *args, **kwargs):
-        # Generowanie indeksu, jeśli nie jest ustawiony
+        # Generowanie indeksu z sekwencji, jeśli nie jest ustawiony
         if not self.index:
-            # Pobierz ostatni indeks i zwiększ go o 1
-            last_item = Item.objects.order_by('-id').first()
-            if last_item and last_item.index:
-                # Wyciągnij numer z ostatniego indeksu
-                try:
-                    last_number = int(last_item.index)
-                    new_number = last_number + 1
-                except ValueError:
-                    new_number = 1
-            else:
-                new_number = 1
-
-            # Sformatuj jako 6-cyfrowy numer
-            self.index = f"{new_number:06d}"
+            self.index = self.format_index(
+                next_number(self.INDEX_SEQUENCE, initial=Item.max_numeric_index)
+            )
 
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Przedmiot"
         verbose_name_plural = "Przedmioty"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='item_created_id_idx'),
+        ]
+
+class DocumentCounter(models.Model):
+    """Licznik numerów dokumentów dla prefiksu (np. ZAP/2025/03/14/) - patrz api/utils/numbering.py"""
+    prefix = models.CharField(max_length=50, unique=True, verbose_name="Prefiks")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Ostatni przydzielony numer")
+
+    def __str__(self):
+        return f"{self.prefix}{self.last_value}"
+
+    class Meta:
+        verbose_name = "Licznik numeracji"
+        verbose_name_plural = "Liczniki numeracji"
+
+class TableVersion(models.Model):
+    """Wersja tabeli podbijana przy każdej zmianie jej wierszy - walidatory ETag (api/utils/conditional.py)"""
+    table = models.CharField(max_length=100, unique=True, verbose_name="Tabela")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Wersja")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
+
+    def __str__(self):
+        return f"{self.table}: {self.version}"
+
+    class Meta:
+        verbose_name = "Wersja tabeli"
+        verbose_name_plural = "Wersje tabel"
+
+class RequisitionQuerySet(models.QuerySet):
+    """QuerySet zapotrzebowań z metodami do wydajnego pobierania list"""
+
+    def with_total_price(self):
+        """Dodaje adnotację total_value - sumę price * quantity pozycji liczoną w bazie"""
+        items_total = RequisitionItem.objects.filter(
+            requisition=OuterRef('pk'),
+            price__isnull=False
+        ).order_by().values('requisition').annotate(
+            total=Sum(F('price') * F('quantity'))
+        ).values('total')
+
+        output_field = DecimalField(max_digits=14, decimal_places=2)
+        return self.annotate(
+            total_value=Coalesce(
+                Subquery(items_total, output_field=output_field),
+                Value(0),
+                output_field=output_field
+            )
+        )
+
+    def with_list_relations(self):
+        """Dołącza wszystkie relacje używane przez RequisitionSerializer"""
+        return self.select_related(
+            'project', 'created_by', 'updated_by'
+        ).prefetch_related(
+            models.Prefetch('items', queryset=RequisitionItem.objects.select_related('item'))
+        )
 
 class Requisition(models.Model):
     """Model nagłówka zapotrzebowania"""
@@ -259,6 +331,15 @@ class Requisition(models.Model):
         ('completed', 'Zrealizowano')
     ]
 
+    # Dozwolone przejścia statusów (używane przy zbiorczej zmianie statusu)
+    ALLOWED_STATUS_TRANSITIONS = {
+        'to_accept': {'accepted', 'rejected'},
+        'accepted': {'in_progress', 'rejected', 'to_accept'},
+        'rejected': {'to_accept'},
+        'in_progress': {'completed', 'accepted'},
+        'completed': set(),
+    }
+
     number = models.CharField(max_length=100, unique=True, verbose_name="Numer zapotrzebowania")
     project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, related_name='requisitions', verbose_name="Projekt")
     deadline = models.DateField(verbose_name="Termin realizacji")
@@ -271,44 +352,26 @@ class Requisition(models.Model):
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='updated_requisitions', verbose_name="Zaktualizowany przez")
     email_sent = models.BooleanField(default=False, verbose_name="E-mail wysłany")
 
+    objects = RequisitionQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.number} - {self.project.name if self.project else 'Brak projektu'}"
 
     def save(self, *args, **kwargs):
         # Generowanie numeru zapotrzebowania, jeśli nie jest ustawiony
         if not self.number:
-            today = datetime.date.today()
-            year = today.year
-            month = today.month
-            day = today.day
-
-            # Prefiks numeru zapotrzebowania dla dzisiejszego dnia
-            prefix = f"ZAP/{year}/{month:02d}/{day:02d}/"
-
-            # Znajdź zapotrzebowania z tym samym prefiksem (tego samego dnia)
-            today_requisitions = Requisition.objects.filter(
-                number__startswith=prefix
-            )
-
-            # Znajdź najwyższy numer
-            max_number = 0
-            for req in today_requisitions:
-                try:
-                    # Wyciągnij numer z końca (po ostatnim "/")
-                    num = int(req.number.split('/')[-1])
-                    if num > max_number:
-                        max_number = num
-                except (ValueError, IndexError):
-                    pass
-
-            # Ustaw nowy numer jako najwyższy + 1
-            self.number = f"{prefix}{max_number + 1}"
+            # Prefiks numeru zapotrzebowania dla dzisiejszego dnia i kolejny numer z licznika
+            prefix = daily_prefix('ZAP')
+            self.number = f"{prefix}{next_number(prefix, model=Requisition)}"
 
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Zapotrzebowanie"
         verbose_name_plural = "Zapotrzebowania"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='requisition_created_id_idx'),
+        ]
 
 class RequisitionItem(models.Model):
     """Model pozycji zapotrzebowania"""
@@ -343,12 +406,51 @@ class RequisitionItem(models.Model):
             )
         ]
 
+class RequisitionSearchToken(models.Model):
+    """Token indeksu wyszukiwania zapotrzebowań (prefiks słowa z nagłówka lub pozycji)"""
+    requisition = models.ForeignKey(Requisition, on_delete=models.CASCADE, related_name='search_tokens', verbose_name="Zapotrzebowanie")
+    token = models.CharField(max_length=20, verbose_name="Token")
+
+    def __str__(self):
+        return f"{self.token} ({self.requisition_id})"
+
+    class Meta:
+        verbose_name = "Token wyszukiwania zapotrzebowania"
+        verbose_name_plural = "Tokeny wyszukiwania zapotrzebowań"
+        # Indeks (token, requisition) obsługuje wyszukiwanie po tokenie
+        unique_together = ('token', 'requisition')
+
+class RequisitionSpendRollup(models.Model):
+    """Zestawienie wartości zapotrzebowań dla (projekt, miesiąc, status, typ) - patrz api/utils/rollups.py"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, related_name='requisition_rollups', verbose_name="Projekt")
+    month = models.DateField(verbose_name="Miesiąc")
+    status = models.CharField(max_length=20, choices=Requisition.REQUISITION_STATUS_CHOICES, verbose_name="Status")
+    requisition_type = models.CharField(max_length=20, choices=Requisition.TYPE_CHOICES, verbose_name="Typ zapotrzebowania")
+    requisition_count = models.PositiveIntegerField(default=0, verbose_name="Liczba zapotrzebowań")
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Liczba pozycji")
+    total_quantity = models.PositiveIntegerField(default=0, verbose_name="Suma ilości")
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Wartość")
+
+    def __str__(self):
+        return f"{self.project_id} {self.month:%Y-%m} {self.status} {self.requisition_type}: {self.total_value}"
+
+    class Meta:
+        verbose_name = "Zestawienie wartości zapotrzebowań"
+        verbose_name_plural = "Zestawienia wartości zapotrzebowań"
+        unique_together = ('project', 'month', 'status', 'requisition_type')
+        indexes = [
+            models.Index(fields=['month'], name='rollup_month_idx'),
+        ]
+
 class QuarterImage(models.Model):
     """Model dla zdjęć kwater pracowniczych"""
     quarter = models.ForeignKey(Quarter, on_delete=models.CASCADE, related_name='images', verbose_name="Kwatera")
     image = models.ImageField(upload_to='quarter_images/', verbose_name="Zdjęcie")
+    thumbnail = models.ImageField(upload_to='quarter_images/thumbnails/', blank=True, null=True, verbose_name="Miniatura")
+    medium = models.ImageField(upload_to='quarter_images/medium/', blank=True, null=True, verbose_name="Wersja średnia")
     name = models.CharField(max_length=255, blank=True, null=True, verbose_name="Nazwa zdjęcia")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_quarter_images', verbose_name="Utworzony przez")
 
     class Meta:
@@ -401,7 +503,7 @@ class BrigadeMember(models.Model):
         unique_together = ('brigade_leader', 'employee')
 
 # Sygnał do aktualizacji członków brygady po zmianie projektu
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=UserSettings)
@@ -431,6 +533,10 @@ class ProgressReport(models.Model):
         verbose_name = "Raport postępu"
         verbose_name_plural = "Raporty postępu"
         unique_together = ('date', 'project', 'created_by')  # Jeden raport na dzień dla projektu od danego użytkownika
+        indexes = [
+            models.Index(fields=['date', 'id'], name='progress_report_date_id_idx'),
+            models.Index(fields=['created_by', 'date'], name='progress_report_author_dt_idx'),
+        ]
 
 class ProgressReportEntry(models.Model):
     """Model reprezentujący pojedynczy wpis w raporcie postępu dla danego pracownika"""
@@ -438,6 +544,7 @@ class ProgressReportEntry(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='progress_entries', verbose_name="Pracownik")
     hours_worked = models.DecimalField(max_digits=4, decimal_places=1, default=0, verbose_name="Przepracowane godziny")
     notes = models.TextField(blank=True, null=True, verbose_name="Notatki")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
 
     def __str__(self):
         return f"{self.employee} - {self.hours_worked}h ({self.report.date})"
@@ -447,13 +554,37 @@ class ProgressReportEntry(models.Model):
         verbose_name_plural = "Wpisy w raportach postępu"
         unique_together = ('report', 'employee')  # Jeden wpis dla pracownika w raporcie
 
+class LaborHoursFact(models.Model):
+    """Godziny pracy pracownika w projekcie w danym dniu, wyliczane z raportów postępu - patrz api/utils/labor_hours.py"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='labor_hours', verbose_name="Pracownik")
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='labor_hours', verbose_name="Projekt")
+    date = models.DateField(verbose_name="Data")
+    hours = models.DecimalField(max_digits=6, decimal_places=1, default=0, verbose_name="Godziny (wszystkie raporty)")
+    draft_hours = models.DecimalField(max_digits=6, decimal_places=1, default=0, verbose_name="Godziny z wersji roboczych")
+    report_count = models.PositiveSmallIntegerField(default=0, verbose_name="Liczba raportów")
+
+    def __str__(self):
+        return f"{self.employee_id} {self.project_id} {self.date}: {self.hours}h"
+
+    class Meta:
+        verbose_name = "Godziny pracy"
+        verbose_name_plural = "Godziny pracy"
+        unique_together = ('employee', 'project', 'date')
+        indexes = [
+            models.Index(fields=['date', 'employee'], name='labor_hours_date_employee_idx'),
+            models.Index(fields=['project', 'date'], name='labor_hours_project_date_idx'),
+        ]
+
 class ProgressReportImage(models.Model):
     """Model dla zdjęć w raportach postępu prac"""
     report = models.ForeignKey(ProgressReport, on_delete=models.CASCADE, related_name='images', verbose_name="Raport")
     image = models.ImageField(upload_to='progress_report_images/', verbose_name="Zdjęcie")
+    thumbnail = models.ImageField(upload_to='progress_report_images/thumbnails/', blank=True, null=True, verbose_name="Miniatura")
+    medium = models.ImageField(upload_to='progress_report_images/medium/', blank=True, null=True, verbose_name="Wersja średnia")
     name = models.CharField(max_length=255, blank=True, null=True, verbose_name="Nazwa zdjęcia")
     description = models.TextField(blank=True, null=True, verbose_name="Opis zdjęcia")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_progress_report_images', verbose_name="Utworzony przez")
 
     class Meta:
@@ -464,6 +595,73 @@ class ProgressReportImage(models.Model):
     def __str__(self):
         return f"Zdjęcie raportu {self.report.date} ({self.id})"
 
+class SyncTombstone(models.Model):
+    """Ślad usuniętego obiektu dla synchronizacji przyrostowej (api/utils/sync.py)"""
+    model = models.CharField(max_length=50, verbose_name="Model")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID obiektu")
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='sync_tombstones', verbose_name="Właściciel")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Data usunięcia")
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} ({self.deleted_at})"
+
+    class Meta:
+        verbose_name = "Ślad usunięcia"
+        verbose_name_plural = "Ślady usunięć"
+        indexes = [
+            models.Index(fields=['owner', 'deleted_at'], name='sync_tombstone_owner_idx'),
+        ]
+
+class ClientOperation(models.Model):
+    """Wynik operacji z kolejki offline zapamiętany pod kluczem idempotencji klienta"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='client_operations', verbose_name="Użytkownik")
+    idempotency_key = models.CharField(max_length=100, verbose_name="Klucz idempotencji")
+    operation = models.CharField(max_length=50, verbose_name="Operacja")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Kod odpowiedzi")
+    response = models.JSONField(verbose_name="Odpowiedź")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+
+    def __str__(self):
+        return f"{self.user_id} {self.idempotency_key} ({self.operation})"
+
+    class Meta:
+        verbose_name = "Operacja klienta"
+        verbose_name_plural = "Operacje klienta"
+        unique_together = ('user', 'idempotency_key')
+
+class ChunkedUpload(models.Model):
+    """Przesyłanie pliku w częściach z możliwością wznowienia (api/utils/chunked_upload.py)"""
+    TARGET_CHOICES = [
+        ('progress_report_image', 'Zdjęcie raportu postępu'),
+        ('quarter_image', 'Zdjęcie kwatery'),
+        ('activities_config', 'Konfiguracja aktywności projektu'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'W trakcie przesyłania'),
+        ('completed', 'Zakończone'),
+    ]
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Identyfikator przesyłania")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads', verbose_name="Użytkownik")
+    target = models.CharField(max_length=30, choices=TARGET_CHOICES, verbose_name="Cel")
+    target_data = models.JSONField(default=dict, blank=True, verbose_name="Dane celu")
+    filename = models.CharField(max_length=255, verbose_name="Nazwa pliku")
+    size = models.PositiveBigIntegerField(verbose_name="Rozmiar")
+    offset = models.PositiveBigIntegerField(default=0, verbose_name="Przesłano bajtów")
+    checksum = models.CharField(max_length=64, blank=True, verbose_name="Suma SHA-256 pliku")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading', verbose_name="Status")
+    result = models.JSONField(null=True, blank=True, verbose_name="Wynik")
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Zapis części od")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    class Meta:
+        verbose_name = "Przesyłanie w częściach"
+        verbose_name_plural = "Przesyłania w częściach"
+
 class HRRequisition(models.Model):
     """Model dla zapotrzebowań HR"""
 
@@ -491,6 +689,9 @@ class HRRequisition(models.Model):
         ('brak', 'Brak'),
     ]
 
+    # Zapotrzebowania HR korzystają z tych samych statusów co materiałowe
+    ALLOWED_STATUS_TRANSITIONS = Requisition.ALLOWED_STATUS_TRANSITIONS
+
     number = models.CharField(max_length=100, unique=True, verbose_name="Numer zapotrzebowania")
     project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, related_name='hr_requisitions', verbose_name="Projekt")
     deadline = models.DateField(verbose_name="Termin realizacji")
@@ -520,38 +721,18 @@ class HRRequisition(models.Model):
     def save(self, *args, **kwargs):
         # Generowanie numeru zapotrzebowania HR, jeśli nie jest ustawiony
         if not self.number:
-            today = datetime.date.today()
-            year = today.year
-            month = today.month
-            day = today.day
-
-            # Prefiks numeru zapotrzebowania HR dla dzisiejszego dnia
-            prefix = f"HR/{year}/{month:02d}/{day:02d}/"
-
-            # Znajdź zapotrzebowania z tym samym prefiksem (tego samego dnia)
-            today_requisitions = HRRequisition.objects.filter(
-                number__startswith=prefix
-            )
-
-            # Znajdź najwyższy numer
-            max_number = 0
-            for req in today_requisitions:
-                try:
-                    # Wyciągnij numer z końca (po ostatnim "/")
-                    num = int(req.number.split('/')[-1])
-                    if num > max_number:
-                        max_number = num
-                except (ValueError, IndexError):
-                    pass
-
-            # Ustaw nowy numer jako najwyższy + 1
-            self.number = f"{prefix}{max_number + 1}"
+            # Prefiks numeru zapotrzebowania HR dla dzisiejszego dnia i kolejny numer z licznika
+            prefix = daily_prefix('HR')
+            self.number = f"{prefix}{next_number(prefix, model=HRRequisition)}"
 
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Zapotrzebowanie HR"
         verbose_name_plural = "Zapotrzebowania HR"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='hr_requisition_created_id_idx'),
+        ]
 
 
 class HRRequisitionPosition(models.Model):
@@ -584,6 +765,15 @@ class TransportRequest(models.Model):
         ('cancelled', 'Anulowany')
     ]
 
+    # Dozwolone przejścia statusów (używane przy zbiorczej zmianie statusu)
+    ALLOWED_STATUS_TRANSITIONS = {
+        'new': {'accepted', 'cancelled'},
+        'accepted': {'in_progress', 'cancelled', 'new'},
+        'in_progress': {'completed', 'cancelled'},
+        'completed': set(),
+        'cancelled': {'new'},
+    }
+
     # Miejsca załadunku i rozładunku
     pickup_project = models.ForeignKey(
         Project,
@@ -661,28 +851,9 @@ class TransportRequest(models.Model):
     def save(self, *args, **kwargs):
         # Generowanie numeru transportu przy pierwszym zapisie
         if not self.number:
-            today = datetime.date.today()
-
             # Format numeru: TR/YYYY/MM/DD/XXX
-            prefix = f"TR/{today.year}/{today.month:02d}/{today.day:02d}/"
-
-            # Znajdź transporty z tym samym prefiksem (z tego samego dnia)
-            today_transports = TransportRequest.objects.filter(
-                number__startswith=prefix
-            )
-
-            # Znajdź najwyższy numer z tego dnia
-            max_number = 0
-            for transport in today_transports:
-                try:
-                    current_number = int(transport.number.split('/')[-1])
-                    if current_number > max_number:
-                        max_number = current_number
-                except (ValueError, IndexError):
-                    pass
-
-            # Ustaw nowy numer jako najwyższy + 1
-            self.number = f"{prefix}{max_number + 1:03d}"
+            prefix = daily_prefix('TR')
+            self.number = f"{prefix}{next_number(prefix, model=TransportRequest):03d}"
 
         super().save(*args, **kwargs)
 
@@ -693,6 +864,9 @@ class TransportRequest(models.Model):
         verbose_name = "Zapotrzebowanie na transport"
         verbose_name_plural = "Zapotrzebowania na transport"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='transport_created_id_idx'),
+        ]
 
 
 class TransportItem(models.Model):
@@ -752,11 +926,22 @@ class ProjectActivityConfig(models.Model):
     """Model przechowujący konfigurację aktywności dla projektów"""
     project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='activity_config', verbose_name="Projekt")
     config_data = models.JSONField(verbose_name="Konfiguracja aktywności w formacie JSON")
+    index_data = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Indeks konfiguracji (zony, rzędy, stoły)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_activity_configs', verbose_name="Utworzony przez")
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='updated_activity_configs', verbose_name="Zaktualizowany przez")
 
+    def save(self, *args, **kwargs):
+        # Indeks dla formularza aktywności budowany razem z konfiguracją (api/utils/config_index.py)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'config_data' in update_fields:
+            self.index_data = build_index(self.config_data)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'index_data'}
+
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Konfiguracja aktywności dla {self.project.name}"
 
@@ -764,6 +949,60 @@ class ProjectActivityConfig(models.Model):
         verbose_name = "Konfiguracja aktywności projektu"
         verbose_name_plural = "Konfiguracje aktywności projektów"
 
+class ActivityPlanItem(models.Model):
+    """Wiersz planu aktywności projektu rozłożonego z konfiguracji JSON - patrz api/utils/activity_plan.py"""
+    config = models.ForeignKey(ProjectActivityConfig, on_delete=models.CASCADE, related_name='plan_items', verbose_name="Konfiguracja")
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='activity_plan_items', verbose_name="Projekt")
+    activity_type = models.CharField(max_length=100, verbose_name="Typ aktywności")
+    sub_activity = models.CharField(max_length=100, verbose_name="Podaktywność")
+    zona = models.CharField(max_length=100, verbose_name="Zona")
+    row = models.CharField(max_length=100, verbose_name="Rząd")
+    table = models.CharField(max_length=100, blank=True, default='', verbose_name="Numer stołu")
+    planned = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Planowana ilość")
+    position = models.PositiveIntegerField(default=0, verbose_name="Kolejność w konfiguracji")
+
+    def __str__(self):
+        return f"{self.project_id} {self.activity_type} - {self.sub_activity} {self.zona}/{self.row}: {self.planned}"
+
+    class Meta:
+        verbose_name = "Pozycja planu aktywności"
+        verbose_name_plural = "Plan aktywności"
+        unique_together = ('project', 'activity_type', 'sub_activity', 'zona', 'row', 'table')
+        indexes = [
+            models.Index(fields=['project', 'zona', 'row'], name='activity_plan_zona_row_idx'),
+        ]
+
+class ActivityConfigImport(models.Model):
+    """Zadanie konwersji układu projektu z pliku Excel do konfiguracji aktywności (api/utils/config_import.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'W kolejce'),
+        ('running', 'W trakcie'),
+        ('succeeded', 'Zakończone'),
+        ('failed', 'Błąd'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='activity_config_imports', verbose_name="Projekt")
+    file = models.FileField(upload_to='activity_config_imports/', verbose_name="Plik Excel")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name="Status")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Postęp (%)")
+    current_sheet = models.CharField(max_length=255, blank=True, verbose_name="Przetwarzany arkusz")
+    errors = models.JSONField(default=list, blank=True, verbose_name="Błędy")
+    warnings = models.JSONField(default=list, blank=True, verbose_name="Ostrzeżenia")
+    config = models.ForeignKey(ProjectActivityConfig, on_delete=models.SET_NULL, null=True, blank=True, related_name='imports', verbose_name="Konfiguracja")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='activity_config_imports', verbose_name="Utworzony przez")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Rozpoczęto")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Zakończono")
+
+    def __str__(self):
+        return f"Import konfiguracji {self.project.name} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Import konfiguracji aktywności"
+        verbose_name_plural = "Importy konfiguracji aktywności"
+        ordering = ['-created_at']
+
 class ProgressReportActivity(models.Model):
     """Model reprezentujący aktywność w raporcie postępu"""
     report = models.ForeignKey(ProgressReport, on_delete=models.CASCADE, related_name='activities', verbose_name="Raport")
@@ -782,4 +1021,180 @@ class ProgressReportActivity(models.Model):
 
     class Meta:
         verbose_name = "Aktywność raportu postępu"
-        verbose_name_plural = "Aktywności raportów postępu"
\ No newline at end of file
+        verbose_name_plural = "Aktywności raportów postępu"
+
+# Sygnały utrzymujące indeks wyszukiwania zapotrzebowań (api/utils/search_index.py)
+from .utils.search_index import schedule_reindex
+
+@receiver(post_save, sender=Requisition)
+def index_requisition_on_save(sender, instance, **kwargs):
+    """Aktualizuje tokeny wyszukiwania po zapisie zapotrzebowania"""
+    schedule_reindex([instance.pk])
+
+@receiver(post_save, sender=RequisitionItem)
+@receiver(post_delete, sender=RequisitionItem)
+def index_requisition_on_item_change(sender, instance, **kwargs):
+    """Aktualizuje tokeny wyszukiwania po zmianie pozycji zapotrzebowania"""
+    schedule_reindex([instance.requisition_id])
+
+@receiver(pre_save, sender=Item)
+@receiver(pre_save, sender=Project)
+def remember_searchable_fields(sender, instance, **kwargs):
+    """Zapamiętuje poprzednie wartości pól indeksowanych w wyszukiwarce zapotrzebowań"""
+    fields = ('name', 'index') if sender is Item else ('name',)
+    if instance.pk:
+        instance._search_fields_before = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    else:
+        instance._search_fields_before = None
+
+@receiver(post_save, sender=Item)
+def index_requisitions_on_item_rename(sender, instance, created, **kwargs):
+    """Przebudowuje indeks zapotrzebowań zawierających przedmiot, jeśli zmieniła się jego nazwa lub indeks"""
+    if created or getattr(instance, '_search_fields_before', None) == (instance.name, instance.index):
+        return
+    schedule_reindex(instance.requisition_items.values_list('requisition_id', flat=True))
+
+@receiver(post_save, sender=Project)
+def index_requisitions_on_project_rename(sender, instance, created, **kwargs):
+    """Przebudowuje indeks zapotrzebowań projektu, jeśli zmieniła się jego nazwa"""
+    if created or getattr(instance, '_search_fields_before', None) == (instance.name,):
+        return
+    schedule_reindex(instance.requisitions.values_list('id', flat=True))
+
+# Sygnały utrzymujące zestawienia wartości zapotrzebowań (api/utils/rollups.py)
+from .utils import rollups
+
+@receiver(pre_save, sender=Requisition)
+def remember_rollup_bucket(sender, instance, **kwargs):
+    """Zapamiętuje poprzedni koszyk zestawienia (projekt, miesiąc) zapotrzebowania"""
+    instance._rollup_bucket_before = None
+    if instance.pk:
+        previous = Requisition.objects.filter(pk=instance.pk).values_list('project_id', 'created_at').first()
+        if previous:
+            instance._rollup_bucket_before = (previous[0], rollups.month_start(previous[1]))
+
+@receiver(post_save, sender=Requisition)
+def refresh_rollups_on_save(sender, instance, **kwargs):
+    """Przelicza zestawienia dla starego i nowego koszyka zapotrzebowania"""
+    previous = getattr(instance, '_rollup_bucket_before', None)
+    rollups.schedule_refresh(buckets=[previous] if previous else [], requisition_ids=[instance.pk])
+
+@receiver(post_delete, sender=Requisition)
+def refresh_rollups_on_delete(sender, instance, **kwargs):
+    """Przelicza zestawienia po usunięciu zapotrzebowania"""
+    rollups.schedule_refresh(buckets=[(instance.project_id, rollups.month_start(instance.created_at))])
+
+@receiver(post_save, sender=RequisitionItem)
+@receiver(post_delete, sender=RequisitionItem)
+def refresh_rollups_on_item_change(sender, instance, **kwargs):
+    """Przelicza zestawienia po zmianie pozycji zapotrzebowania"""
+    rollups.schedule_refresh(requisition_ids=[instance.requisition_id])
+
+@receiver(pre_delete, sender=Project)
+def refresh_rollups_on_project_delete(sender, instance, **kwargs):
+    """
+    Zapotrzebowania usuwanego projektu tracą projekt (SET_NULL) bez sygnałów zapisu -
+    ich miesiące przeliczane są w koszyku bez projektu (wiersze projektu usuwa CASCADE)
+    """
+    months = instance.requisitions.order_by().annotate(month=TruncMonth('created_at')).values_list('month', flat=True).distinct()
+    rollups.schedule_refresh(buckets=[(None, rollups.month_start(month)) for month in months])
+
+# Sygnały utrzymujące tabelę godzin pracy (api/utils/labor_hours.py)
+from .utils import labor_hours
+
+@receiver(pre_save, sender=ProgressReport)
+def remember_labor_hours_bucket(sender, instance, **kwargs):
+    """Zapamiętuje poprzedni koszyk godzin (projekt, dzień) raportu"""
+    instance._labor_bucket_before = None
+    if instance.pk:
+        instance._labor_bucket_before = ProgressReport.objects.filter(pk=instance.pk).values_list('project_id', 'date').first()
+
+@receiver(post_save, sender=ProgressReport)
+def refresh_labor_hours_on_report_save(sender, instance, **kwargs):
+    """Przelicza godziny dla starego i nowego koszyka raportu (zmiana daty, projektu lub statusu draft)"""
+    previous = getattr(instance, '_labor_bucket_before', None)
+    labor_hours.schedule_refresh(buckets=[previous] if previous else [], report_ids=[instance.pk])
+
+@receiver(post_delete, sender=ProgressReport)
+def refresh_labor_hours_on_report_delete(sender, instance, **kwargs):
+    """Przelicza godziny po usunięciu raportu"""
+    labor_hours.schedule_refresh(buckets=[(instance.project_id, instance.date)])
+
+@receiver(post_save, sender=ProgressReportEntry)
+@receiver(post_delete, sender=ProgressReportEntry)
+def refresh_labor_hours_on_entry_change(sender, instance, **kwargs):
+    """Przelicza godziny po zmianie wpisu raportu"""
+    labor_hours.schedule_refresh(report_ids=[instance.report_id])
+
+# Sygnały wersji tabel powiązanych dla walidatorów ETag (api/utils/conditional.py)
+from .utils import conditional
+
+def bump_table_version(sender, instance, update_fields=None, **kwargs):
+    """Zmiana wiersza (np. nazwy projektu) unieważnia ETagi widoków pokazujących dane tabeli"""
+    if sender is User and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return  # Logowanie nie zmienia danych zwracanych przez API
+    conditional.bump_version(sender)
+
+for versioned_model in (User, Client, ProjectTag, Empl_tag, Project, Quarter, Employee, Item):
+    post_save.connect(bump_table_version, sender=versioned_model, dispatch_uid=f'table_version_save_{versioned_model.__name__}')
+    post_delete.connect(bump_table_version, sender=versioned_model, dispatch_uid=f'table_version_delete_{versioned_model.__name__}')
+
+# Sygnały zapisujące ślady usunięć dla synchronizacji przyrostowej (api/utils/sync.py)
+from .utils import sync
+
+@receiver(post_delete, sender=BrigadeMember)
+def record_brigade_member_tombstone(sender, instance, **kwargs):
+    sync.record_tombstone(instance, instance.brigade_leader_id)
+
+@receiver(post_delete, sender=ProgressReport)
+def record_report_tombstone(sender, instance, **kwargs):
+    sync.record_tombstone(instance, instance.created_by_id)
+
+@receiver(pre_delete, sender=ProgressReport)
+def record_report_children_tombstones(sender, instance, **kwargs):
+    """Ślady wpisów, zdjęć i aktywności usuwanych kaskadowo z raportem - jedno zapytanie na model"""
+    for model in (ProgressReportEntry, ProgressReportImage, ProgressReportActivity):
+        sync.record_report_children_tombstones(model.objects.filter(report=instance))
+
+@receiver(pre_delete, sender=Employee)
+def record_employee_entries_tombstones(sender, instance, **kwargs):
+    """Ślady wpisów usuwanych kaskadowo z pracownikiem"""
+    sync.record_report_children_tombstones(ProgressReportEntry.objects.filter(employee=instance))
+
+# Sygnał utrzymujący znormalizowany plan aktywności (api/utils/activity_plan.py)
+from .utils import activity_plan
+
+@receiver(post_save, sender=ProjectActivityConfig)
+def refresh_activity_plan(sender, instance, update_fields=None, **kwargs):
+    """Przebudowuje wiersze planu w transakcji zapisu konfiguracji"""
+    if update_fields is not None and 'config_data' not in update_fields:
+        return
+    activity_plan.refresh_plan(instance)
+
+# Sygnały generujące pomniejszone wersje zdjęć (api/utils/image_variants.py)
+from .utils import image_variants
+
+@receiver(pre_save, sender=ProgressReportImage)
+@receiver(pre_save, sender=QuarterImage)
+def remember_image_name(sender, instance, **kwargs):
+    """Zapamiętuje poprzedni plik zdjęcia, aby wykryć jego podmianę"""
+    instance._image_name_before = None
+    if instance.pk:
+        instance._image_name_before = sender.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+@receiver(post_save, sender=ProgressReportImage)
+@receiver(post_save, sender=QuarterImage)
+def schedule_image_variants(sender, instance, created, update_fields=None, **kwargs):
+    """Zleca utworzenie wersji dla nowego lub podmienionego zdjęcia"""
+    if update_fields is not None and 'image' not in update_fields:
+        # Zapis samych wersji (lub innych pól) nie wymaga ponownego przetwarzania
+        return
+    replaced = not created and getattr(instance, '_image_name_before', None) != instance.image.name
+    if created or replaced or not instance.thumbnail or not instance.medium:
+        image_variants.schedule_variants(instance, force=replaced)
+
+@receiver(post_delete, sender=ProgressReportImage)
+@receiver(post_delete, sender=QuarterImage)
+def delete_image_variants(sender, instance, **kwargs):
+    """Usuwa pliki wersji po usunięciu zdjęcia"""
+    image_variants.delete_variants(instance)
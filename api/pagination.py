@@ -0,0 +1,37 @@
+"""
+Paginacja kursorowa (keyset) dla widoków API
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginacja kursorowa po (created_at, id).
+
+    Kolejna strona pobierana jest warunkiem WHERE na ostatnim widzianym kluczu
+    (obsługiwanym przez indeks), a nie przez OFFSET, więc koszt pobrania strony
+    nie rośnie wraz z rozmiarem tabeli. Kursor jest nieprzezroczysty dla klienta.
+
+    Stronicowanie włączają parametry ?cursor= lub ?page_size=. Bez nich endpoint
+    zwraca pełną listę, tak jak oczekują tego istniejące widoki frontendu.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class DateKeysetPagination(KeysetPagination):
+    """Paginacja kursorowa po (date, id) - dla raportów postępu"""
+    ordering = ('-date', '-id')
+
+
+class IdKeysetPagination(KeysetPagination):
+    """Paginacja kursorowa po id - dla modeli bez pola created_at"""
+    ordering = ('-id',)
@@ -1,6 +1,19 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Project, Client, ProjectTag, Empl_tag, Employee, Requisition, RequisitionItem, Item, Quarter, QuarterImage, UserSettings, BrigadeMember, ProgressReportEntry, ProgressReportImage, ProgressReport, HRRequisition, HRRequisitionPosition, TransportRequest, TransportItem, ProjectActivityConfig, ProgressReportActivity
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from decimal import Decimal
+import os
+from .models import UserProfile, Project, Client, ProjectTag, Empl_tag, Employee, Requisition, RequisitionItem, Item, Quarter, QuarterImage, UserSettings, BrigadeMember, ProgressReportEntry, ProgressReportImage, ProgressReport, HRRequisition, HRRequisitionPosition, TransportRequest, TransportItem, ProjectActivityConfig, ProgressReportActivity, ActivityConfigImport
+from .utils import sync
+
+def variant_url(request, field_file):
+    """Pełny URL pliku wersji zdjęcia lub None, jeśli wersja jeszcze nie istnieje"""
+    if not field_file:
+        return None
+    if request:
+        return request.build_absolute_uri(field_file.url)
+    return field_file.url
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer dla modelu User"""
@@ -226,6 +239,16 @@ class RequisitionItemSerializer(serializers.ModelSerializer):
     def get_item_index(self, obj):
         return obj.item.index if obj.item else None
 
+class RequisitionLineSerializer(serializers.Serializer):
+    """
+    Pozycja zapotrzebowania przesyłana w zagnieżdżonym polu items.
+    Przedmioty i ceny domyślne są weryfikowane zbiorczo w RequisitionSerializer.
+    """
+    id = serializers.IntegerField(required=False)
+    item = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+
 class RequisitionSerializer(serializers.ModelSerializer):
     """Serializer dla modelu Requisition"""
     created_by_name = serializers.SerializerMethodField()
@@ -263,6 +286,111 @@ class RequisitionSerializer(serializers.ModelSerializer):
 
         return value
 
+    def to_internal_value(self, data):
+        """Pole items jest tylko do odczytu w odpowiedzi - pozycje z żądania walidujemy osobno"""
+        validated_data = super().to_internal_value(data)
+        if 'items' in data:
+            validated_data['items'] = self.validate_lines(data.get('items') or [])
+        return validated_data
+
+    def validate_lines(self, lines_data):
+        """
+        Zbiorcza walidacja pozycji: jedno zapytanie o przedmioty i ich ceny domyślne
+        """
+        lines = RequisitionLineSerializer(data=lines_data, many=True)
+        if not lines.is_valid():
+            raise serializers.ValidationError({'items': lines.errors})
+        lines = lines.validated_data
+
+        item_prices = dict(
+            Item.objects.filter(id__in={line['item'] for line in lines}).values_list('id', 'price')
+        )
+        existing_ids = set(self.instance.items.values_list('id', flat=True)) if self.instance else set()
+
+        errors = []
+        for line in lines:
+            line_errors = {}
+            if line['item'] not in item_prices:
+                line_errors['item'] = [f"Przedmiot o ID {line['item']} nie istnieje"]
+            elif line.get('price') is None:
+                # Jeśli cena nie jest podana, użyj ceny przedmiotu
+                line['price'] = item_prices[line['item']]
+
+            if line['item'] in item_prices and (line.get('price') is None or line['price'] <= 0):
+                line_errors['price'] = ['Cena przedmiotu musi być dodatnia']
+            if 'id' in line and line['id'] not in existing_ids:
+                line_errors['id'] = [f"Pozycja o ID {line['id']} nie należy do tego zapotrzebowania"]
+            errors.append(line_errors)
+
+        if any(errors):
+            raise serializers.ValidationError({'items': errors})
+        return lines
+
+    def create(self, validated_data):
+        """Tworzy zapotrzebowanie wraz z pozycjami w jednej transakcji (bulk_create)"""
+        lines = validated_data.pop('items', [])
+        with transaction.atomic():
+            requisition = super().create(validated_data)
+            RequisitionItem.objects.bulk_create([
+                RequisitionItem(
+                    requisition=requisition,
+                    item_id=line['item'],
+                    quantity=line['quantity'],
+                    price=line['price']
+                )
+                for line in lines
+            ])
+        return self.reload(requisition)
+
+    def reload(self, requisition):
+        """Zapisane zapotrzebowanie z relacjami odpowiedzi pobranymi stałą liczbą zapytań"""
+        return Requisition.objects.with_list_relations().get(pk=requisition.pk)
+
+    def update(self, instance, validated_data):
+        """
+        Aktualizuje zapotrzebowanie, a przesłane pozycje stosuje jako różnicę:
+        nowe są dodawane, zmienione aktualizowane, a pominięte usuwane - w jednej transakcji
+        """
+        lines = validated_data.pop('items', None)
+        with transaction.atomic():
+            requisition = super().update(instance, validated_data)
+            if lines is not None:
+                self.apply_lines_diff(requisition, lines)
+        return self.reload(requisition)
+
+    def apply_lines_diff(self, requisition, lines):
+        """Zapisuje różnicę pozycji stałą liczbą zapytań"""
+        existing = {line.id: line for line in requisition.items.all()}
+        kept_ids = {line['id'] for line in lines if 'id' in line}
+
+        to_create, to_update = [], []
+        for line in lines:
+            if 'id' not in line:
+                to_create.append(RequisitionItem(
+                    requisition=requisition,
+                    item_id=line['item'],
+                    quantity=line['quantity'],
+                    price=line['price']
+                ))
+                continue
+
+            current = existing[line['id']]
+            if (current.item_id, current.quantity, current.price) != (line['item'], line['quantity'], line['price']):
+                current.item_id = line['item']
+                current.quantity = line['quantity']
+                current.price = line['price']
+                # bulk_update nie ustawia auto_now
+                current.updated_at = timezone.now()
+                to_update.append(current)
+
+        removed_ids = set(existing) - kept_ids
+        if removed_ids:
+            RequisitionItem.objects.filter(id__in=removed_ids).delete()
+        if to_update:
+            RequisitionItem.objects.bulk_update(to_update, ['item', 'quantity', 'price', 'updated_at'])
+        if to_create:
+            RequisitionItem.objects.bulk_create(to_create)
+
     def get_current_user_id(self, obj):
         """Zwraca ID aktualnie zalogowanego użytkownika"""
         request = self.context.get('request')
@@ -281,8 +409,13 @@ class RequisitionSerializer(serializers.ModelSerializer):
 
     def get_total_price(self, obj):
         """
-        Oblicza całkowitą wartość zapotrzebowania
+        Oblicza całkowitą wartość zapotrzebowania.
+        Korzysta z adnotacji total_value (RequisitionQuerySet.with_total_price), jeśli jest dostępna
         """
+        total = getattr(obj, 'total_value', None)
+        if total is not None:
+            return float(total)
+
         total = sum(
             item.price * item.quantity
             for item in obj.items.all()
@@ -329,12 +462,14 @@ class QuarterSerializer(serializers.ModelSerializer):
 class QuarterImageSerializer(serializers.ModelSerializer):
     """Serializer dla zdjęć kwater"""
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    medium_url = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
 
     class Meta:
         model = QuarterImage
-        fields = ('id', 'quarter', 'image', 'image_url', 'name', 'created_at', 'created_by', 'created_by_name')
-        read_only_fields = ('id', 'created_at', 'created_by')
+        fields = ('id', 'quarter', 'image', 'image_url', 'thumbnail_url', 'medium_url', 'name', 'created_at', 'updated_at', 'created_by', 'created_by_name')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'created_by')
 
     def get_image_url(self, obj):
         """Zwraca pełny URL do zdjęcia"""
@@ -345,6 +480,14 @@ class QuarterImageSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_thumbnail_url(self, obj):
+        """Zwraca URL miniatury (None, dopóki wersja nie zostanie utworzona)"""
+        return variant_url(self.context.get('request'), obj.thumbnail)
+
+    def get_medium_url(self, obj):
+        """Zwraca URL wersji średniej (None, dopóki wersja nie zostanie utworzona)"""
+        return variant_url(self.context.get('request'), obj.medium)
+
     def get_created_by_name(self, obj):
         """Zwraca nazwę użytkownika, który dodał zdjęcie"""
         if obj.created_by:
@@ -400,12 +543,14 @@ class BrigadeMemberSerializer(serializers.ModelSerializer):
 class ProgressReportImageSerializer(serializers.ModelSerializer):
     """Serializer dla zdjęć raportów postępu"""
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    medium_url = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
 
     class Meta:
         model = ProgressReportImage
-        fields = ('id', 'report', 'image', 'image_url', 'name', 'description', 'created_at', 'created_by', 'created_by_name')
-        read_only_fields = ('id', 'created_at', 'created_by')
+        fields = ('id', 'report', 'image', 'image_url', 'thumbnail_url', 'medium_url', 'name', 'description', 'created_at', 'updated_at', 'created_by', 'created_by_name')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'created_by')
 
     def get_image_url(self, obj):
         """Zwraca pełny URL do zdjęcia"""
@@ -416,6 +561,14 @@ class ProgressReportImageSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_thumbnail_url(self, obj):
+        """Zwraca URL miniatury (None, dopóki wersja nie zostanie utworzona)"""
+        return variant_url(self.context.get('request'), obj.thumbnail)
+
+    def get_medium_url(self, obj):
+        """Zwraca URL wersji średniej (None, dopóki wersja nie zostanie utworzona)"""
+        return variant_url(self.context.get('request'), obj.medium)
+
     def get_created_by_name(self, obj):
         """Zwraca nazwę użytkownika, który dodał zdjęcie"""
         if obj.created_by:
@@ -428,8 +581,8 @@ class ProgressReportEntrySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProgressReportEntry
-        fields = ('id', 'report', 'employee', 'employee_name', 'hours_worked', 'notes')
-        read_only_fields = ('id',)
+        fields = ('id', 'report', 'employee', 'employee_name', 'hours_worked', 'notes', 'updated_at')
+        read_only_fields = ('id', 'updated_at')
 
     def get_employee_name(self, obj):
         return f"{obj.employee.first_name} {obj.employee.last_name}" if obj.employee else None
@@ -455,6 +608,118 @@ class ProgressReportSerializer(serializers.ModelSerializer):
             return f"{obj.created_by.first_name} {obj.created_by.last_name}".strip() or obj.created_by.username
         return None
 
+class ProgressReportSummarySerializer(ProgressReportSerializer):
+    """Raport postępu bez listy zdjęć (tryb summary listy raportów) - tylko ich liczba"""
+    image_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ProgressReportSerializer.Meta):
+        fields = tuple(field for field in ProgressReportSerializer.Meta.fields if field != 'images') + ('image_count',)
+
+class ProgressReportSyncSerializer(ProgressReportSerializer):
+    """Raport postępu bez zagnieżdżonych list - wpisy i zdjęcia synchronizowane są osobno"""
+
+    class Meta(ProgressReportSerializer.Meta):
+        fields = tuple(field for field in ProgressReportSerializer.Meta.fields if field not in ('entries', 'images'))
+
+class ProgressReportEntryLineSerializer(serializers.Serializer):
+    """Wpis pracownika przesyłany razem z raportem do create_progress_report"""
+    employee = serializers.IntegerField()
+    hours_worked = serializers.DecimalField(max_digits=4, decimal_places=1, min_value=Decimal('0'), max_value=Decimal('24'))
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True, default='')
+
+class ProgressReportUpsertSerializer(serializers.Serializer):
+    """
+    Tworzy lub aktualizuje raport (data, projekt, autor) wraz z wpisami w jednej transakcji.
+    Wpisy są porównywane z istniejącymi po pracowniku: nowe są dodawane, zmienione
+    aktualizowane, a pominięte w żądaniu usuwane - stałą liczbą zapytań.
+    """
+    date = serializers.DateField()
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all())
+    is_draft = serializers.BooleanField(default=False)
+    # Brak klucza entries pozostawia wpisy raportu bez zmian
+    entries = ProgressReportEntryLineSerializer(many=True, required=False)
+
+    def validate_entries(self, entries):
+        employee_ids = [entry['employee'] for entry in entries]
+        duplicates = sorted({employee_id for employee_id in employee_ids if employee_ids.count(employee_id) > 1})
+        if duplicates:
+            raise serializers.ValidationError(f"Pracownicy powtarzają się w raporcie: {duplicates}")
+        return entries
+
+    def locked_report(self, validated_data, user):
+        # Odczyt blokujący widzi raporty zatwierdzone przez równoległe transakcje
+        return ProgressReport.objects.select_for_update().filter(
+            date=validated_data['date'], project=validated_data['project'], created_by=user
+        ).first()
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        entries = validated_data.get('entries')
+
+        with transaction.atomic():
+            report = self.locked_report(validated_data, user)
+            self.created = report is None
+            if report is None:
+                try:
+                    with transaction.atomic():
+                        report = ProgressReport.objects.create(
+                            date=validated_data['date'], project=validated_data['project'],
+                            created_by=user, is_draft=validated_data['is_draft']
+                        )
+                except IntegrityError:
+                    # Równoległe pierwsze wysłanie tego samego raportu - aktualizujemy utworzony raport
+                    report = self.locked_report(validated_data, user)
+                    if report is None:
+                        raise
+                    self.created = False
+            if not self.created:
+                report.is_draft = validated_data['is_draft']
+                report.save(update_fields=['is_draft', 'updated_at'])
+
+            if entries is not None:
+                existing = {entry.employee_id: entry for entry in report.entries.select_for_update()}
+
+                # Dozwoleni są członkowie brygady użytkownika oraz pracownicy już obecni w raporcie
+                submitted_ids = {entry['employee'] for entry in entries}
+                allowed_ids = set(BrigadeMember.objects.filter(
+                    brigade_leader=user, employee_id__in=submitted_ids
+                ).values_list('employee_id', flat=True)) | set(existing)
+                outside_brigade = sorted(submitted_ids - allowed_ids)
+                if outside_brigade:
+                    raise serializers.ValidationError({
+                        'entries': [f"Pracownicy spoza Twojej brygady: {outside_brigade}"]
+                    })
+
+                self.apply_entries_diff(report, existing, entries)
+        return report
+
+    def apply_entries_diff(self, report, existing, entries):
+        """Zapisuje różnicę wpisów stałą liczbą zapytań"""
+        to_create, to_update = [], []
+        now = timezone.now()
+        for entry in entries:
+            notes = entry.get('notes') or ''
+            current = existing.get(entry['employee'])
+            if current is None:
+                to_create.append(ProgressReportEntry(
+                    report=report, employee_id=entry['employee'],
+                    hours_worked=entry['hours_worked'], notes=notes
+                ))
+            elif (current.hours_worked, current.notes or '') != (entry['hours_worked'], notes):
+                current.hours_worked = entry['hours_worked']
+                current.notes = notes
+                # bulk_update nie ustawia auto_now
+                current.updated_at = now
+                to_update.append(current)
+
+        submitted_ids = {entry['employee'] for entry in entries}
+        removed_ids = [current.id for employee_id, current in existing.items() if employee_id not in submitted_ids]
+        sync.delete_report_children(report, ProgressReportEntry, removed_ids)
+        if to_update:
+            ProgressReportEntry.objects.bulk_update(to_update, ['hours_worked', 'notes', 'updated_at'])
+        if to_create:
+            ProgressReportEntry.objects.bulk_create(to_create)
+
 class HRRequisitionPositionSerializer(serializers.ModelSerializer):
     """Serializer dla modelu HRRequisitionPosition"""
     position_display = serializers.CharField(source='get_position_display', read_only=True)
@@ -589,10 +854,33 @@ class ProjectActivityConfigSerializer(serializers.ModelSerializer):
     def get_project_name(self, obj):
         return obj.project.name if obj.project else None
 
+class ActivityConfigImportSerializer(serializers.ModelSerializer):
+    """Serializer dla zadań importu konfiguracji aktywności z pliku Excel"""
+    project_name = serializers.SerializerMethodField()
+    filename = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ActivityConfigImport
+        fields = ('id', 'project', 'project_name', 'filename', 'status', 'progress', 'current_sheet',
+                  'errors', 'warnings', 'config', 'created_by', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
+
+    def get_project_name(self, obj):
+        return obj.project.name if obj.project else None
+
+    def get_filename(self, obj):
+        return os.path.basename(obj.file.name) if obj.file else None
+
 class ProgressReportActivitySerializer(serializers.ModelSerializer):
     """Serializer dla modelu ProgressReportActivity"""
 
     class Meta:
         model = ProgressReportActivity
         fields = ('id', 'report', 'activity_type', 'sub_activity', 'zona', 'row', 'quantity', 'unit', 'notes', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('id', 'created_at', 'updated_at')
+
+class ProgressReportActivityLineSerializer(ProgressReportActivitySerializer):
+    """Aktywność przesyłana do add_activities_to_report - raport wskazuje endpoint, bez zapytania na wiersz"""
+
+    class Meta(ProgressReportActivitySerializer.Meta):
+        fields = ('activity_type', 'sub_activity', 'zona', 'row', 'quantity', 'unit', 'notes')
@@ -1,3 +1,1319 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from .models import (
+    Project, Item, Requisition, RequisitionItem, DocumentCounter, RequisitionSpendRollup,
+    Employee, BrigadeMember, ProgressReport, ProgressReportEntry, ProgressReportActivity, LaborHoursFact,
+    ProgressReportImage, ProjectActivityConfig, ActivityPlanItem, SyncTombstone, ChunkedUpload, ClientOperation, TableVersion,
+    ActivityConfigImport
+)
+from .utils.numbering import daily_prefix, next_number, reserve_numbers
+from .utils.activity_progress import compute_progress, flatten_plan, project_progress
+from .utils.activity_plan import planned_quantities
+from .utils import chunked_upload, config_import
+from .utils.activity_converter import (
+    NumpyEncoder, process_sheet_data, process_sheet_data_rowwise, stream_sheet_data, excel_to_activities_json
+)
+from PIL import Image
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+
+class RequisitionListQueryBudgetTest(TestCase):
+    """Lista zapotrzebowań musi wykonywać stałą liczbę zapytań niezależnie od liczby wierszy"""
+
+    # Walidator ETag + zapytanie główne (z sumą wartości liczoną w bazie) + prefetch pozycji z przedmiotami
+    QUERY_BUDGET = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projekt testowy')
+        self.items = [
+            Item.objects.create(name=f'Przedmiot {i}', area='warehouse', price=10 + i)
+            for i in range(3)
+        ]
+
+    def create_requisitions(self, count):
+        for _ in range(count):
+            requisition = Requisition.objects.create(
+                project=self.project,
+                deadline=datetime.date.today(),
+                created_by=self.user,
+                updated_by=self.user
+            )
+            for quantity, item in enumerate(self.items, 1):
+                RequisitionItem.objects.create(
+                    requisition=requisition, item=item, quantity=quantity, price=item.price
+                )
+
+    def test_list_query_count_is_constant(self):
+        url = reverse('api:requisition-list')
+
+        self.create_requisitions(2)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.create_requisitions(20)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_total_price_is_computed_in_database(self):
+        self.create_requisitions(1)
+        response = self.client.get(reverse('api:requisition-list'))
+
+        expected = float(sum(item.price * quantity for quantity, item in enumerate(self.items, 1)))
+        self.assertEqual(response.data[0]['total_price'], expected)
+
+
+class RequisitionSearchIndexTest(TestCase):
+    """Wyszukiwanie zapotrzebowań korzysta z indeksu tokenów utrzymywanego przy zapisie"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.create(name='Farma Słoneczna')
+            self.panel = Item.objects.create(name='Panel fotowoltaiczny', area='warehouse', price=100)
+            cable = Item.objects.create(name='Kabel solarny', area='warehouse', price=5)
+
+            self.with_panel = Requisition.objects.create(
+                project=project, deadline=datetime.date.today(), comment='Pilne', created_by=self.user
+            )
+            RequisitionItem.objects.create(requisition=self.with_panel, item=self.panel, quantity=2, price=100)
+
+            self.with_cable = Requisition.objects.create(
+                project=project, deadline=datetime.date.today(), created_by=self.user
+            )
+            RequisitionItem.objects.create(requisition=self.with_cable, item=cable, quantity=10, price=5)
+
+    def search(self, term):
+        response = self.client.get(reverse('api:requisition-list'), {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data}
+
+    def test_search_by_item_name_prefix(self):
+        self.assertEqual(self.search('fotowol'), {self.with_panel.id})
+
+    def test_search_requires_all_words(self):
+        self.assertEqual(self.search('farma kabel'), {self.with_cable.id})
+        self.assertEqual(self.search('farma'), {self.with_panel.id, self.with_cable.id})
+
+    def test_item_rename_updates_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.panel.name = 'Moduł PV'
+            self.panel.save()
+
+        self.assertEqual(self.search('fotowol'), set())
+        self.assertEqual(self.search('moduł'), {self.with_panel.id})
+
+    def test_reindex_runs_once_per_transaction(self):
+        with mock.patch('api.utils.search_index.reindex_requisition') as reindex:
+            with self.captureOnCommitCallbacks(execute=True):
+                for quantity in range(1, 6):
+                    RequisitionItem.objects.create(requisition=self.with_cable, item=self.panel, quantity=quantity, price=1)
+        reindex.assert_called_once_with(self.with_cable.id)
+
+
+class DocumentNumberingTest(TestCase):
+    """Numeracja dokumentów oparta o licznik per prefiks"""
+
+    def test_numbers_are_sequential(self):
+        prefix = daily_prefix('ZAP')
+        first = Requisition.objects.create(deadline=datetime.date.today())
+        second = Requisition.objects.create(deadline=datetime.date.today())
+
+        self.assertEqual(first.number, f"{prefix}1")
+        self.assertEqual(second.number, f"{prefix}2")
+
+    def test_counter_starts_after_existing_documents(self):
+        prefix = daily_prefix('ZAP')
+        Requisition.objects.create(number=f"{prefix}41", deadline=datetime.date.today())
+
+        requisition = Requisition.objects.create(deadline=datetime.date.today())
+        self.assertEqual(requisition.number, f"{prefix}42")
+
+    def test_reserve_block(self):
+        block = reserve_numbers('TEST/', 100)
+        self.assertEqual(list(block), list(range(1, 101)))
+        self.assertEqual(next_number('TEST/'), 101)
+
+
+class DocumentNumberingConcurrencyTest(TransactionTestCase):
+    """Równoległe przydziały numerów nie mogą się powtarzać"""
+
+    THREADS = 8
+    ALLOCATIONS_PER_THREAD = 25
+
+    def allocate_concurrently(self, prefix):
+        def allocate(_):
+            try:
+                return [next_number(prefix) for _ in range(self.ALLOCATIONS_PER_THREAD)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            results = [number for chunk in executor.map(allocate, range(self.THREADS)) for number in chunk]
+
+        total = self.THREADS * self.ALLOCATIONS_PER_THREAD
+        self.assertEqual(sorted(results), list(range(1, total + 1)))
+        self.assertEqual(DocumentCounter.objects.get(prefix=prefix).last_value, total)
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_concurrent_allocation_is_unique(self):
+        DocumentCounter.objects.create(prefix='STRESS/')
+        self.allocate_concurrently('STRESS/')
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_concurrent_allocation_creates_missing_counter(self):
+        # Pierwsze użycie prefiksu (np. nowy dzień) - wiersz licznika nie istnieje
+        self.allocate_concurrently('NEW/')
+
+
+class ItemCatalogImportTest(TestCase):
+    """Import katalogu przedmiotów z pliku CSV"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:item-import-catalog')
+
+    def upload(self, content):
+        catalog_file = SimpleUploadedFile('katalog.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post(self.url, {'catalog_file': catalog_file}, format='multipart')
+
+    def test_import_allocates_indexes_from_sequence(self):
+        Item.objects.create(name='Istniejący', area='IT', price=1)
+
+        response = self.upload("Nazwa;Obszar;Cena;Indeks\nPanel;Magazyn;120,50;\nKabel;warehouse;3;000100\nFalownik;IT;;\n")
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 3)
+        # Sekwencja przesunięta za jawnie podany indeks przed przydziałem brakujących
+        self.assertEqual(Item.objects.get(name='Kabel').index, '000100')
+        self.assertEqual(Item.objects.get(name='Panel').index, '000101')
+        self.assertEqual(Item.objects.get(name='Falownik').index, '000102')
+        self.assertEqual(Item.objects.create(name='Nowy', area='IT', price=1).index, '000103')
+
+    def test_import_is_rejected_on_duplicates(self):
+        Item.objects.create(name='Panel', area='IT', price=1)
+
+        response = self.upload("Nazwa;Obszar\nPanel;IT\nKabel;IT\nKabel;IT\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 4])
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_duplicates_differing_in_case_are_rejected(self):
+        # MySQL porównuje nazwy bez wielkości liter - taki plik kończyłby się IntegrityError
+        Item.objects.create(name='Kabel', area='IT', price=1)
+
+        response = self.upload("Nazwa;Obszar\nkabel;IT\nPanel;IT\npanel ;IT\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 4])
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_invalid_values_are_rejected(self):
+        response = self.upload(
+            f"Nazwa;Obszar;Cena;Indeks\n{'x' * 201};IT;;\nPanel;IT;NaN;\nKabel;IT;Infinity;\nFalownik;IT;1;{'9' * 101}\n"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4, 5])
+
+    def test_numeric_xlsx_index_and_non_decimal_digits(self):
+        from .utils.catalog_import import parse_catalog
+
+        entries = parse_catalog([('Nazwa', 'Obszar', 'Indeks'), ('Panel', 'IT', 123.0), ('Kabel', 'IT', '²')])
+        self.assertEqual([entry['index'] for entry in entries], ['123', '²'])
+
+        # '²' nie jest liczbą dziesiętną - nie przesuwa sekwencji indeksów
+        response = self.upload("Nazwa;Obszar;Indeks\nKabel;IT;²\nPanel;IT;\n")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Item.objects.get(name='Panel').index, Item.format_index(1))
+
+    def test_integrity_error_is_reported_per_row(self):
+        from .utils import catalog_import
+
+        def save_concurrently(entries, user):
+            # Przedmiot dodany po walidacji, przed zapisem importu
+            Item.objects.create(name='Panel', area='IT', price=1)
+            raise IntegrityError('Duplicate entry')
+
+        with mock.patch.object(catalog_import, 'save_catalog', side_effect=save_concurrently):
+            response = self.upload("Nazwa;Obszar\nKabel;IT\nPanel;IT\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3])
+
+
+class RequisitionExportTest(TestCase):
+    """Eksport pobiera zapotrzebowania porcjami stronicowanymi kluczem (created_at, id)"""
+
+    def test_chunks_cover_all_rows_in_order(self):
+        from . import views
+
+        user = User.objects.create_user(username='admin', password='admin')
+        item = Item.objects.create(name='Panel', area='warehouse', price=10)
+        requisitions = [
+            Requisition.objects.create(deadline=datetime.date.today(), created_by=user) for _ in range(5)
+        ]
+        for requisition in requisitions:
+            RequisitionItem.objects.create(requisition=requisition, item=item, quantity=1, price=10)
+        # Równe znaczniki czasu - kolejność rozstrzyga id
+        Requisition.objects.update(created_at=requisitions[0].created_at)
+
+        expected = [requisition.number for requisition in reversed(requisitions)]
+        with mock.patch.object(views, 'EXPORT_CHUNK_SIZE', 2):
+            self.assertEqual([row[0] for row in views.iter_export_rows(Requisition.objects.all())], expected)
+            self.assertEqual([row[0] for row in views.iter_export_item_rows(Requisition.objects.all())], expected)
+
+
+class RequisitionNestedItemsTest(TestCase):
+    """Zapis zapotrzebowania wraz z pozycjami w jednym żądaniu"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projekt testowy')
+        self.items = [
+            Item.objects.create(name=f'Przedmiot {i}', area='warehouse', price=10 + i)
+            for i in range(3)
+        ]
+
+    def create_requisition(self, lines):
+        return self.client.post(reverse('api:requisition-list'), {
+            'project': self.project.id,
+            'deadline': datetime.date.today().isoformat(),
+            'items': lines,
+        }, format='json')
+
+    def test_create_with_items_uses_item_price_as_default(self):
+        response = self.create_requisition([
+            {'item': self.items[0].id, 'quantity': 2},
+            {'item': self.items[1].id, 'quantity': 1, 'price': '99.00'},
+        ])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        requisition = Requisition.objects.get(id=response.data['id'])
+        prices = dict(requisition.items.values_list('item_id', 'price'))
+        self.assertEqual(prices[self.items[0].id], 10)
+        self.assertEqual(prices[self.items[1].id], 99)
+
+    def test_create_query_count_does_not_grow_with_lines(self):
+        self.create_requisition([{'item': self.items[0].id, 'quantity': 1}])
+
+        with CaptureQueriesContext(connection) as small:
+            self.create_requisition([{'item': self.items[0].id, 'quantity': 1}])
+        with CaptureQueriesContext(connection) as large:
+            self.create_requisition([{'item': item.id, 'quantity': q} for q in range(1, 30) for item in self.items])
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_update_query_count_does_not_grow_with_lines(self):
+        requisition_id = self.create_requisition([{'item': self.items[0].id, 'quantity': 1}]).data['id']
+        url = reverse('api:requisition-detail', args=[requisition_id])
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.patch(url, {'items': [{'item': self.items[1].id, 'quantity': 1}]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.patch(url, {
+                'items': [{'item': item.id, 'quantity': q} for q in range(1, 30) for item in self.items]
+            }, format='json')
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_unknown_item_is_rejected(self):
+        response = self.create_requisition([{'item': 999999, 'quantity': 1}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Requisition.objects.exists())
+
+    def test_update_applies_items_diff(self):
+        response = self.create_requisition([
+            {'item': self.items[0].id, 'quantity': 1},
+            {'item': self.items[1].id, 'quantity': 1},
+        ])
+        requisition_id = response.data['id']
+        kept, removed = response.data['items']
+
+        response = self.client.patch(reverse('api:requisition-detail', args=[requisition_id]), {
+            'items': [
+                {'id': kept['id'], 'item': kept['item'], 'quantity': 5},
+                {'item': self.items[2].id, 'quantity': 3},
+            ]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        lines = dict(RequisitionItem.objects.filter(requisition_id=requisition_id).values_list('item_id', 'quantity'))
+        self.assertEqual(lines, {self.items[0].id: 5, self.items[2].id: 3})
+        self.assertTrue(RequisitionItem.objects.filter(id=kept['id']).exists())
+        self.assertFalse(RequisitionItem.objects.filter(id=removed['id']).exists())
+
+
+class BulkStatusChangeTest(TestCase):
+    """Zbiorcza zmiana statusu zapotrzebowań"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:requisition-bulk-change-status')
+
+    def create_requisitions(self, count, status='to_accept'):
+        return [
+            Requisition.objects.create(deadline=datetime.date.today(), status=status, created_by=self.user).id
+            for _ in range(count)
+        ]
+
+    def test_results_per_id(self):
+        pending = self.create_requisitions(2)
+        completed = self.create_requisitions(1, status='completed')
+
+        response = self.client.post(self.url, {'ids': pending + completed + [999999], 'status': 'accepted'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(
+            [row['result'] for row in response.data['results']],
+            ['updated', 'updated', 'invalid_transition', 'not_found']
+        )
+        self.assertEqual(
+            set(Requisition.objects.filter(id__in=pending).values_list('status', 'updated_by')),
+            {('accepted', self.user.id)}
+        )
+
+    def test_query_count_does_not_grow_with_batch(self):
+        small = self.create_requisitions(2)
+        large = self.create_requisitions(40)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(self.url, {'ids': small, 'status': 'accepted'}, format='json')
+        with CaptureQueriesContext(connection) as large_queries:
+            self.client.post(self.url, {'ids': large, 'status': 'accepted'}, format='json')
+
+        self.assertEqual(len(small_queries.captured_queries), len(large_queries.captured_queries))
+
+
+class RequisitionSpendRollupTest(TestCase):
+    """Zestawienia wartości zapotrzebowań aktualizowane przy zmianach"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projekt testowy')
+        self.item = Item.objects.create(name='Panel', area='warehouse', price=100)
+
+    def spend(self):
+        response = self.client.get(reverse('api:requisition_spend'), {'project_id': self.project.id})
+        self.assertEqual(response.status_code, 200)
+        return {(row['status'], row['requisition_count'], row['item_count'], row['total_value']) for row in response.data}
+
+    def test_rollups_follow_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            requisition = Requisition.objects.create(project=self.project, deadline=datetime.date.today())
+            RequisitionItem.objects.create(requisition=requisition, item=self.item, quantity=3, price=100)
+        self.assertEqual(self.spend(), {('to_accept', 1, 1, 300.0)})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('api:requisition-bulk-change-status'),
+                {'ids': [requisition.id], 'status': 'accepted'}, format='json'
+            )
+        self.assertEqual(self.spend(), {('accepted', 1, 1, 300.0)})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            requisition.delete()
+        self.assertEqual(self.spend(), set())
+
+    def test_refresh_runs_once_per_transaction_and_upserts(self):
+        from .utils import rollups
+
+        with mock.patch('api.utils.rollups.refresh_buckets', wraps=rollups.refresh_buckets) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                requisition = Requisition.objects.create(project=self.project, deadline=datetime.date.today())
+                for quantity in range(1, 6):
+                    RequisitionItem.objects.create(requisition=requisition, item=self.item, quantity=quantity, price=10)
+        self.assertEqual(refresh.call_count, 1)
+
+        # Ponowne przeliczenie istniejącego koszyka aktualizuje wiersz zamiast go duplikować
+        rollups.refresh_buckets({(self.project.id, rollups.month_start(requisition.created_at))})
+        self.assertEqual(self.spend(), {('to_accept', 1, 5, 150.0)})
+
+    def test_requisitions_without_project_share_one_row(self):
+        # NULL w kluczu unikalnym nie wywołuje konfliktu - wiersz koszyka nie może się mnożyć
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                requisition = Requisition.objects.create(deadline=datetime.date.today())
+                RequisitionItem.objects.create(requisition=requisition, item=self.item, quantity=1, price=5)
+        rows = RequisitionSpendRollup.objects.filter(project=None)
+        self.assertEqual(
+            [(row.requisition_count, row.item_count, row.total_value) for row in rows], [(3, 3, 15)]
+        )
+
+    def test_project_delete_moves_requisitions_to_bucket_without_project(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            requisition = Requisition.objects.create(project=self.project, deadline=datetime.date.today())
+            RequisitionItem.objects.create(requisition=requisition, item=self.item, quantity=2, price=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.delete()
+        self.assertEqual(
+            list(RequisitionSpendRollup.objects.values_list('project_id', 'requisition_count', 'total_value')),
+            [(None, 1, 20)]
+        )
+
+
+class ConditionalGetTest(TestCase):
+    """Warunkowe żądania GET zwracają 304 bez serializacji niezmienionych danych"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.item = Item.objects.create(name='Panel', area='warehouse', price=100)
+        self.requisition = Requisition.objects.create(deadline=datetime.date.today(), created_by=self.user)
+        RequisitionItem.objects.create(requisition=self.requisition, item=self.item, quantity=1, price=100)
+        self.url = reverse('api:requisition-list')
+
+    def test_unchanged_list_returns_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Tylko zapytanie walidatora - bez pobierania i serializacji danych
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Tabele powiązane reprezentowane przez wersje, bez przeglądania projektów i przedmiotów
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('api_tableversion', sql)
+        self.assertNotIn('"api_item"', sql)
+
+    def test_etag_changes_with_nested_items(self):
+        etag = self.client.get(self.url)['ETag']
+
+        RequisitionItem.objects.filter(requisition=self.requisition).delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_related_names(self):
+        etag = self.client.get(self.url)['ETag']
+
+        # Zmiana nazwy przedmiotu i autora zmienia item_name i created_by_name w odpowiedzi
+        self.item.name = 'Falownik'
+        self.item.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.user.first_name = 'Anna'
+        self.user.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TableVersion.objects.get(table='auth.user').version, 2)
+        etag = response['ETag']
+
+        # Samo logowanie nie unieważnia danych
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_returns_304(self):
+        url = reverse('api:requisition-detail', args=[self.requisition.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ProgressReportUpsertTest(TestCase):
+    """create_progress_report tworzy lub aktualizuje raport wraz z wpisami brygady"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:create_progress_report')
+        self.project = Project.objects.create(name='Farma PV')
+        self.employees = [Employee.objects.create(first_name='Jan', last_name=f'Kowalski {i}') for i in range(40)]
+        for employee in self.employees:
+            BrigadeMember.objects.create(brigade_leader=self.user, employee=employee)
+
+    def post(self, entries, **extra):
+        payload = {'date': '2025-05-05', 'project': self.project.id, 'entries': entries, **extra}
+        return self.client.post(self.url, payload, format='json')
+
+    def test_resubmission_updates_entries(self):
+        first = self.post([{'employee': e.id, 'hours_worked': 8} for e in self.employees[:3]], is_draft=True)
+        self.assertEqual(first.status_code, 201)
+
+        entries = [
+            {'employee': self.employees[0].id, 'hours_worked': 10, 'notes': 'nadgodziny'},
+            {'employee': self.employees[1].id, 'hours_worked': 8},
+            {'employee': self.employees[3].id, 'hours_worked': 6},
+        ]
+        second = self.post(entries)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertFalse(second.data['is_draft'])
+        self.assertEqual(
+            set(ProgressReportEntry.objects.values_list('employee_id', 'hours_worked')),
+            {(self.employees[0].id, 10), (self.employees[1].id, 8), (self.employees[3].id, 6)}
+        )
+
+    def test_omitted_entries_are_kept(self):
+        self.post([{'employee': e.id, 'hours_worked': 8} for e in self.employees[:3]], is_draft=True)
+        response = self.client.post(self.url, {'date': '2025-05-05', 'project': self.project.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_draft'])
+        self.assertEqual(ProgressReportEntry.objects.count(), 3)
+
+        # Jawnie pusta lista usuwa wpisy
+        self.post([])
+        self.assertEqual(ProgressReportEntry.objects.count(), 0)
+
+    def test_concurrent_first_submission_updates_created_report(self):
+        from .serializers import ProgressReportUpsertSerializer
+
+        self.post([{'employee': self.employees[0].id, 'hours_worked': 8}])
+        # Pierwszy odczyt nie widzi raportu utworzonego równolegle - zapis kończy się IntegrityError
+        with mock.patch.object(
+            ProgressReportUpsertSerializer, 'locked_report', autospec=True,
+            side_effect=[None, ProgressReport.objects.get()]
+        ):
+            response = self.post([{'employee': self.employees[1].id, 'hours_worked': 6}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ProgressReport.objects.count(), 1)
+        self.assertEqual(list(ProgressReportEntry.objects.values_list('employee_id', flat=True)), [self.employees[1].id])
+
+    def test_employee_outside_brigade_is_rejected(self):
+        stranger = Employee.objects.create(first_name='Obcy', last_name='Pracownik')
+        response = self.post([{'employee': stranger.id, 'hours_worked': 8}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProgressReport.objects.exists())
+
+    def test_query_count_does_not_grow_with_brigade(self):
+        with CaptureQueriesContext(connection) as small:
+            self.post([{'employee': e.id, 'hours_worked': 8} for e in self.employees[:2]])
+        ProgressReport.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            self.post([{'employee': e.id, 'hours_worked': 8} for e in self.employees])
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_removed_entries_tombstones_do_not_grow_with_brigade(self):
+        def remove_all_but_one(count):
+            self.post([{'employee': e.id, 'hours_worked': 8} for e in self.employees[:count]])
+            with CaptureQueriesContext(connection) as queries:
+                self.post([{'employee': self.employees[0].id, 'hours_worked': 8}])
+            ProgressReport.objects.all().delete()
+            return len(queries.captured_queries)
+
+        self.assertEqual(remove_all_but_one(5), remove_all_but_one(40))
+        # Ślady usuniętych wpisów (4 + 39) oraz wpisów usuniętych kaskadowo z raportami (1 + 1)
+        self.assertEqual(SyncTombstone.objects.filter(model='entries', owner=self.user).count(), 45)
+
+
+class ReportActivitiesDiffTest(TestCase):
+    """add_activities_to_report zapisuje tylko zmienione aktywności"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:add_activities_to_report')
+        project = Project.objects.create(name='Farma PV')
+        self.report = ProgressReport.objects.create(date=datetime.date(2025, 5, 5), project=project, created_by=self.user)
+
+    def activity(self, row, quantity):
+        return {'activity_type': 'Montaż', 'sub_activity': 'Panele', 'zona': 'A', 'row': row,
+                'quantity': quantity, 'unit': 'szt', 'notes': ''}
+
+    def save(self, activities):
+        return self.client.post(self.url, {'report_id': self.report.id, 'activities': activities}, format='json')
+
+    def test_only_changes_are_written(self):
+        self.save([self.activity(str(row), 10) for row in range(1, 4)])
+        unchanged_id = ProgressReportActivity.objects.get(row='1').id
+
+        response = self.save([self.activity('1', 10), self.activity('2', 12), self.activity('4', 5)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['deleted']), (1, 1, 1))
+        self.assertEqual(ProgressReportActivity.objects.get(row='1').id, unchanged_id)
+        self.assertEqual(
+            set(ProgressReportActivity.objects.values_list('row', 'quantity')),
+            {('1', 10), ('2', 12), ('4', 5)}
+        )
+
+    def test_invalid_list_leaves_activities_untouched(self):
+        self.save([self.activity('1', 10)])
+        response = self.save([self.activity('2', 10), {**self.activity('3', 10), 'quantity': -1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(ProgressReportActivity.objects.values_list('row', flat=True)), ['1'])
+
+
+class ProgressReportListingTest(TestCase):
+    """Lista raportów postępu filtrowana po stronie serwera"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Farma PV')
+        self.other_project = Project.objects.create(name='Farma wiatrowa')
+        employee = Employee.objects.create(first_name='Jan', last_name='Kowalski')
+        for day, project, is_draft in [(1, self.project, False), (10, self.project, True), (20, self.other_project, False)]:
+            report = ProgressReport.objects.create(
+                date=datetime.date(2025, 5, day), project=project, created_by=self.user, is_draft=is_draft
+            )
+            ProgressReportEntry.objects.create(report=report, employee=employee, hours_worked=8)
+
+    def dates(self, **params):
+        response = self.client.get(reverse('api:progressreport-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [report['date'] for report in response.data]
+
+    def test_filters(self):
+        self.assertEqual(self.dates(date_from='2025-05-05'), ['2025-05-20', '2025-05-10'])
+        self.assertEqual(self.dates(project=self.project.id), ['2025-05-10', '2025-05-01'])
+        self.assertEqual(self.dates(is_draft='false', date_to='2025-05-15'), ['2025-05-01'])
+
+    def test_summary_skips_images(self):
+        response = self.client.get(reverse('api:progressreport-list'), {'summary': '1'})
+        self.assertNotIn('images', response.data[0])
+        self.assertEqual(response.data[0]['image_count'], 0)
+        self.assertEqual(len(response.data[0]['entries']), 1)
+
+
+class ProgressReportCalendarTest(TestCase):
+    """Dzienne podsumowanie raportów dla kalendarza"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        employees = [Employee.objects.create(first_name='Jan', last_name=f'Kowalski {i}') for i in range(3)]
+        for name, is_draft, hours in [('Farma PV', False, 8), ('Farma wiatrowa', True, 6)]:
+            report = ProgressReport.objects.create(
+                date=datetime.date(2025, 5, 5), project=Project.objects.create(name=name),
+                created_by=self.user, is_draft=is_draft
+            )
+            for employee in employees[:2] if is_draft else employees:
+                ProgressReportEntry.objects.create(report=report, employee=employee, hours_worked=hours)
+        ProgressReport.objects.create(date=datetime.date(2025, 6, 1), project=report.project, created_by=self.user)
+
+    def test_month_aggregates_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api:progress_report_calendar'), {'month': '2025-05'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['days'], [{
+            'date': '2025-05-05', 'report_count': 2, 'draft_count': 1, 'final_count': 1,
+            'employee_count': 3, 'total_hours': 36.0,
+        }])
+
+    def test_invalid_month(self):
+        response = self.client.get(reverse('api:progress_report_calendar'), {'month': 'maj'})
+        self.assertEqual(response.status_code, 400)
+
+
+class LaborHoursFactTest(TestCase):
+    """Tabela godzin pracy aktualizowana przy zmianach raportów"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Farma PV')
+        self.employee = Employee.objects.create(first_name='Jan', last_name='Kowalski')
+
+    def create_report(self, day, hours, is_draft=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = ProgressReport.objects.create(
+                date=datetime.date(2025, 5, day), project=self.project, created_by=self.user, is_draft=is_draft
+            )
+            ProgressReportEntry.objects.create(report=report, employee=self.employee, hours_worked=hours)
+        return report
+
+    def test_facts_follow_reports(self):
+        report = self.create_report(5, 8)
+        self.create_report(6, 6, is_draft=True)
+        self.assertEqual(
+            set(LaborHoursFact.objects.values_list('date', 'hours', 'draft_hours')),
+            {(datetime.date(2025, 5, 5), 8, 0), (datetime.date(2025, 5, 6), 6, 6)}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report.entries.update(hours_worked=10)
+            report.save()
+        self.assertEqual(LaborHoursFact.objects.get(date=datetime.date(2025, 5, 5)).hours, 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertFalse(LaborHoursFact.objects.filter(date=datetime.date(2025, 5, 5)).exists())
+
+    def test_refresh_runs_once_per_transaction(self):
+        from .utils import labor_hours
+
+        others = [Employee.objects.create(first_name='Pracownik', last_name=str(i)) for i in range(4)]
+        with mock.patch('api.utils.labor_hours.refresh_buckets', wraps=labor_hours.refresh_buckets) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                report = ProgressReport.objects.create(
+                    date=datetime.date(2025, 5, 7), project=self.project, created_by=self.user
+                )
+                for employee in [self.employee, *others]:
+                    ProgressReportEntry.objects.create(report=report, employee=employee, hours_worked=8)
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(LaborHoursFact.objects.filter(date=datetime.date(2025, 5, 7)).count(), 5)
+
+    def test_hours_by_employee_and_month(self):
+        self.create_report(5, 8)
+        self.create_report(6, 6, is_draft=True)
+
+        response = self.client.get(reverse('api:labor_hours'), {'group_by': 'employee,month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'hours': 8.0, 'days': 1, 'employee': self.employee.id,
+            'employee_name': 'Jan Kowalski', 'month': '2025-05',
+        }])
+
+        response = self.client.get(reverse('api:labor_hours'), {'group_by': 'project', 'include_drafts': '1'})
+        self.assertEqual(response.data[0]['hours'], 14.0)
+
+
+class ActivityProgressTest(TestCase):
+    """Zestawienie zakresu planowanego z konfiguracji z wykonaniem z raportów"""
+
+    CONFIG = {
+        'logistyka': [{'zona': 1, 'rzad': 1, 'ilość': 10, 'ilość_palet': 4}],
+        'moduly': [{'zona': 1, 'rzad': 1, 'stoly': [{'numer_stolu': 1, 'ilosc_modulow': 20}, {'numer_stolu': 2, 'ilosc_modulow': 20}]}],
+    }
+
+    def test_plan_is_joined_with_reported_quantities(self):
+        done = [
+            {'activity_type': 'Logistyka', 'sub_activity': 'Transport słupów', 'zona': '1', 'row': '1', 'done': 5},
+            {'activity_type': 'Logistyka', 'sub_activity': 'Transport kabli', 'zona': '1', 'row': '1', 'done': 300},
+            {'activity_type': 'Moduły', 'sub_activity': 'Montaż modułów', 'zona': '1', 'row': '1', 'done': 50},
+        ]
+        progress = compute_progress(self.CONFIG, done)
+
+        rows = {(row['sub_activity']): (row['planned'], row['done'], row['percent']) for row in progress['rows']}
+        self.assertEqual(rows['Transport słupów'], (10.0, 5.0, 50.0))
+        self.assertEqual(rows['Transport modułów'], (4.0, 0.0, 0.0))
+        self.assertEqual(rows['Transport kabli'], (0.0, 300.0, None))
+        self.assertEqual(rows['Montaż modułów'], (40.0, 50.0, 100.0))
+
+        by_activity = {group['activity_type']: group['percent'] for group in progress['by_activity']}
+        self.assertEqual(by_activity, {'Logistyka': round(5 * 100 / 14, 1), 'Moduły': 100.0})
+        self.assertEqual(progress['total'], {'planned': 54.0, 'done': 45.0, 'percent': round(45 * 100 / 54, 1)})
+
+    def test_empty_config(self):
+        self.assertEqual(compute_progress(None, [])['total']['percent'], None)
+
+
+class ActivityPlanTest(TestCase):
+    """Plan z konfiguracji JSON zapisywany jako wiersze tabeli i zsumowany w bazie"""
+
+    CONFIG = {
+        'logistyka': [{'zona': 1, 'rzad': 1, 'ilość': 10, 'ilość_palet': 4}],
+        'konstrukcja': {'wkrecana': [{'zona': 1, 'rzad': 1, 'ilość': 12, 'płatwie': 6}]},
+        'moduly': [{'zona': 1, 'rzad': 1, 'stoly': [{'numer_stolu': 1, 'ilosc_modulow': 20}, {'numer_stolu': 2, 'ilosc_modulow': 28}]}],
+    }
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Farma PV')
+        self.config = ProjectActivityConfig.objects.create(project=self.project, config_data=self.CONFIG)
+
+    def test_plan_rows_follow_config(self):
+        tables = ActivityPlanItem.objects.filter(project=self.project, activity_type='Moduły').order_by('table')
+        self.assertEqual([(item.table, item.planned) for item in tables], [('1', 20), ('2', 28)])
+        # Kolejność jak w dokumencie, mimo grupowania w bazie
+        self.assertEqual(planned_quantities(self.project.id), flatten_plan(self.CONFIG))
+
+        self.config.config_data = {'logistyka': self.CONFIG['logistyka']}
+        self.config.save(update_fields=['config_data'])
+        self.assertEqual(
+            set(ActivityPlanItem.objects.filter(project=self.project).values_list('sub_activity', flat=True)),
+            {'Transport słupów', 'Transport modułów'}
+        )
+
+        self.config.delete()
+        self.assertFalse(ActivityPlanItem.objects.filter(project=self.project).exists())
+
+    def test_progress_falls_back_to_config_without_plan_rows(self):
+        # Konfiguracja sprzed tabeli planu - postęp liczony z dokumentu do czasu rebuild_activity_plan
+        ActivityPlanItem.objects.filter(project=self.project).delete()
+        progress = project_progress(self.project.id)
+        self.assertEqual(progress['total']['planned'], sum(row[-1] for row in flatten_plan(self.CONFIG)))
+
+    def test_keys_differing_in_case_are_merged(self):
+        # W MySQL zona A i a naruszają unikalność - wiersze są scalane pod pierwszą pisownią
+        self.config.config_data = {'moduly': [
+            {'zona': 'A', 'rzad': 1, 'stoly': [{'numer_stolu': 1, 'ilosc_modulow': 20}]},
+            {'zona': 'a', 'rzad': 1, 'stoly': [{'numer_stolu': 1, 'ilosc_modulow': 8}]},
+        ]}
+        self.config.save(update_fields=['config_data'])
+        self.assertEqual(
+            list(ActivityPlanItem.objects.filter(project=self.project).values_list('zona', 'table', 'planned')),
+            [('A', '1', 28)]
+        )
+
+    def test_keys_longer_than_columns_are_truncated(self):
+        # W MySQL (tryb strict) zbyt długa wartość przerwałaby zapis konfiguracji
+        self.config.config_data = {'moduly': [
+            {'zona': 'Z' * 150, 'rzad': 1, 'stoly': [{'numer_stolu': 'S' * 120, 'ilosc_modulow': 20}]},
+        ]}
+        self.config.save(update_fields=['config_data'])
+        item = ActivityPlanItem.objects.get(project=self.project)
+        self.assertEqual((item.zona, item.table, item.planned), ('Z' * 100, 'S' * 100, 20))
+
+
+class ActivityConfigSliceTest(TestCase):
+    """Formularz aktywności pobiera z indeksu konfiguracji tylko wybrany fragment"""
+
+    CONFIG = {
+        'logistyka': [
+            {'zona': 2, 'rzad': 1, 'ilość': 6},
+            {'zona': 10, 'rzad': 1, 'ilość': 8},
+            {'zona': 10, 'rzad': 2, 'ilość_palet': 3},
+        ],
+        'moduly': [{'zona': 1, 'rzad': 1, 'stoly': [{'numer_stolu': 2, 'ilosc_modulow': 28}, {'numer_stolu': 1, 'ilosc_modulow': 20}]}],
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Farma PV')
+        self.config = ProjectActivityConfig.objects.create(project=self.project, config_data=self.CONFIG)
+
+    def get_slice(self, **params):
+        return self.client.get(reverse('api:project_activities_config_slice'), {'project_id': self.project.id, **params})
+
+    def test_index_is_built_on_save(self):
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.index_data['activities']['Logistyka']['zonas']['10']['1'], {'Transport słupów': 8.0})
+
+        self.config.config_data = {'moduly': self.CONFIG['moduly']}
+        self.config.save(update_fields=['config_data'])
+        self.config.refresh_from_db()
+        self.assertNotIn('Logistyka', self.config.index_data['activities'])
+
+    def test_slices(self):
+        response = self.get_slice()
+        self.assertEqual(response.data['activity_types'], ['Logistyka', 'Moduły', 'Zakończenie budowy'])
+
+        response = self.get_slice(activity_type='Logistyka', sub_activity='Transport słupów')
+        self.assertEqual(response.data['zonas'], ['2', '10'])
+
+        response = self.get_slice(activity_type='Logistyka', sub_activity='Transport modułów', zona='10')
+        self.assertEqual(response.data['rows'], [{'row': '2', 'planned': 3.0}])
+
+        response = self.get_slice(activity_type='Moduły', zona='1', row='1')
+        self.assertEqual(response.data['tables'], [{'table': '1', 'planned': 20.0}, {'table': '2', 'planned': 28.0}])
+
+        response = self.get_slice(activity_type='Zakończenie budowy', sub_activity='Sprzątanie')
+        self.assertEqual(response.data['zonas'], ['1', '2', '10'])
+
+        self.assertEqual(self.get_slice(activity_type='Moduły', zona='5').status_code, 404)
+
+    def test_not_modified(self):
+        response = self.get_slice(activity_type='Logistyka')
+        response = self.client.get(
+            reverse('api:project_activities_config_slice'),
+            {'project_id': self.project.id, 'activity_type': 'Logistyka'},
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_index_version_changes_etag(self):
+        etag = self.get_slice(activity_type='Logistyka')['ETag']
+        # Nowa struktura indeksu przy tej samej konfiguracji - zapisany wycinek jest nieaktualny
+        with mock.patch('api.views.INDEX_VERSION', 2), mock.patch('api.utils.config_index.INDEX_VERSION', 2):
+            response = self.client.get(
+                reverse('api:project_activities_config_slice'),
+                {'project_id': self.project.id, 'activity_type': 'Logistyka'},
+                HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class DeltaSyncTest(TestCase):
+    """Synchronizacja przyrostowa zwraca tylko zmiany i ślady usunięć"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Farma PV')
+        self.employee = Employee.objects.create(first_name='Jan', last_name='Kowalski')
+        BrigadeMember.objects.create(brigade_leader=self.user, employee=self.employee)
+        self.report = ProgressReport.objects.create(date=datetime.date(2025, 5, 5), project=self.project, created_by=self.user)
+        self.entry = ProgressReportEntry.objects.create(report=self.report, employee=self.employee, hours_worked=8)
+
+    def sync(self, token=None):
+        response = self.client.get(reverse('api:sync'), {'token': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_full_then_incremental_sync(self):
+        first = self.sync()
+        self.assertTrue(first['reset'])
+        self.assertEqual(len(first['changes']['brigade_members']), 1)
+        self.assertEqual([entry['id'] for entry in first['changes']['entries']], [self.entry.id])
+
+        entry_id = self.entry.id
+        response = self.client.delete(reverse('api:progressreportentry-detail', args=[entry_id]))
+        self.assertEqual(response.status_code, 204)
+        other = Employee.objects.create(first_name='Anna', last_name='Nowak')
+        new_entry = ProgressReportEntry.objects.create(report=self.report, employee=other, hours_worked=6)
+
+        second = self.sync(first['sync_token'])
+        self.assertFalse(second['reset'])
+        self.assertIn(new_entry.id, [entry['id'] for entry in second['changes']['entries']])
+        self.assertEqual(second['deleted']['entries'], [entry_id])
+
+    def test_report_delete_records_children_tombstones(self):
+        token = self.sync()['sync_token']
+        report_id, entry_id = self.report.id, self.entry.id
+        self.report.delete()
+
+        deleted = self.sync(token)['deleted']
+        self.assertEqual(deleted['progress_reports'], [report_id])
+        self.assertEqual(deleted['entries'], [entry_id])
+
+    def test_foreign_token_is_rejected(self):
+        token = self.sync()['sync_token']
+        self.client.force_authenticate(user=User.objects.create_user(username='inny', password='haslo'))
+        response = self.client.get(reverse('api:sync'), {'token': token})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['reset_required'])
+
+
+class BatchSubmissionTest(TestCase):
+    """Ponowione przesłanie partii nie tworzy duplikatów"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Farma PV')
+        self.employee = Employee.objects.create(first_name='Jan', last_name='Kowalski')
+        BrigadeMember.objects.create(brigade_leader=self.user, employee=self.employee)
+
+    def batch(self):
+        return {'operations': [
+            {'idempotency_key': 'raport-1', 'type': 'create_progress_report', 'payload': {
+                'date': '2025-05-05', 'project': self.project.id,
+                'entries': [{'employee': self.employee.id, 'hours_worked': 8}],
+            }},
+            {'idempotency_key': 'aktywnosci-1', 'type': 'add_activities_to_report', 'payload': {
+                'report_key': 'raport-1',
+                'activities': [{'activity_type': 'Moduły', 'sub_activity': 'Montaż modułów', 'zona': '1', 'row': '1',
+                                'quantity': 10, 'unit': 'szt'}],
+            }},
+            {'idempotency_key': 'zly-1', 'type': 'nieznana', 'payload': {}},
+        ]}
+
+    def test_replayed_batch_creates_no_duplicates(self):
+        first = self.client.post(reverse('api:submit_batch'), self.batch(), format='json')
+        self.assertEqual(first.status_code, 200)
+        # Pełne wyniki w komunikacie - błąd walidacji operacji jest widoczny od razu
+        self.assertEqual(
+            [result['status'] for result in first.data['results']], ['ok', 'ok', 'error'], first.data['results']
+        )
+
+        second = self.client.post(reverse('api:submit_batch'), self.batch(), format='json')
+        self.assertEqual(
+            [result['status'] for result in second.data['results']], ['replayed', 'replayed', 'error'], second.data['results']
+        )
+        self.assertEqual(second.data['results'][0]['data']['id'], first.data['results'][0]['data']['id'])
+
+        self.assertEqual(ProgressReport.objects.count(), 1)
+        self.assertEqual(ProgressReportEntry.objects.count(), 1)
+        self.assertEqual(ProgressReportActivity.objects.count(), 1)
+
+    def test_concurrently_stored_operation_is_replayed(self):
+        # Inne żądanie zapisało wynik po odczycie zapisanych operacji przez bieżące żądanie
+        ClientOperation.objects.create(
+            user=self.user, idempotency_key='raport-1', operation='create_progress_report',
+            status_code=201, response={'id': 999}
+        )
+        manager_filter = ClientOperation.objects.filter
+        calls = []
+
+        def filter_missing_stored(*args, **kwargs):
+            calls.append(kwargs)
+            # Pierwsze zapytanie (zapisane wyniki partii) nie widzi jeszcze wiersza
+            return ClientOperation.objects.none() if len(calls) == 1 else manager_filter(*args, **kwargs)
+
+        operations = self.batch()['operations'][:1]
+        with mock.patch.object(ClientOperation.objects, 'filter', side_effect=filter_missing_stored):
+            response = self.client.post(reverse('api:submit_batch'), {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['status'], 'replayed', response.data['results'])
+        self.assertEqual(response.data['results'][0]['data'], {'id': 999})
+        # Zapis bieżącego żądania wycofany razem z punktem zapisu operacji
+        self.assertFalse(ProgressReport.objects.exists())
+
+    def test_integrity_error_fails_only_its_operation(self):
+        from . import views
+
+        def conflicting(request, payload, resolve_report):
+            raise IntegrityError('Duplicate entry')
+
+        with mock.patch.dict(views.BATCH_OPERATIONS, {'add_activities_to_report': conflicting}):
+            response = self.client.post(reverse('api:submit_batch'), self.batch(), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']], ['ok', 'error', 'error'], response.data['results']
+        )
+        self.assertEqual(response.data['results'][1]['status_code'], 409)
+        self.assertEqual(ProgressReport.objects.count(), 1)
+
+
+class ImageVariantsTest(TestCase):
+    """Przesłane zdjęcie dostaje pomniejszone wersje bez metadanych EXIF"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        user = User.objects.create_user(username='brygadzista', password='haslo')
+        self.report = ProgressReport.objects.create(
+            date=datetime.date(2025, 5, 5), project=Project.objects.create(name='Farma PV'), created_by=user
+        )
+
+    def photo(self):
+        exif = Image.Exif()
+        exif[0x0110] = 'Telefon'  # Model aparatu
+        buffer = io.BytesIO()
+        Image.new('RGB', (4000, 3000), 'green').save(buffer, format='JPEG', exif=exif)
+        return SimpleUploadedFile('zdjecie.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variants_are_resized_and_stripped(self):
+        with override_settings(MEDIA_ROOT=self.media_root, BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                image = ProgressReportImage.objects.create(report=self.report, image=self.photo())
+
+            image.refresh_from_db()
+            with Image.open(image.thumbnail.path) as thumbnail:
+                self.assertEqual(max(thumbnail.size), 320)
+                self.assertFalse(thumbnail.getexif())
+            with Image.open(image.medium.path) as medium:
+                self.assertEqual(medium.size, (1280, 960))
+
+
+class ChunkedUploadTest(TestCase):
+    """Przesyłanie w częściach wznawia się od potwierdzonego przesunięcia"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        self.user = User.objects.create_user(username='kierownik', password='haslo')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Farma PV')
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            reverse('api:chunked_upload_detail', args=[upload_id]), data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_resume_and_attach_config(self):
+        content = b'{"logistyka": [{"zona": 1, "rzad": 1, "ilo\xc5\x9b\xc4\x87": 10}]}'
+        with override_settings(CHUNKED_UPLOAD_DIR=self.upload_dir):
+            response = self.client.post(reverse('api:create_chunked_upload'), {
+                'target': 'activities_config', 'filename': 'config.json', 'size': len(content),
+                'checksum': hashlib.sha256(content).hexdigest(), 'project_id': self.project.id,
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            upload_id = response.data['upload_id']
+
+            self.assertEqual(self.put_chunk(upload_id, 0, content[:20]).data['offset'], 20)
+            # Ponowienie części po utracie odpowiedzi - serwer wskazuje przesunięcie do wznowienia
+            conflict = self.put_chunk(upload_id, 0, content[:20])
+            self.assertEqual(conflict.status_code, 409)
+            self.assertEqual(conflict.data['offset'], 20)
+
+            finished = self.put_chunk(upload_id, 20, content[20:])
+            self.assertEqual(finished.status_code, 201)
+            self.assertEqual(finished.data['status'], 'completed')
+
+        config = ProjectActivityConfig.objects.get(project=self.project)
+        self.assertEqual(config.config_data['logistyka'][0]['ilość'], 10)
+        self.assertEqual(config.created_by, self.user)
+
+    def test_chunk_being_written_returns_conflict_without_waiting(self):
+        upload = ChunkedUpload.objects.create(
+            user=self.user, target='activities_config', filename='config.json', size=10,
+            target_data={'project_id': self.project.id}
+        )
+        with override_settings(CHUNKED_UPLOAD_DIR=self.upload_dir):
+            # Inne żądanie zapisuje część od przesunięcia 0
+            ChunkedUpload.objects.filter(pk=upload.pk).update(claimed_at=timezone.now())
+            conflict = self.put_chunk(upload.upload_id, 0, b'01234')
+            self.assertEqual(conflict.status_code, 409)
+            self.assertEqual(conflict.data['offset'], 0)
+
+            # Rezerwacja zerwanego żądania wygasa i część może zostać wysłana ponownie
+            ChunkedUpload.objects.filter(pk=upload.pk).update(
+                claimed_at=timezone.now() - chunked_upload.CLAIM_TIMEOUT - datetime.timedelta(seconds=1)
+            )
+            response = self.put_chunk(upload.upload_id, 0, b'01234')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['offset'], 5)
+
+        upload.refresh_from_db()
+        self.assertIsNone(upload.claimed_at)
+
+
+class ActivityConverterTest(TestCase):
+    """Wektorowa konwersja arkusza daje ten sam JSON co implementacja wierszowa"""
+
+    def assertSameOutput(self, df):
+        expected = json.dumps(process_sheet_data_rowwise(df), cls=NumpyEncoder, ensure_ascii=False)
+        actual = json.dumps(process_sheet_data(df), cls=NumpyEncoder, ensure_ascii=False)
+        self.assertEqual(actual, expected)
+
+    def test_modules_and_structure_sheets(self):
+        rng = np.random.default_rng(7)
+        rows = 300
+        df = pd.DataFrame({
+            'Zona': rng.integers(1, 4, rows),
+            'Rząd': rng.integers(1, 20, rows),
+            'Numer stołu': np.arange(rows),
+            'Ilość modułów': rng.choice([24.0, 28.0, np.nan], rows),
+            'Przedłużki': rng.integers(0, 3, rows),
+            'Płatwie': rng.choice([4.0, np.nan], rows),
+            'Typ stołu': rng.choice(['2V14', '2V28', None], rows),
+        })
+        # Wiersz bez zony jest pomijany przez grupowanie
+        df.loc[5, 'Zona'] = np.nan
+        self.assertSameOutput(df)
+
+        # Arkusz z kolumną tekstową w kluczu (wiersz o typie object)
+        df['Zona'] = df['Zona'].map(lambda zona: f"Z{int(zona)}" if pd.notna(zona) else zona)
+        self.assertSameOutput(df)
+
+    def test_sheet_without_tables(self):
+        df = pd.DataFrame({'Zona': [1, 1, 2], 'Rząd': [1, 1, 1], 'Ilość': [10, 10, 5], 'Uwagi': [None, 'a', 'b']})
+        self.assertSameOutput(df)
+        self.assertEqual(process_sheet_data(df)[0], {'zona': 1, 'rzad': 1, 'ilość': 10, 'uwagi': 'a'})
+
+    def test_streaming_reader_matches_dataframe_path(self):
+        workbook = Workbook()
+        workbook.active.title = 'Info'
+        workbook['Info'].append(['Farma PV'])
+        workbook['Info'].append(['Ground'])
+        sheets = {
+            'Logistyka': [['Zona', 'Rząd', 'Ilość', 'Ilość palet'], [1, 2, 10, 3], [1, 1, 4, None], [1, 2, 10, 5], [None, 3, 1, 1]],
+            'Moduły': [['Zona', 'Rząd', 'Numer stołu', 'Ilość modułów'], [1, 1, 1, 28], [1, 1, 2, 26], [2, 1, 3, None]],
+            'Transport kabli': [['Zona', 'Rząd', 'Długość'], [1, 1, 120]],
+            'Konstrukcja - Wbijana': [['Zona', 'Rząd', 'Ilość', 'Numer stołu', 'Płatwie'], [1, 1, 8, 1, 4], [1, 1, 8, 2, None]],
+        }
+        for name, rows in sheets.items():
+            sheet = workbook.create_sheet(name)
+            for row in rows:
+                sheet.append(row)
+        path = os.path.join(tempfile.mkdtemp(), 'uklad.xlsx')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        workbook.save(path)
+
+        streamed = excel_to_activities_json(path)
+        self.assertEqual(streamed, excel_to_activities_json(path, streaming=False))
+        self.assertEqual(sorted(streamed['transport']), ['kabli'])
+        self.assertEqual(streamed['konstrukcja']['wbijana'][0]['stoly_struktura'], [{'numer_stolu': 1, 'płatwie': 4}, {'numer_stolu': 2}])
+
+        rows = iter(sheets['Logistyka'])
+        header = next(rows)
+        self.assertEqual(stream_sheet_data(iter(sheets['Logistyka'])), process_sheet_data(pd.DataFrame(list(rows), columns=header)))
+
+
+class ActivityConfigImportTest(TestCase):
+    """Konwersja Excela w tle zapisuje konfigurację albo zwraca błędy walidacji"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='kierownik', password='haslo'))
+        self.project = Project.objects.create(name='Farma PV')
+
+    def workbook_file(self, project_type='Ground', zona=1):
+        workbook = Workbook()
+        workbook.active.title = 'Info'
+        workbook['Info'].append(['Farma PV'])
+        workbook['Info'].append([project_type])
+        sheet = workbook.create_sheet('Logistyka')
+        sheet.append(['Zona', 'Rząd', 'Ilość'])
+        sheet.append([zona, 1, 12])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return SimpleUploadedFile('uklad.xlsx', buffer.getvalue())
+
+    def import_file(self, excel_file):
+        with override_settings(MEDIA_ROOT=self.media_root, BACKGROUND_TASKS_ASYNC=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('api:activity_config_imports'), {'project_id': self.project.id, 'file': excel_file}
+                )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        return self.client.get(reverse('api:activity_config_import_detail', args=[response.data['id']])).data
+
+    def test_successful_import_writes_config(self):
+        job = self.import_file(self.workbook_file())
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress'], 100)
+        config = ProjectActivityConfig.objects.get(project=self.project)
+        self.assertEqual(job['config'], config.id)
+        self.assertEqual(config.config_data['logistyka'], [{'zona': 1, 'rzad': 1, 'ilość': 12}])
+
+    def test_invalid_layout_reports_errors(self):
+        job = self.import_file(self.workbook_file(project_type='Dach'))
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('Nieznany typ projektu', job['errors'][0])
+        self.assertFalse(ProjectActivityConfig.objects.filter(project=self.project).exists())
+
+    def test_oversized_plan_keys_are_rejected(self):
+        job = self.import_file(self.workbook_file(zona='Z' * 101))
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['errors'], [f"Zona: wartość dłuższa niż 100 znaków ({'Z' * 20}...)"])
+        self.assertFalse(ProjectActivityConfig.objects.filter(project=self.project).exists())
+
+    def test_requeued_and_reclaimed_job_is_not_written_by_first_worker(self):
+        convert = config_import.excel_to_activities_json
+
+        def reclaimed_during_conversion(excel_file, progress=None):
+            # W trakcie konwersji zadanie uznane za przerwane i przejęte przez inny proces
+            ActivityConfigImport.objects.update(
+                status='running', started_at=timezone.now() + datetime.timedelta(minutes=31)
+            )
+            return convert(excel_file, progress=progress)
+
+        with mock.patch.object(config_import, 'excel_to_activities_json', side_effect=reclaimed_during_conversion):
+            job = self.import_file(self.workbook_file())
+        self.assertEqual(job['status'], 'running')
+        self.assertIsNone(job['config'])
+        self.assertFalse(ProjectActivityConfig.objects.filter(project=self.project).exists())
@@ -17,8 +17,10 @@ from .views import (
     get_progress_reports_for_date,validate_hr_requisition,HRRequisitionViewSet,
     HRRequisitionPositionViewSet, TransportRequestViewSet, TransportItemViewSet,
     validate_transport, ProjectActivityConfigViewSet, ProgressReportActivityViewSet,
-    get_project_activities_config, upload_project_activities_config,
-    add_activities_to_report
+    get_project_activities_config, project_activities_config_slice, upload_project_activities_config,
+    add_activities_to_report, requisition_spend, progress_report_calendar, labor_hours_report,
+    project_activity_progress, sync_changes, submit_batch,
+    create_chunked_upload, chunked_upload_detail, activity_config_imports, activity_config_import_detail
 )
 
 # Dodaj nową funkcję obsługującą CSRF
@@ -65,10 +67,17 @@ urlpatterns = [
     path('user-settings/', create_user_settings, name='create_user_settings'),
     path('create-progress-report/', create_progress_report, name='create_progress_report'),
     path('progress-reports-for-date/', get_progress_reports_for_date, name='progress_reports_for_date'),
+    path('progress-report-calendar/', progress_report_calendar, name='progress_report_calendar'),
+    path('labor-hours/', labor_hours_report, name='labor_hours'),
+    path('sync/', sync_changes, name='sync'),
+    path('batch/', submit_batch, name='submit_batch'),
+    path('uploads/', create_chunked_upload, name='create_chunked_upload'),
+    path('uploads/<uuid:upload_id>/', chunked_upload_detail, name='chunked_upload_detail'),
     path('check-project-name/', check_project_name, name='check_project_name'),
     path('check-pesel/', check_pesel, name='check_pesel'),
     path('validate-requisition/', validate_requisition, name='validate_requisition'),
     path('export-requisitions/', export_requisitions, name='export_requisitions'),
+    path('requisition-spend/', requisition_spend, name='requisition_spend'),
     path('csrf/', get_csrf_token, name='get_csrf_token'),
     path('assign-employee-to-quarter/', assign_employee_to_quarter, name='assign_employee_to_quarter'),
     path('remove-employee-from-quarter/', remove_employee_from_quarter, name='remove_employee_from_quarter'),
@@ -76,7 +85,11 @@ urlpatterns = [
     path('validate-transport/', validate_transport, name='validate_transport'),
     path('progress-reports-for-date/', get_progress_reports_for_date, name='progress_reports_for_date'),
     path('project-activities-config/', get_project_activities_config, name='project_activities_config'),
+    path('project-activities-config/slice/', project_activities_config_slice, name='project_activities_config_slice'),
+    path('project-activity-progress/', project_activity_progress, name='project_activity_progress'),
     path('upload-project-activities-config/', upload_project_activities_config, name='upload_project_activities_config'),
+    path('activity-config-imports/', activity_config_imports, name='activity_config_imports'),
+    path('activity-config-imports/<int:pk>/', activity_config_import_detail, name='activity_config_import_detail'),
     path('add-activities-to-report/', add_activities_to_report, name='add_activities_to_report'),
 
     # Dołącz ścieżki routera NA KOŃCU
@@ -1,6 +1,7 @@
 # api/utils/activity_converter.py
 
 import pandas as pd
+from openpyxl import load_workbook
 import json
 import numpy as np
 import re
@@ -19,32 +20,79 @@ class NumpyEncoder(json.JSONEncoder):
             return obj.tolist()
         return super(NumpyEncoder, self).default(obj)
 
-def excel_to_activities_json(excel_file_path, output_file_path=None):
+# Standardowe arkusze i odpowiadające im klucze JSON
+STANDARD_SHEETS = {
+    'Logistyka': 'logistyka',
+    'Moduły': 'moduly',
+    'Transport kabli': 'transport_kabli',
+    'Transport konstrukcji': 'transport_konstrukcji'
+}
+
+KONSTRUKCJA_PATTERN = re.compile(r'Konstrukcja - (.+)')
+
+def converted_sheets(sheet_names):
+    """Arkusze, które trafiają do konfiguracji (standardowe i konstrukcji)."""
+    return [name for name in sheet_names if name in STANDARD_SHEETS or KONSTRUKCJA_PATTERN.match(name)]
+
+def track_progress(sheet_records, sheet_names, progress):
+    """Wywołuje progress(nazwa_arkusza, przetworzone, wszystkie) po każdym przetworzonym arkuszu."""
+    if progress is None:
+        return sheet_records
+    total = len(converted_sheets(sheet_names))
+    done = []
+
+    def read(sheet_name):
+        records = sheet_records(sheet_name)
+        done.append(sheet_name)
+        progress(sheet_name, len(done), total)
+        return records
+
+    return read
+
+def excel_to_activities_json(excel_file_path, output_file_path=None, streaming=True, progress=None):
     """
     Konwertuje plik Excel do formatu JSON z konfiguracją aktywności.
 
     Args:
         excel_file_path (str): Ścieżka do pliku Excel
         output_file_path (str, optional): Ścieżka do pliku wyjściowego JSON
+        streaming (bool): Czytanie arkuszy wiersz po wierszu (openpyxl, tryb read-only)
+            zamiast wczytywania każdego arkusza do DataFrame
+        progress (callable, optional): Wywoływane po każdym arkuszu z (nazwa, przetworzone, wszystkie)
 
     Returns:
         dict: Dane w formacie JSON
     """
-    # Wczytaj arkusze z pliku Excel
-    excel_data = pd.ExcelFile(excel_file_path)
-
-    # Arkusz Info
-    info_df = pd.read_excel(excel_data, sheet_name='Info', header=None)
-    nazwa_projektu = info_df.iloc[0, 0]
-    typ_projektu = info_df.iloc[1, 0]
-
-    # Sprawdź typ projektu i wybierz odpowiednią strukturę
-    if typ_projektu == 'Ground':
-        result = process_ground_project(excel_data, nazwa_projektu)
-    elif typ_projektu == 'Floating':
-        result = process_floating_project(excel_data, nazwa_projektu)
+    if streaming:
+        workbook = load_workbook(excel_file_path, read_only=True, data_only=True)
+        try:
+            # Arkusz Info - nazwa i typ projektu w pierwszej kolumnie
+            info = [row[0] if row else None for row in workbook['Info'].iter_rows(max_row=2, max_col=1, values_only=True)]
+            nazwa_projektu, typ_projektu = (info + [None, None])[:2]
+            result = build_project(
+                nazwa_projektu, typ_projektu, workbook.sheetnames,
+                track_progress(
+                    lambda sheet_name: stream_sheet_data(workbook[sheet_name].iter_rows(values_only=True)),
+                    workbook.sheetnames, progress
+                )
+            )
+        finally:
+            workbook.close()
     else:
-        raise ValueError(f"Nieznany typ projektu: {typ_projektu}. Dostępne typy: Ground, Floating")
+        # Wczytaj arkusze z pliku Excel
+        excel_data = pd.ExcelFile(excel_file_path)
+
+        # Arkusz Info
+        info_df = pd.read_excel(excel_data, sheet_name='Info', header=None)
+        nazwa_projektu = info_df.iloc[0, 0]
+        typ_projektu = info_df.iloc[1, 0]
+        result = build_project(
+            nazwa_projektu, typ_projektu, excel_data.sheet_names,
+            track_progress(
+                lambda sheet_name: process_sheet_data(pd.read_excel(excel_data, sheet_name=sheet_name)),
+                excel_data.sheet_names, progress
+            )
+        )
 
     # Zapisz wynik do pliku jeśli podano ścieżkę
     if output_file_path:
@@ -54,8 +102,21 @@ def excel_to_activities_json(excel_file_path, output_file_path=None):
 
     return result
 
-def process_ground_project(excel_data, nazwa_projektu):
-    """Procesuje dane dla projektu typu Ground."""
+def build_project(nazwa_projektu, typ_projektu, sheet_names, sheet_records):
+    """Sprawdza typ projektu i wybiera odpowiednią strukturę."""
+    if typ_projektu == 'Ground':
+        return process_ground_project(sheet_names, nazwa_projektu, sheet_records)
+    if typ_projektu == 'Floating':
+        return process_floating_project(sheet_names, nazwa_projektu)
+    raise ValueError(f"Nieznany typ projektu: {typ_projektu}. Dostępne typy: Ground, Floating")
+
+def process_ground_project(sheet_names, nazwa_projektu, sheet_records):
+    """
+    Procesuje dane dla projektu typu Ground.
+
+    sheet_records(nazwa_arkusza) zwraca rekordy arkusza - z DataFrame (process_sheet_data)
+    albo strumieniowo (stream_sheet_data).
+    """
     # Zainicjuj główną strukturę JSON
     result = {
         "nazwa_projektu": nazwa_projektu,
@@ -64,17 +125,9 @@ def process_ground_project(excel_data, nazwa_projektu):
     }
 
     # Przetwórz standardowe arkusze
-    standard_sheets = {
-        'Logistyka': 'logistyka',
-        'Moduły': 'moduly',
-        'Transport kabli': 'transport_kabli',
-        'Transport konstrukcji': 'transport_konstrukcji'
-    }
-
-    for sheet_name, json_key in standard_sheets.items():
-        if sheet_name in excel_data.sheet_names:
-            df = pd.read_excel(excel_data, sheet_name=sheet_name)
-            processed_data = process_sheet_data(df)
+    for sheet_name, json_key in STANDARD_SHEETS.items():
+        if sheet_name in sheet_names:
+            processed_data = sheet_records(sheet_name)
 
             # Dodaj dane do odpowiedniej sekcji JSON
             if 'Transport' in sheet_name:
@@ -86,17 +139,15 @@ def process_ground_project(excel_data, nazwa_projektu):
                 result[json_key] = processed_data
 
     # Przetwórz arkusze konstrukcji
-    konstrukcja_pattern = re.compile(r'Konstrukcja - (.+)')
-    for sheet_name in excel_data.sheet_names:
-        konstrukcja_match = konstrukcja_pattern.match(sheet_name)
+    for sheet_name in sheet_names:
+        konstrukcja_match = KONSTRUKCJA_PATTERN.match(sheet_name)
         if konstrukcja_match:
             konstrukcja_type = konstrukcja_match.group(1).lower()
-            df = pd.read_excel(excel_data, sheet_name=sheet_name)
-            result['konstrukcja'][konstrukcja_type] = process_sheet_data(df)
+            result['konstrukcja'][konstrukcja_type] = sheet_records(sheet_name)
 
     return result
 
-def process_floating_project(excel_data, nazwa_projektu):
+def process_floating_project(sheet_names, nazwa_projektu):
     """Zaślepka dla projektu typu Floating."""
     return {
         "nazwa_projektu": nazwa_projektu,
@@ -104,8 +155,133 @@ def process_floating_project(excel_data, nazwa_projektu):
         "message": "Struktura dla projektu typu Floating nie została jeszcze zaimplementowana."
     }
 
+# Kolumny arkusza "Konstrukcja - struktura" przepisywane do stoly_struktura
+STRUCTURE_COLUMNS = ['Przedłużki', 'Belki główne', 'Stężenia ukośne', 'Płatwie']
+
+def json_key(column):
+    return column.lower().replace(' ', '_')
+
+def to_python(value):
+    """Zamienia skalar numpy na typ Pythona, pozostałe wartości zwraca bez zmian."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+def column_list(values):
+    """Lista wartości tablicy jako typy Pythona (tolist konwertuje całą tablicę liczbową naraz)."""
+    result = values.tolist()
+    if values.dtype == object:
+        result = [to_python(value) for value in result]
+    return result
+
+def split_by_group(values, group_ids, group_count):
+    """Dzieli listę wartości posortowaną po numerze grupy na listy kolejnych grup."""
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(group_ids, minlength=group_count)))).tolist()
+    return [values[bounds[i]:bounds[i + 1]] for i in range(group_count)]
+
 def process_sheet_data(df):
-    """Przetwarza dane z arkusza do formatu JSON."""
+    """
+    Przetwarza dane z arkusza do formatu JSON.
+
+    Wiersze grupowane są według (Zona, Rząd) jednym wywołaniem ngroup, a każda kolumna
+    przetwarzana jest raz dla całego arkusza: liczność i liczba unikalnych wartości
+    w grupach liczone są w pandas/numpy, a wartości dzielone na grupy po stabilnym
+    sortowaniu wierszy. Wynik jest taki sam jak process_sheet_data_rowwise.
+    """
+    # Upewnij się, że DataFrame ma dane
+    if df.empty:
+        return []
+
+    # Sprawdź, czy DataFrame zawiera wymagane kolumny
+    if 'Zona' not in df.columns or 'Rząd' not in df.columns:
+        print("Uwaga: Brak kolumn Zona lub Rząd w arkuszu!")
+        return []
+
+    # Wspólny typ kolumn arkusza - tak typowane są wartości stołów przy iteracji po wierszach
+    row_dtype = df.iloc[:1].to_numpy().dtype
+
+    # Wiersze bez Zony lub Rzędu nie należą do żadnej grupy (jak w groupby)
+    df = df[df['Zona'].notna().to_numpy() & df['Rząd'].notna().to_numpy()]
+    if df.empty:
+        return []
+
+    # Numery grup w kolejności posortowanych kluczy, wiersze grupy w kolejności arkusza
+    group_ids = df.groupby(['Zona', 'Rząd'], sort=True).ngroup().to_numpy()
+    group_count = int(group_ids.max()) + 1
+    order = np.argsort(group_ids, kind='stable')
+    sorted_ids = group_ids[order]
+    first_rows = order[np.searchsorted(sorted_ids, np.arange(group_count))]
+
+    records = [
+        {"zona": zona, "rzad": rzad}
+        for zona, rzad in zip(column_list(df['Zona'].to_numpy()[first_rows]), column_list(df['Rząd'].to_numpy()[first_rows]))
+    ]
+
+    # Pozostałe kolumny: jedna unikalna wartość w grupie - wartość, kilka - lista wartości
+    for column in df.columns:
+        if column in ['Zona', 'Rząd']:
+            continue
+        series = df[column]
+        present = series.notna().to_numpy()
+        if not present.any():
+            continue
+        counts = np.bincount(group_ids[present], minlength=group_count)
+        unique_counts = series.groupby(group_ids).nunique().to_numpy()
+
+        present_sorted = present[order]
+        values = series.iloc[order[present_sorted]].tolist()
+        if series.dtype == object:
+            values = [to_python(value) for value in values]
+
+        key = json_key(column)
+        for record, count, unique_count, group_values in zip(
+            records, counts, unique_counts, split_by_group(values, sorted_ids[present_sorted], group_count)
+        ):
+            if count:
+                record[key] = group_values[0] if unique_count == 1 else group_values
+
+    if 'Numer stołu' not in df.columns:
+        return records
+    numery = df['Numer stołu'].to_numpy(dtype=row_dtype)
+    has_numer = df['Numer stołu'].notna().to_numpy()
+
+    # Dodaj specyficzne pola dla arkusza "Moduły"
+    if 'Ilość modułów' in df.columns:
+        selected = (has_numer & df['Ilość modułów'].notna().to_numpy())[order]
+        rows = order[selected]
+        stoly = [
+            {"numer_stolu": numer, "ilosc_modulow": ilosc}
+            for numer, ilosc in zip(column_list(numery[rows]), column_list(df['Ilość modułów'].to_numpy(dtype=row_dtype)[rows]))
+        ]
+        for record, group_stoly in zip(records, split_by_group(stoly, sorted_ids[selected], group_count)):
+            if group_stoly:
+                record["stoly"] = group_stoly
+
+    # Dodaj specyficzne pola dla arkusza "Konstrukcja - struktura"
+    structure_columns = [column for column in STRUCTURE_COLUMNS if column in df.columns]
+    if structure_columns:
+        selected = has_numer[order]
+        rows = order[selected]
+        stoly_struktura = [{"numer_stolu": numer} for numer in column_list(numery[rows])]
+        for column in structure_columns:
+            key = json_key(column)
+            values = column_list(df[column].to_numpy(dtype=row_dtype)[rows])
+            for stol, value, is_present in zip(stoly_struktura, values, df[column].notna().to_numpy()[rows]):
+                if is_present:
+                    stol[key] = value
+        for record, group_stoly in zip(records, split_by_group(stoly_struktura, sorted_ids[selected], group_count)):
+            if group_stoly:
+                record["stoly_struktura"] = group_stoly
+
+    return records
+
+def process_sheet_data_rowwise(df):
+    """
+    Poprzednia, wierszowa implementacja process_sheet_data (pętla po grupach i kolumnach).
+    Pozostawiona jako wzorzec dla testu zgodności i benchmarku (scripts/benchmark_activity_converter.py).
+    """
     # Upewnij się, że DataFrame ma dane
     if df.empty:
         return []
@@ -196,6 +372,122 @@ def process_sheet_data(df):
 
     return records
 
+class ColumnValues:
+    """
+    Wartości kolumny w grupie. Dopóki wszystkie są równe, przechowywana jest jedna
+    wartość i ich liczba - lista powstaje dopiero przy pierwszej różnej wartości.
+    """
+    __slots__ = ('first', 'count', 'values')
+
+    def __init__(self, value):
+        self.first = value
+        self.count = 1
+        self.values = None
+
+    def add(self, value):
+        if self.values is not None:
+            self.values.append(value)
+        elif value == self.first:
+            self.count += 1
+        else:
+            self.values = [self.first] * self.count + [value]
+
+    def result(self):
+        # Jedna unikalna wartość w grupie - wartość, kilka - lista wszystkich wartości
+        return self.first if self.values is None else self.values
+
+def sheet_columns(header):
+    """Nazwy kolumn jak w pandas.read_excel: puste nagłówki jako 'Unnamed: i', powtórzenia z sufiksem .1, .2"""
+    columns, seen = [], {}
+    for position, name in enumerate(header):
+        name = f"Unnamed: {position}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+def group_sort_key(key):
+    """Kolejność grup jak w groupby: liczby przed tekstem"""
+    return tuple((isinstance(part, str), part) for part in key)
+
+def stream_sheet_data(rows):
+    """
+    Strumieniowy odpowiednik process_sheet_data dla wierszy arkusza (pierwszy wiersz to nagłówek).
+
+    Każdy wiersz od razu trafia do rekordu swojej grupy (Zona, Rząd), więc poza samym
+    wynikiem pamięć nie rośnie z liczbą wierszy. Wartości zachowują typ komórki
+    (np. 5 zamiast 5.0 w kolumnie z pustymi komórkami, gdzie pandas rzutuje na float).
+    """
+    header = next(rows, None)
+    if header is None:
+        return []
+    columns = sheet_columns(header)
+    if 'Zona' not in columns or 'Rząd' not in columns:
+        print("Uwaga: Brak kolumn Zona lub Rząd w arkuszu!")
+        return []
+
+    zona_index, rzad_index = columns.index('Zona'), columns.index('Rząd')
+    value_columns = [index for index, column in enumerate(columns) if column not in ['Zona', 'Rząd']]
+    keys = {index: json_key(str(columns[index])) for index in value_columns}
+    numer_index = columns.index('Numer stołu') if 'Numer stołu' in columns else None
+    ilosc_index = columns.index('Ilość modułów') if 'Ilość modułów' in columns else None
+    structure_columns = [(columns.index(column), json_key(column)) for column in STRUCTURE_COLUMNS if column in columns]
+
+    groups = {}
+    for row in rows:
+        # Puste komórki (także pusty tekst) jako brak wartości
+        cells = [None if value == '' else value for value in row] + [None] * (len(columns) - len(row))
+        zona, rzad = cells[zona_index], cells[rzad_index]
+        if zona is None or rzad is None:
+            # Wiersze bez Zony lub Rzędu nie należą do żadnej grupy (jak w groupby)
+            continue
+
+        group = groups.get((zona, rzad))
+        if group is None:
+            group = groups[(zona, rzad)] = {'values': {}, 'stoly': [], 'stoly_struktura': []}
+        values = group['values']
+        for index in value_columns:
+            value = cells[index]
+            if value is not None:
+                if index in values:
+                    values[index].add(value)
+                else:
+                    values[index] = ColumnValues(value)
+
+        numer = cells[numer_index] if numer_index is not None else None
+        if numer is None:
+            continue
+        if ilosc_index is not None and cells[ilosc_index] is not None:
+            group['stoly'].append({"numer_stolu": numer, "ilosc_modulow": cells[ilosc_index]})
+        if structure_columns:
+            stol = {"numer_stolu": numer}
+            for index, key in structure_columns:
+                if cells[index] is not None:
+                    stol[key] = cells[index]
+            group['stoly_struktura'].append(stol)
+
+    try:
+        group_keys = sorted(groups, key=group_sort_key)
+    except TypeError:
+        group_keys = list(groups)
+
+    records = []
+    for zona, rzad in group_keys:
+        group = groups.pop((zona, rzad))
+        record = {"zona": zona, "rzad": rzad}
+        # Pola w kolejności kolumn arkusza
+        for index, column_values in sorted(group['values'].items()):
+            record[keys[index]] = column_values.result()
+        if group['stoly']:
+            record["stoly"] = group['stoly']
+        if group['stoly_struktura']:
+            record["stoly_struktura"] = group['stoly_struktura']
+        records.append(record)
+    return records
+
 def save_activities_json_for_project(project_id, json_data):
     """
     Zapisuje dane JSON z konfiguracją aktywności dla projektu.
@@ -0,0 +1,164 @@
+"""
+Znormalizowany plan aktywności projektu (ActivityPlanItem).
+
+Konfiguracja z pliku Excel zapisywana jest jako dokument JSON
+(ProjectActivityConfig.config_data), którego baza nie potrafi filtrować ani
+sumować. Przy każdym zapisie konfiguracji plan rozkładany jest na wiersze
+(aktywność, podaktywność, zona, rząd, stół) z planowaną ilością - według reguł
+z api/utils/activity_progress.py - i zapisywany w tej samej transakcji,
+więc tabela zawsze odpowiada dokumentowi. Zestawienia planu z wykonaniem
+korzystają z indeksowanych zapytań zamiast parsowania dokumentu.
+
+Wiersze zapamiętują kolejność w dokumencie (position), bo zapytanie z GROUP BY
+nie gwarantuje kolejności. Klucze różniące się tylko wielkością liter lub
+znakami diakrytycznymi (zona A i a) są scalane - w MySQL naruszałyby
+ograniczenie unikalności przez porównanie bez rozróżniania wielkości liter.
+"""
+import unicodedata
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Min, Sum
+
+from .activity_progress import (
+    CONSTRUCTION_SUB_ACTIVITIES, LOGISTICS_FIELDS, STRUCTURE_FIELDS, normalize_key, to_quantity
+)
+
+MODULE_SUB_ACTIVITY = 'Montaż modułów'
+
+
+def collation_key(key):
+    """Klucz porównywany jak w bazie - bez rozróżniania wielkości liter i znaków diakrytycznych"""
+    return tuple(
+        ''.join(char for char in unicodedata.normalize('NFKD', part.casefold()) if not unicodedata.combining(char))
+        for part in key
+    )
+
+
+def plan_entries(config_data):
+    """Zwraca pary (klucz (activity_type, sub_activity, zona, row, table), ilość) w kolejności dokumentu"""
+    if not isinstance(config_data, dict):
+        return
+
+    def section_rows(rows):
+        for row in rows or []:
+            if isinstance(row, dict) and 'zona' in row and 'rzad' in row:
+                yield normalize_key(row['zona']), normalize_key(row['rzad']), row
+
+    def fields_entries(activity_type, rows, fields):
+        for zona, rzad, row in section_rows(rows):
+            for sub_activity, field in fields.items():
+                if field in row:
+                    yield (activity_type, sub_activity, zona, rzad, ''), to_quantity(row[field])
+
+    yield from fields_entries('Logistyka', config_data.get('logistyka'), LOGISTICS_FIELDS)
+
+    for construction_type, rows in (config_data.get('konstrukcja') or {}).items():
+        fields = {name: 'ilość' for name in CONSTRUCTION_SUB_ACTIVITIES.get(construction_type, [])}
+        fields.update(STRUCTURE_FIELDS)
+        yield from fields_entries('Konstrukcja', rows, fields)
+
+    for zona, rzad, row in section_rows(config_data.get('moduly')):
+        tables = [table for table in row.get('stoly') or [] if isinstance(table, dict)]
+        if not tables:
+            yield ('Moduły', MODULE_SUB_ACTIVITY, zona, rzad, ''), 0.0
+        for table in tables:
+            number = table.get('numer_stolu', table.get('numer'))
+            table_key = normalize_key(number) if number is not None else ''
+            yield ('Moduły', MODULE_SUB_ACTIVITY, zona, rzad, table_key), to_quantity(table.get('ilosc_modulow'))
+
+
+def key_lengths():
+    """Maksymalne długości kluczy (zona, rząd, stół) w kolumnach ActivityPlanItem"""
+    from ..models import ActivityPlanItem
+
+    return [ActivityPlanItem._meta.get_field(name).max_length for name in ('zona', 'row', 'table')]
+
+
+def oversized_keys(config_data):
+    """Zwraca komunikaty o kluczach (zona, rząd, stół) dłuższych niż kolumny planu"""
+    labels = ('Zona', 'Rząd', 'Numer stołu')
+    lengths = key_lengths()
+    errors = []
+    for key, _ in plan_entries(config_data):
+        for label, value, length in zip(labels, key[2:], lengths):
+            message = f"{label}: wartość dłuższa niż {length} znaków ({value[:20]}...)"
+            if len(value) > length and message not in errors:
+                errors.append(message)
+    return errors
+
+
+def plan_rows(config_data):
+    """
+    Zwraca słownik {(activity_type, sub_activity, zona, row, table): planowana ilość}
+    w kolejności dokumentu. Powtórzone klucze (np. ten sam rząd w kilku typach
+    konstrukcji lub zona A i a) są sumowane pod pierwszą pisownią. Klucze
+    dłuższe niż kolumny planu są przycinane - w MySQL w trybie strict zapis
+    zbyt długiej wartości przerwałby zapis konfiguracji (import odrzuca je
+    wcześniej, patrz oversized_keys)
+    """
+    plan = {}
+    spellings = {}
+    lengths = key_lengths()
+    for key, quantity in plan_entries(config_data):
+        key = key[:2] + tuple(value[:length] for value, length in zip(key[2:], lengths))
+        key = spellings.setdefault(collation_key(key), key)
+        plan[key] = plan.get(key, 0.0) + quantity
+    return plan
+
+
+def build_items(config):
+    from ..models import ActivityPlanItem
+
+    return [
+        ActivityPlanItem(
+            config=config,
+            project_id=config.project_id,
+            activity_type=activity_type,
+            sub_activity=sub_activity,
+            zona=zona,
+            row=row,
+            table=table,
+            planned=Decimal(str(round(quantity, 2))),
+            position=position,
+        )
+        for position, ((activity_type, sub_activity, zona, row, table), quantity)
+        in enumerate(plan_rows(config.config_data).items())
+    ]
+
+
+def refresh_plan(config):
+    """Zastępuje wiersze planu konfiguracji wierszami z jej aktualnego dokumentu JSON"""
+    from ..models import ActivityPlanItem
+
+    with transaction.atomic():
+        ActivityPlanItem.objects.filter(config=config).delete()
+        ActivityPlanItem.objects.bulk_create(build_items(config), batch_size=1000)
+
+
+def planned_quantities(project_id):
+    """
+    Planowane ilości projektu zsumowane po (activity_type, sub_activity, zona, row) jednym zapytaniem
+    - w formacie i kolejności flatten_plan z api/utils/activity_progress.py
+    """
+    from ..models import ActivityPlanItem
+
+    rows = ActivityPlanItem.objects.filter(project_id=project_id).order_by().values(
+        'activity_type', 'sub_activity', 'zona', 'row'
+    ).annotate(planned=Sum('planned'), position=Min('position')).order_by('position')
+    return [
+        (row['activity_type'], row['sub_activity'], row['zona'], row['row'], float(row['planned']))
+        for row in rows
+    ]
+
+
+def rebuild_activity_plan():
+    """Przebudowuje plan wszystkich konfiguracji. Zwraca liczbę utworzonych wierszy"""
+    from ..models import ActivityPlanItem, ProjectActivityConfig
+
+    count = 0
+    with transaction.atomic():
+        ActivityPlanItem.objects.all().delete()
+        for config in ProjectActivityConfig.objects.iterator():
+            count += len(ActivityPlanItem.objects.bulk_create(build_items(config), batch_size=1000))
+    return count
@@ -0,0 +1,239 @@
+"""
+Postęp prac projektu: zakres planowany (ProjectActivityConfig.config_data)
+zestawiony z ilościami zgłoszonymi w raportach (ProgressReportActivity).
+
+Plan (activity_type, sub_activity, zona, row) z planowaną ilością pochodzi
+z tabeli ActivityPlanItem (api/utils/activity_plan.py), zsumowany w bazie.
+Konfiguracja jest do niej rozkładana według tych samych reguł, których używa
+formularz aktywności do wyznaczania maksymalnej ilości (flatten_plan).
+Zgłoszone ilości są sumowane w bazie, a procenty i sumy grup liczone na tablicach numpy.
+
+Wynik jest przechowywany w cache pod kluczem zawierającym znacznik konfiguracji
+i stan aktywności projektu, więc każda zmiana konfiguracji lub raportu
+powoduje przeliczenie, a bez zmian zwracany jest gotowy wynik.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+# Podaktywności logistyki i odpowiadające im pola wiersza konfiguracji
+LOGISTICS_FIELDS = {
+    'Transport słupów': 'ilość',
+    'Transport modułów': 'ilość_palet',
+    'Transport konstrukcji - Przedłużki': 'przedłużki',
+    'Transport konstrukcji - Belki główne': 'belki_główne',
+    'Transport konstrukcji - Stężenia ukośne': 'stężenia_ukośne',
+    'Transport konstrukcji - Płatwie': 'płatwie',
+}
+
+# Podaktywności konstrukcji zależne od typu konstrukcji (planowana ilość z pola ilość)
+CONSTRUCTION_SUB_ACTIVITIES = {
+    'betonowana': ['Tyczenie punktów', 'Wiercenie', 'Pozycjonowanie słupów - koromysła', 'Betonowanie otworów z nogami'],
+    'betonowana_z_wbijaniem_slupow': ['Tyczenie punktów zabicia słupów', 'Wiercenie', 'Betonowanie otworów', 'Wbijanie słupów w beton'],
+    'massivy': ['Tyczenie punktów', 'Zalewanie szalunków', 'Wiercenie dziur pod kotwy', 'Zalania massivu'],
+    'wbijana': ['Tyczenie punktów', 'Wbijanie nóg', 'Uszkodzony słup', 'Wiercenie', 'Wylewanie betonowego bloku'],
+    'wbijana_z_wierceniem': ['Tyczenie punktów', 'Przedwiercenie', 'Wbijanie nóg'],
+    'wkrecana': ['Tyczenie punktów', 'Przedwiercenie', 'Wkręcanie nóg'],
+    'kruszywo_i_wbijanie': ['Tyczenie punktów', 'Wiercenie', 'Wypełnienie otworów kruszywem', 'Wbicie słupów'],
+}
+
+# Podaktywności struktury wspólne dla wszystkich typów konstrukcji
+STRUCTURE_FIELDS = {
+    'Struktura - Przedłużki': 'przedłużki',
+    'Struktura - Belki główne': 'belki_główne',
+    'Struktura - Stężenia ukośne': 'stężenia_ukośne',
+    'Struktura - Płatwie': 'płatwie',
+}
+
+
+def normalize_key(value):
+    """Zona i rząd z konfiguracji mogą być liczbami, a w raportach są tekstem"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def to_quantity(value):
+    """Ilość z konfiguracji: liczba albo lista liczb (kilka wartości w grupie)"""
+    if isinstance(value, bool) or value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, list):
+        return sum(to_quantity(item) for item in value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def flatten_plan(config_data):
+    """Zwraca listę (activity_type, sub_activity, zona, row, planowana ilość) z konfiguracji projektu"""
+    plan = []
+    if not isinstance(config_data, dict):
+        return plan
+
+    def add_rows(activity_type, rows, fields):
+        for row in rows or []:
+            if not isinstance(row, dict) or 'zona' not in row or 'rzad' not in row:
+                continue
+            zona, rzad = normalize_key(row['zona']), normalize_key(row['rzad'])
+            for sub_activity, field in fields.items():
+                if field in row:
+                    plan.append((activity_type, sub_activity, zona, rzad, to_quantity(row[field])))
+
+    add_rows('Logistyka', config_data.get('logistyka'), LOGISTICS_FIELDS)
+
+    for construction_type, rows in (config_data.get('konstrukcja') or {}).items():
+        fields = {name: 'ilość' for name in CONSTRUCTION_SUB_ACTIVITIES.get(construction_type, [])}
+        fields.update(STRUCTURE_FIELDS)
+        add_rows('Konstrukcja', rows, fields)
+
+    for row in config_data.get('moduly') or []:
+        if not isinstance(row, dict) or 'zona' not in row or 'rzad' not in row:
+            continue
+        modules = sum(to_quantity(table.get('ilosc_modulow')) for table in row.get('stoly') or [] if isinstance(table, dict))
+        plan.append(('Moduły', 'Montaż modułów', normalize_key(row['zona']), normalize_key(row['rzad']), modules))
+
+    return plan
+
+
+def done_quantities(project_id):
+    """Sumy zgłoszonych ilości dla projektu pogrupowane po kluczu aktywności (jedno zapytanie)"""
+    from ..models import ProgressReportActivity
+
+    return ProgressReportActivity.objects.filter(report__project_id=project_id).order_by().values(
+        'activity_type', 'sub_activity', 'zona', 'row'
+    ).annotate(done=Sum('quantity'))
+
+
+def group_totals(codes, labels, planned, done):
+    """
+    Sumy planu i wykonania dla grup wskazanych kodami (np.bincount).
+    Procent grupy liczony jest z wykonania ograniczonego do planu każdego wiersza
+    """
+    planned_sum = np.bincount(codes, weights=planned, minlength=len(labels))
+    done_sum = np.bincount(codes, weights=done, minlength=len(labels))
+    capped_sum = np.bincount(codes, weights=np.minimum(done, planned), minlength=len(labels))
+    percent = completion(planned_sum, capped_sum)
+    return [
+        {**label, 'planned': float(planned_sum[i]), 'done': float(done_sum[i]), 'percent': percent[i]}
+        for i, label in enumerate(labels)
+    ]
+
+
+def completion(planned, done):
+    """Procent wykonania (maks. 100) - None dla pozycji bez planowanej ilości"""
+    percent = np.divide(
+        np.minimum(done, planned) * 100, planned,
+        out=np.zeros_like(planned, dtype=float), where=planned > 0
+    )
+    return [round(float(value), 1) if plan > 0 else None for value, plan in zip(percent, planned)]
+
+
+def compute_progress(config_data, done_rows, plan=None):
+    """
+    Zestawia plan z wykonaniem i liczy procenty dla wierszy, podaktywności, aktywności i całości.
+    Plan w formacie flatten_plan (np. z tabeli ActivityPlanItem) zastępuje parsowanie config_data
+    """
+    index = {}
+    keys = []
+    planned_values = []
+    for activity_type, sub_activity, zona, row, quantity in (flatten_plan(config_data) if plan is None else plan):
+        key = (activity_type, sub_activity, zona, row)
+        if key not in index:
+            index[key] = len(keys)
+            keys.append(key)
+            planned_values.append(0.0)
+        planned_values[index[key]] += quantity
+
+    done_positions, done_values = [], []
+    for done_row in done_rows:
+        key = (done_row['activity_type'], done_row['sub_activity'], normalize_key(done_row['zona']), normalize_key(done_row['row']))
+        if key not in index:
+            # Aktywność zgłoszona poza planem (np. transport kabli bez limitu)
+            index[key] = len(keys)
+            keys.append(key)
+            planned_values.append(0.0)
+        done_positions.append(index[key])
+        done_values.append(float(done_row['done'] or 0))
+
+    planned = np.array(planned_values, dtype=float)
+    done = np.zeros(len(keys), dtype=float)
+    np.add.at(done, np.array(done_positions, dtype=int), np.array(done_values, dtype=float))
+
+    percent = completion(planned, done)
+    remaining = np.maximum(planned - done, 0)
+    rows = [
+        {
+            'activity_type': key[0], 'sub_activity': key[1], 'zona': key[2], 'row': key[3],
+            'planned': float(planned[i]), 'done': float(done[i]),
+            'remaining': float(remaining[i]), 'percent': percent[i],
+        }
+        for i, key in enumerate(keys)
+    ]
+
+    sub_activity_codes, sub_activity_labels, sub_activity_index = [], [], {}
+    activity_codes, activity_labels, activity_index = [], [], {}
+    for activity_type, sub_activity, _zona, _row in keys:
+        sub_key = (activity_type, sub_activity)
+        if sub_key not in sub_activity_index:
+            sub_activity_index[sub_key] = len(sub_activity_labels)
+            sub_activity_labels.append({'activity_type': activity_type, 'sub_activity': sub_activity})
+        sub_activity_codes.append(sub_activity_index[sub_key])
+        if activity_type not in activity_index:
+            activity_index[activity_type] = len(activity_labels)
+            activity_labels.append({'activity_type': activity_type})
+        activity_codes.append(activity_index[activity_type])
+
+    # Całość liczona tylko z pozycji objętych planem
+    planned_total = float(planned.sum())
+    done_total = float(np.minimum(done, planned).sum())
+    return {
+        'rows': rows,
+        'by_sub_activity': group_totals(np.array(sub_activity_codes, dtype=int), sub_activity_labels, planned, done),
+        'by_activity': group_totals(np.array(activity_codes, dtype=int), activity_labels, planned, done),
+        'total': {
+            'planned': planned_total,
+            'done': done_total,
+            'percent': round(done_total * 100 / planned_total, 1) if planned_total else None,
+        },
+    }
+
+
+def progress_cache_key(project_id, config):
+    """Klucz cache zależny od wersji konfiguracji i stanu aktywności w raportach projektu"""
+    from ..models import ProgressReportActivity
+
+    state = ProgressReportActivity.objects.filter(report__project_id=project_id).aggregate(
+        count=Count('id'), last_change=Max('updated_at'), last_report_change=Max('report__updated_at')
+    )
+    fingerprint = '|'.join(str(part) for part in [
+        project_id, config.pk if config else None, config.updated_at.isoformat() if config else '',
+        state['count'], state['last_change'], state['last_report_change'],
+    ])
+    return f"activity_progress:{project_id}:{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()}"
+
+
+def project_progress(project_id):
+    """Zwraca postęp projektu z cache albo przelicza go, jeśli konfiguracja lub raporty się zmieniły"""
+    from ..models import ProjectActivityConfig
+    from .activity_plan import planned_quantities
+
+    config = ProjectActivityConfig.objects.filter(project_id=project_id).first()
+    key = progress_cache_key(project_id, config)
+    result = cache.get(key)
+    if result is None:
+        plan = planned_quantities(project_id)
+        if not plan and config is not None:
+            # Konfiguracja zapisana przed wprowadzeniem tabeli planu (bez rebuild_activity_plan)
+            plan = flatten_plan(config.config_data)
+        result = compute_progress(None, done_quantities(project_id), plan=plan)
+        result['project'] = int(project_id)
+        result['has_config'] = config is not None
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
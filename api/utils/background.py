@@ -0,0 +1,50 @@
+"""
+Zadania w tle wykonywane w pulach wątków procesu aplikacji.
+
+Zadanie zlecane jest po zatwierdzeniu transakcji (transaction.on_commit), więc wątek
+widzi zapisane dane, a żądanie nie czeka na jego wykonanie. Każda pula ma własną
+liczbę wątków z ustawień, aby długie zadania (konwersja Excela) nie blokowały
+krótkich (wersje zdjęć). Przy BACKGROUND_TASKS_ASYNC = False zadania wykonywane
+są od razu w bieżącym wątku (np. w testach).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(name, workers):
+    """Pula wątków o podanej nazwie tworzona przy pierwszym zleceniu"""
+    with _lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return _executors[name]
+
+
+def run_in_worker(function, *args):
+    """Wątek puli korzysta z własnego połączenia z bazą - zamykane jest po zakończeniu zadania"""
+    close_old_connections()
+    try:
+        return function(*args)
+    except Exception:
+        logger.exception("Błąd zadania w tle %s", function.__name__)
+    finally:
+        close_old_connections()
+
+
+def submit_on_commit(pool, workers, function, *args):
+    """Zleca function(*args) w puli pool po zatwierdzeniu bieżącej transakcji"""
+    def submit():
+        if getattr(settings, 'BACKGROUND_TASKS_ASYNC', True):
+            get_executor(pool, workers).submit(run_in_worker, function, *args)
+        else:
+            function(*args)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,74 @@
+"""
+Wspólna obsługa tabel przeliczanych koszykami (zestawienia zapotrzebowań,
+godziny pracy).
+
+Sygnały zgłaszają koszyki wprost lub ID dokumentów, których koszyki ustalane są
+dopiero w momencie przeliczenia. Zgłoszenia z jednej transakcji scalane są
+w jedno przeliczenie po jej zatwierdzeniu (api/utils/deferred.py).
+
+Przeliczone wiersze zapisywane są przez upsert (bulk_create z update_conflicts),
+a następnie usuwane są tylko wiersze koszyka, które zniknęły z wyniku. Dwa
+równoległe przeliczenia tego samego koszyka nie kolidują więc na ograniczeniu
+unikalności, jak przy usuwaniu i ponownym wstawianiu wierszy.
+
+Wyjątkiem są klucze z NULL (np. zapotrzebowania bez projektu) - ograniczenie
+unikalności traktuje NULL jako różne wartości, więc upsert wstawiałby przy
+każdym przeliczeniu nowy wiersz. Takie wiersze koszyka są usuwane i wstawiane
+ponownie; w MySQL usunięcie blokuje zakres indeksu, co szeregowałoby równoległe
+przeliczenia tego samego koszyka.
+"""
+from django.db import transaction
+
+from .deferred import defer_on_commit
+
+
+def schedule_bucket_refresh(name, refresh, resolve, buckets=(), ids=()):
+    """
+    Planuje refresh(koszyki) po zatwierdzeniu transakcji - raz dla wszystkich
+    zgłoszeń pod nazwą name. resolve(ids) zwraca koszyki dokumentów podanych przez ID
+    """
+    keys = {('bucket', bucket) for bucket in buckets}
+    keys |= {('id', pk) for pk in ids if pk}
+
+    def run(pending):
+        pending_buckets = {value for kind, value in pending if kind == 'bucket'}
+        pending_ids = {value for kind, value in pending if kind == 'id'}
+        refresh(pending_buckets | (resolve(pending_ids) if pending_ids else set()))
+
+    defer_on_commit(name, run, keys)
+
+
+def upsert_bucket_rows(model, bucket_filter, rows, unique_fields, update_fields):
+    """
+    Zapisuje przeliczone wiersze koszyków (filtr bucket_filter) i usuwa wiersze,
+    których nie ma już w wyniku
+    """
+    connection = transaction.get_connection()
+    key_attnames = [model._meta.get_field(name).attname for name in unique_fields]
+
+    def row_key(row):
+        return tuple(getattr(row, attname) for attname in key_attnames)
+
+    upserted = [row for row in rows if None not in row_key(row)]
+    replaced = [row for row in rows if None in row_key(row)]
+
+    with transaction.atomic():
+        if upserted:
+            model.objects.bulk_create(
+                upserted,
+                update_conflicts=True,
+                # MySQL (ON DUPLICATE KEY UPDATE) nie przyjmuje listy pól unikalnych
+                unique_fields=unique_fields if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=update_fields,
+            )
+
+        # Wiersze z NULL w kluczu nie są dopasowywane - usuwane są wszystkie i wstawiane od nowa
+        current_keys = {row_key(row) for row in upserted}
+        stale_ids = [
+            pk for pk, *key in model.objects.filter(bucket_filter).values_list('pk', *key_attnames)
+            if tuple(key) not in current_keys
+        ]
+        if stale_ids:
+            model.objects.filter(pk__in=stale_ids).delete()
+        if replaced:
+            model.objects.bulk_create(replaced)
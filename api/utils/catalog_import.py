@@ -0,0 +1,249 @@
+"""
+Import katalogu przedmiotów (Item) z pliku XLSX lub CSV.
+
+Plik musi zawierać wiersz nagłówka z kolumnami: Nazwa, Obszar oraz opcjonalnie
+Cena i Indeks (akceptowane są też nazwy angielskie: name, area, price, index).
+Walidacja unikalności odbywa się jednym zapytaniem, brakujące indeksy są
+przydzielane blokiem z sekwencji, a zapis wykonuje bulk_create.
+
+Nazwy i indeksy porównywane są tak jak w bazie (MySQL: bez rozróżniania
+wielkości liter i znaków diakrytycznych), więc Kabel i kabel są duplikatem.
+"""
+import csv
+import io
+import os
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.db import transaction, IntegrityError
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from ..models import Item
+from .conditional import bump_version
+from .numbering import reserve_numbers, advance_counter
+
+# Rozmiar partii dla bulk_create
+IMPORT_BATCH_SIZE = 1000
+
+COLUMN_ALIASES = {
+    'nazwa': 'name',
+    'name': 'name',
+    'obszar': 'area',
+    'area': 'area',
+    'cena': 'price',
+    'price': 'price',
+    'indeks': 'index',
+    'index': 'index',
+}
+
+
+class CatalogImportError(Exception):
+    """Błąd importu katalogu - zawiera listę błędów z numerami wierszy"""
+
+    def __init__(self, errors):
+        super().__init__(f"Import katalogu zawiera błędy ({len(errors)})")
+        self.errors = errors
+
+
+def read_rows(uploaded_file):
+    """Zwraca iterator wierszy (krotek wartości) z pliku XLSX lub CSV, łącznie z nagłówkiem"""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+
+    if extension in ('.xlsx', '.xlsm'):
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        return workbook.active.iter_rows(values_only=True)
+
+    if extension == '.csv':
+        text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        return csv.reader(text, dialect)
+
+    raise CatalogImportError([{'row': None, 'message': 'Obsługiwane formaty plików to XLSX i CSV'}])
+
+
+def match_key(value):
+    """Klucz porównania nazwy lub indeksu - bez wielkości liter i znaków diakrytycznych"""
+    return ''.join(char for char in unicodedata.normalize('NFKD', value.casefold()) if not unicodedata.combining(char))
+
+
+def cell_text(value):
+    """Tekst komórki - liczby całkowite z XLSX (np. indeks 123.0) zapisywane bez części dziesiętnej"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def database_conflicts(entries):
+    """
+    Błędy dla nazw i indeksów wierszy istniejących już w bazie - jedno zapytanie.
+    Lower dopasowuje wielkość liter także w bazach porównujących tekst dokładnie (SQLite, PostgreSQL)
+    """
+    names, indexes = {}, {}
+    for entry in entries:
+        names.setdefault(match_key(entry['name']), entry['row'])
+        if entry['index']:
+            indexes.setdefault(match_key(entry['index']), entry['row'])
+    raw_names = [entry['name'] for entry in entries]
+    raw_indexes = [entry['index'] for entry in entries if entry['index']]
+
+    errors = []
+    conflicts = Item.objects.annotate(lower_name=Lower('name'), lower_index=Lower('index')).filter(
+        Q(name__in=raw_names) | Q(index__in=raw_indexes) |
+        Q(lower_name__in=list(names)) | Q(lower_index__in=list(indexes))
+    ).values_list('name', 'index')
+    for existing_name, existing_index in conflicts:
+        if match_key(existing_name) in names:
+            errors.append({'row': names[match_key(existing_name)], 'message': f"Przedmiot o nazwie {existing_name} już istnieje"})
+        if match_key(existing_index) in indexes:
+            errors.append({'row': indexes[match_key(existing_index)], 'message': f"Przedmiot o indeksie {existing_index} już istnieje"})
+    return errors
+
+
+def parse_catalog(rows):
+    """
+    Waliduje wiersze katalogu i zwraca listę słowników z polami przedmiotu.
+    Rzuca CatalogImportError ze wszystkimi znalezionymi błędami.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if not header:
+        raise CatalogImportError([{'row': None, 'message': 'Plik jest pusty'}])
+
+    columns = {}
+    for position, title in enumerate(header):
+        key = COLUMN_ALIASES.get(str(title or '').strip().lower())
+        if key:
+            columns[key] = position
+
+    missing = [name for name in ('name', 'area') if name not in columns]
+    if missing:
+        raise CatalogImportError([{'row': 1, 'message': f"Brak wymaganych kolumn: {', '.join(missing)}"}])
+
+    area_values = {}
+    for value, label in Item.AREA_CHOICES:
+        area_values[value.lower()] = value
+        area_values[label.lower()] = value
+
+    name_length = Item._meta.get_field('name').max_length
+    index_length = Item._meta.get_field('index').max_length
+    price_field = Item._meta.get_field('price')
+    price_limit = Decimal(10) ** (price_field.max_digits - price_field.decimal_places)
+
+    def cell(row, key):
+        position = columns.get(key)
+        if position is None or position >= len(row):
+            return ''
+        return cell_text(row[position])
+
+    parsed, errors = [], []
+    for row_number, row in enumerate(rows, 2):
+        if not any(value not in (None, '') for value in row):
+            continue
+
+        name = cell(row, 'name')
+        area = area_values.get(cell(row, 'area').lower())
+        index = cell(row, 'index')
+        price_text = cell(row, 'price').replace(',', '.')
+
+        if not name:
+            errors.append({'row': row_number, 'message': 'Nazwa jest wymagana'})
+        elif len(name) > name_length:
+            errors.append({'row': row_number, 'message': f"Nazwa może mieć najwyżej {name_length} znaków"})
+        if len(index) > index_length:
+            errors.append({'row': row_number, 'message': f"Indeks może mieć najwyżej {index_length} znaków"})
+        if not area:
+            errors.append({'row': row_number, 'message': f"Nieprawidłowy obszar: {cell(row, 'area')}"})
+
+        price = None
+        if price_text:
+            try:
+                price = Decimal(price_text)
+                # NaN i Infinity przechodzą przez Decimal(), ale nie zmieszczą się w kolumnie
+                if not price.is_finite() or abs(price) >= price_limit:
+                    raise InvalidOperation
+                price = price.quantize(Decimal('0.01'))
+            except InvalidOperation:
+                price = None
+                errors.append({'row': row_number, 'message': f"Nieprawidłowa cena: {price_text}"})
+
+        parsed.append({'row': row_number, 'name': name, 'area': area, 'price': price, 'index': index})
+
+    # Unikalność w obrębie pliku
+    seen_names, seen_indexes = {}, {}
+    for entry in parsed:
+        name_key = match_key(entry['name'])
+        if name_key in seen_names:
+            errors.append({'row': entry['row'], 'message': f"Nazwa powtórzona w pliku (wiersz {seen_names[name_key]})"})
+        seen_names.setdefault(name_key, entry['row'])
+        if entry['index']:
+            index_key = match_key(entry['index'])
+            if index_key in seen_indexes:
+                errors.append({'row': entry['row'], 'message': f"Indeks powtórzony w pliku (wiersz {seen_indexes[index_key]})"})
+            seen_indexes.setdefault(index_key, entry['row'])
+
+    errors += database_conflicts(parsed)
+
+    if errors:
+        raise CatalogImportError(sorted(errors, key=lambda error: error['row'] or 0))
+
+    return parsed
+
+
+def import_catalog(uploaded_file, user):
+    """
+    Importuje katalog przedmiotów z pliku. Import jest atomowy - przy błędach nic nie jest zapisywane.
+
+    Returns:
+        int: Liczba utworzonych przedmiotów
+    """
+    entries = parse_catalog(read_rows(uploaded_file))
+    if not entries:
+        return 0
+
+    try:
+        save_catalog(entries, user)
+    except IntegrityError:
+        # Kolizja mimo walidacji (np. przedmiot dodany równolegle) - błąd wskazuje wiersz pliku
+        raise CatalogImportError(database_conflicts(entries) or [
+            {'row': None, 'message': 'Nazwa lub indeks koliduje z istniejącym przedmiotem'}
+        ])
+    return len(entries)
+
+
+def save_catalog(entries, user):
+    """Zapisuje zwalidowane wiersze katalogu w jednej transakcji"""
+    with transaction.atomic():
+        # Jawnie podane indeksy numeryczne przesuwają sekwencję, aby kolejne przydziały nie kolidowały
+        explicit_numbers = [int(entry['index']) for entry in entries if entry['index'].isdecimal()]
+        if explicit_numbers:
+            advance_counter(Item.INDEX_SEQUENCE, max(explicit_numbers), initial=Item.max_numeric_index)
+
+        # Indeksy dla wierszy bez indeksu przydzielane jednym blokiem z sekwencji
+        without_index = [entry for entry in entries if not entry['index']]
+        if without_index:
+            numbers = reserve_numbers(Item.INDEX_SEQUENCE, len(without_index), initial=Item.max_numeric_index)
+            for entry, number in zip(without_index, numbers):
+                entry['index'] = Item.format_index(number)
+
+        Item.objects.bulk_create([
+            Item(
+                name=entry['name'],
+                area=entry['area'],
+                price=entry['price'],
+                index=entry['index'],
+                created_by=user,
+                updated_by=user
+            )
+            for entry in entries
+        ], batch_size=IMPORT_BATCH_SIZE)
+        # bulk_create nie wysyła sygnałów - wersja tabeli dla walidatorów ETag podbijana jawnie
+        bump_version(Item)
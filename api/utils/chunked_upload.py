@@ -0,0 +1,175 @@
+"""
+Przesyłanie plików w częściach z możliwością wznowienia.
+
+Klient rozpoczyna przesyłanie (rozmiar, nazwa, opcjonalnie SHA-256 całego pliku),
+a następnie wysyła kolejne części żądaniami PUT z nagłówkiem Upload-Offset.
+Część jest zapisywana strumieniowo do pliku tymczasowego blokami READ_BLOCK
+z liczoną na bieżąco sumą SHA-256 (porównywaną z nagłówkiem Upload-Checksum),
+a przesunięcie potwierdzane jest dopiero po zapisaniu danych na dysk.
+Po przerwaniu połączenia klient pyta o stan i wznawia od ostatniego
+potwierdzonego przesunięcia - niepotwierdzone bajty są obcinane.
+
+Zapis części rezerwowany jest warunkowym UPDATE (claim_chunk) zamiast blokady
+wiersza trzymanej w transakcji przez cały czas odbierania danych - ponowione
+żądanie dostaje od razu 409 zamiast czekać na blokadę (błąd 1205 w MySQL).
+Rezerwacja przerwanego żądania wygasa po CLAIM_TIMEOUT.
+"""
+import datetime
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+# Sugerowany rozmiar części i limity
+CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_FILE_SIZE = 200 * 1024 * 1024
+READ_BLOCK = 64 * 1024
+
+# Po jakim czasie nieukończone przesyłania są usuwane
+UPLOAD_RETENTION = datetime.timedelta(days=2)
+
+# Po jakim czasie rezerwacja zapisu części (np. zerwanego żądania) może zostać przejęta
+CLAIM_TIMEOUT = datetime.timedelta(minutes=5)
+
+
+class ChunkError(Exception):
+    """Część pliku jest niekompletna, za duża lub ma niezgodną sumę kontrolną"""
+
+
+def upload_dir():
+    return getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'tmp', 'chunked_uploads'))
+
+
+def upload_path(upload):
+    return os.path.join(upload_dir(), f"{upload.upload_id}.part")
+
+
+def upload_state(upload):
+    """Stan przesyłania zwracany klientowi"""
+    return {
+        'upload_id': str(upload.upload_id),
+        'target': upload.target,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'chunk_size': CHUNK_SIZE,
+        'result': upload.result,
+    }
+
+
+def claim_chunk(upload, offset):
+    """
+    Rezerwuje zapis części od przesunięcia offset. Zwraca False, jeśli przesunięcie
+    jest nieaktualne, przesyłanie zakończone albo inna część jest właśnie zapisywana
+    """
+    from ..models import ChunkedUpload
+
+    now = timezone.now()
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, offset=offset, status='uploading').filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_TIMEOUT)
+    ).update(claimed_at=now, updated_at=now)
+    if claimed:
+        upload.offset, upload.claimed_at = offset, now
+    return bool(claimed)
+
+
+def release_chunk(upload, offset=None):
+    """
+    Zwalnia rezerwację, opcjonalnie potwierdzając nowe przesunięcie.
+    Zwraca False, jeśli rezerwacja wygasła i została przejęta przez inne żądanie
+    """
+    from ..models import ChunkedUpload
+
+    values = {'claimed_at': None, 'updated_at': timezone.now()}
+    if offset is not None:
+        values['offset'] = offset
+    released = ChunkedUpload.objects.filter(pk=upload.pk, claimed_at=upload.claimed_at).update(**values)
+    upload.claimed_at = None
+    if released and offset is not None:
+        upload.offset = offset
+    return bool(released)
+
+
+def write_chunk(upload, stream, length, checksum=None):
+    """
+    Dopisuje część od potwierdzonego przesunięcia, czytając strumień blokami.
+    Zwraca nowe przesunięcie. Przy błędzie plik jest przycinany do poprzedniego stanu.
+    """
+    if length <= 0 or length > MAX_CHUNK_SIZE:
+        raise ChunkError(f"Rozmiar części musi wynosić od 1 do {MAX_CHUNK_SIZE} bajtów")
+    if upload.offset + length > upload.size:
+        raise ChunkError("Część wykracza poza zadeklarowany rozmiar pliku")
+
+    path = upload_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as target:
+        # Bajty zapisane po ostatnim potwierdzeniu (przerwane żądanie) są odrzucane
+        target.seek(upload.offset)
+        target.truncate()
+        while written < length:
+            block = stream.read(min(READ_BLOCK, length - written)) if stream else b''
+            if not block:
+                break
+            digest.update(block)
+            target.write(block)
+            written += len(block)
+
+        if written != length or (checksum and digest.hexdigest() != checksum.lower()):
+            target.truncate(upload.offset)
+            raise ChunkError(
+                "Niekompletna część pliku" if written != length else "Suma kontrolna części jest nieprawidłowa"
+            )
+        target.flush()
+        os.fsync(target.fileno())
+
+    return upload.offset + written
+
+
+def file_checksum(path):
+    """SHA-256 pliku liczona strumieniowo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssembledFile(File):
+    """
+    Złożony plik na dysku. Udostępnia temporary_file_path, więc walidacja zdjęć
+    nie wczytuje go do pamięci, a FileSystemStorage przenosi go zamiast kopiować.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def open_assembled(upload):
+    return AssembledFile(open(upload_path(upload), 'rb'), name=upload.filename)
+
+
+def remove_file(upload):
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads():
+    """Usuwa przesyłania nieaktualizowane dłużej niż okres przechowywania wraz z plikami. Zwraca ich liczbę"""
+    from ..models import ChunkedUpload
+
+    stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - UPLOAD_RETENTION)
+    count = 0
+    for upload in stale.iterator():
+        remove_file(upload)
+        upload.delete()
+        count += 1
+    return count
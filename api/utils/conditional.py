@@ -0,0 +1,56 @@
+"""
+Wersje tabel powiązanych dla walidatorów warunkowych GET (ConditionalGetMixin w api/views.py).
+
+Serializery zwracają dane z innych tabel (nazwa projektu, przedmiotu,
+pracownika, autora). Ich zmiana nie zmienia znaczników czasu wierszy widoku,
+więc ETag obejmuje też wersje tabel powiązanych (TableVersion). Wersja tabeli
+podbijana jest sygnałem przy zapisie i usunięciu wiersza, a zapisy zbiorcze
+z pominięciem sygnałów (np. import katalogu) podbijają ją jawnie.
+
+Wersje dołączane są do zapytania walidatora jako podzapytania po kluczu
+unikalnym, więc walidator pozostaje jednym zapytaniem bez przeglądania tabel.
+Przy pustym zbiorze danych podzapytania dają NULL - odpowiedź i tak nie
+zawiera wtedy danych powiązanych.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, F, Max, PositiveBigIntegerField, Subquery
+from django.utils import timezone
+
+
+def table_name(model):
+    return model._meta.label_lower
+
+
+def bump_version(model):
+    """Podbija wersję tabeli modelu (wiersz wersji tworzony przy pierwszej zmianie)"""
+    from ..models import TableVersion
+
+    versions = TableVersion.objects.filter(table=table_name(model))
+    # Jak przy licznikach numeracji: UPDATE brakującego wiersza w MySQL zakłada blokadę luki
+    if not versions.exists():
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=table_name(model))
+        except IntegrityError:
+            pass
+    versions.update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def related_aggregates(models):
+    """
+    Zwraca agregaty wersji tabel powiązanych do dołączenia do zapytania walidatora:
+    {nazwa: (agregat, czy to znacznik czasu)}
+    """
+    from ..models import TableVersion
+
+    aggregates = {}
+    for model in models:
+        versions = TableVersion.objects.filter(table=table_name(model))
+        name = table_name(model).replace('.', '_')
+        aggregates[f'related_{name}_version'] = (
+            Max(Subquery(versions.values('version')[:1], output_field=PositiveBigIntegerField())), False
+        )
+        aggregates[f'related_{name}_updated'] = (
+            Max(Subquery(versions.values('updated_at')[:1], output_field=DateTimeField())), True
+        )
+    return aggregates
@@ -0,0 +1,175 @@
+"""
+Import konfiguracji aktywności projektu z pliku Excel (ActivityConfigImport).
+
+Żądanie zapisuje tylko przesłany plik i zadanie w kolejce - konwersja
+(excel_to_activities_json) wykonywana jest w puli wątków w tle. Zadanie
+raportuje postęp po każdym arkuszu, a wynik po walidacji zapisywany jest
+w ProjectActivityConfig w jednej transakcji razem ze statusem zadania.
+
+Zadanie przywrócone do kolejki (requeue_stale_imports) mogło zostać przejęte
+ponownie, choć pierwszy wykonawca nadal działa. Każdy zapis wykonawcy jest
+więc warunkowy względem przejęcia (status 'running' i jego started_at) -
+wykonawca, który utracił zadanie, niczego już nie zapisuje.
+"""
+import datetime
+import json
+import logging
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .activity_converter import excel_to_activities_json
+from .activity_plan import oversized_keys
+from .background import submit_on_commit
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = ('.xlsx', '.xlsm')
+MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# Zadanie w trakcie bez zmian dłużej niż ten czas uznawane jest za przerwane (restart procesu)
+STALE_AFTER = datetime.timedelta(minutes=30)
+
+# Sekcje konfiguracji i arkusze, z których pochodzą (do komunikatów walidacji)
+SECTIONS = {
+    'logistyka': 'Logistyka',
+    'moduly': 'Moduły',
+}
+
+
+class ImportValidationError(Exception):
+    """Plik nie zawiera poprawnego układu projektu"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def validate_upload(uploaded_file):
+    """Zwraca listę błędów przesłanego pliku (rozszerzenie i rozmiar)"""
+    errors = []
+    if os.path.splitext(uploaded_file.name)[1].lower() not in ALLOWED_EXTENSIONS:
+        errors.append(f"Dozwolone pliki: {', '.join(ALLOWED_EXTENSIONS)}")
+    if uploaded_file.size > MAX_FILE_SIZE:
+        errors.append(f"Plik jest większy niż {MAX_FILE_SIZE // (1024 * 1024)} MB")
+    return errors
+
+
+def schedule_import(job):
+    """Zleca konwersję po zatwierdzeniu transakcji (pula ACTIVITY_IMPORT_WORKERS wątków)"""
+    submit_on_commit('activity-imports', getattr(settings, 'ACTIVITY_IMPORT_WORKERS', 1), run_import, job.pk)
+
+
+def validate_config(config_data):
+    """Sprawdza wynik konwersji. Zwraca (dane gotowe do zapisu w JSONField, ostrzeżenia)"""
+    if config_data.get('typ_projektu') != 'Ground':
+        raise ImportValidationError([config_data.get('message') or "Obsługiwane są tylko projekty typu Ground"])
+
+    sheets = dict(SECTIONS)
+    sections = {key: config_data.get(key) for key in SECTIONS if key in config_data}
+    for key, records in (config_data.get('transport') or {}).items():
+        sections[f'transport.{key}'] = records
+        sheets[f'transport.{key}'] = f'Transport {key}'
+    for key, records in (config_data.get('konstrukcja') or {}).items():
+        sections[f'konstrukcja.{key}'] = records
+        sheets[f'konstrukcja.{key}'] = f'Konstrukcja - {key}'
+
+    if not any(sections.values()):
+        raise ImportValidationError([
+            "Plik nie zawiera danych - wymagane arkusze Logistyka, Moduły, Transport * "
+            "lub Konstrukcja - * z kolumnami Zona i Rząd"
+        ])
+    warnings = [
+        f"Arkusz {sheets[key]}: brak wierszy z kolumnami Zona i Rząd"
+        for key, records in sections.items() if not records
+    ]
+
+    try:
+        # Wartości komórek (np. daty) w postaci zapisywalnej w JSONField
+        config_data = json.loads(json.dumps(config_data, cls=DjangoJSONEncoder))
+    except (TypeError, ValueError) as e:
+        raise ImportValidationError([f"Nieobsługiwana wartość komórki: {e}"])
+
+    # Klucze planu muszą mieścić się w kolumnach ActivityPlanItem (plan_rows przycina je po cichu)
+    errors = oversized_keys(config_data)
+    if errors:
+        raise ImportValidationError(errors)
+    return config_data, warnings
+
+
+def fail(owned, errors):
+    owned.update(status='failed', errors=errors, finished_at=timezone.now(), updated_at=timezone.now())
+
+
+def run_import(job_id):
+    """Wykonuje zadanie importu, jeśli nadal czeka w kolejce"""
+    from ..models import ActivityConfigImport, ProjectActivityConfig
+
+    # Przejęcie zadania warunkową aktualizacją - to samo zadanie nie zostanie wykonane dwa razy
+    started_at = timezone.now()
+    claimed = ActivityConfigImport.objects.filter(pk=job_id, status='queued').update(
+        status='running', progress=1, started_at=started_at, updated_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = ActivityConfigImport.objects.select_related('project').get(pk=job_id)
+    # Zadanie nadal należy do tego wykonawcy (nie zostało przywrócone do kolejki i przejęte ponownie)
+    owned = ActivityConfigImport.objects.filter(pk=job_id, status='running', started_at=started_at)
+
+    def progress(sheet_name, done, total):
+        owned.update(
+            progress=5 + 90 * done // max(total, 1), current_sheet=sheet_name, updated_at=timezone.now()
+        )
+
+    try:
+        with job.file.open('rb') as excel_file:
+            config_data = excel_to_activities_json(excel_file, progress=progress)
+        config_data, warnings = validate_config(config_data)
+    except ImportValidationError as e:
+        fail(owned, e.errors)
+        return
+    except KeyError as e:
+        fail(owned, [f"Brak wymaganego arkusza: {e.args[0] if e.args else e}"])
+        return
+    except (InvalidFileException, zipfile.BadZipFile) as e:
+        fail(owned, [f"Nieprawidłowy plik Excel: {e}"])
+        return
+    except ValueError as e:
+        # Np. nieznany typ projektu w arkuszu Info
+        fail(owned, [str(e)])
+        return
+    except Exception as e:
+        logger.exception("Błąd importu konfiguracji aktywności %s", job_id)
+        fail(owned, [f"Błąd konwersji: {e}"])
+        return
+
+    with transaction.atomic():
+        # Zmiana statusu jako pierwsza blokuje wiersz zadania do końca transakcji,
+        # więc równoległe przywrócenie do kolejki czeka albo już wyklucza ten zapis
+        finished = owned.update(
+            status='succeeded', progress=100, current_sheet='', warnings=warnings,
+            finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        if not finished:
+            logger.warning("Import konfiguracji aktywności %s przejęty ponownie - wynik pominięty", job_id)
+            return
+        config, created = ProjectActivityConfig.objects.update_or_create(
+            project=job.project,
+            defaults={'config_data': config_data, 'updated_by': job.created_by},
+            create_defaults={'config_data': config_data, 'created_by': job.created_by, 'updated_by': job.created_by}
+        )
+        ActivityConfigImport.objects.filter(pk=job_id).update(config=config)
+
+
+def requeue_stale_imports():
+    """Przywraca do kolejki zadania przerwane restartem procesu. Zwraca ich liczbę"""
+    from ..models import ActivityConfigImport
+
+    return ActivityConfigImport.objects.filter(
+        status='running', updated_at__lt=timezone.now() - STALE_AFTER
+    ).update(status='queued', progress=0, current_sheet='', updated_at=timezone.now())
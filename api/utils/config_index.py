@@ -0,0 +1,190 @@
+"""
+Indeks konfiguracji aktywności projektu (ProjectActivityConfig.index_data).
+
+Formularz aktywności potrzebuje tylko fragmentu konfiguracji: listy zon dla
+podaktywności, rzędów w zonie z planowaną ilością albo stołów w rzędzie.
+Indeks budowany jest przy zapisie konfiguracji - według tych samych reguł co
+postęp prac (api/utils/activity_progress.py) - a widok zwraca z niego tylko
+żądany wycinek, zamiast przesyłać i przeszukiwać cały dokument na telefonie.
+
+Struktura indeksu:
+    activities[typ aktywności] = {
+        'sub_activities': [...],
+        'unlimited': [...],    # podaktywności bez planowanej ilości, dostępne w każdym rzędzie
+        'zonas': {zona: {rząd: {podaktywność: planowana ilość}}},
+        'tables': {zona: {rząd: {numer stołu: liczba modułów}}},   # tylko Moduły
+    }
+Klucze są tekstem (normalize_key), a kolejność zon i rzędów ustalana jest
+przy odczycie - baza nie zachowuje kolejności kluczy obiektu JSON.
+"""
+import re
+
+from .activity_progress import (
+    CONSTRUCTION_SUB_ACTIVITIES, LOGISTICS_FIELDS, STRUCTURE_FIELDS, normalize_key, to_quantity
+)
+
+# Zmiana struktury indeksu wymusza jego przebudowę przy odczycie
+INDEX_VERSION = 1
+
+LOGISTICS_UNLIMITED = ['Transport kabli']
+MODULE_SUB_ACTIVITY = 'Montaż modułów'
+FINISHING_SUB_ACTIVITIES = ['Kontrola jakości', 'Markerowanie', 'Sprzątanie']
+
+ACTIVITY_TYPES = ['Logistyka', 'Konstrukcja', 'Moduły', 'Zakończenie budowy']
+
+
+class ConfigSliceError(Exception):
+    """Żądany fragment nie występuje w konfiguracji projektu"""
+
+
+def natural_key(value):
+    """Zony, rzędy i stoły liczbowe sortowane numerycznie, pozostałe alfabetycznie"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', value) if part]
+
+
+def sorted_keys(mapping):
+    return sorted(mapping, key=natural_key)
+
+
+def config_rows(rows):
+    """Wiersze sekcji konfiguracji z zoną i rzędem jako (zona, rząd, wiersz)"""
+    for row in rows or []:
+        if isinstance(row, dict) and 'zona' in row and 'rzad' in row:
+            yield normalize_key(row['zona']), normalize_key(row['rzad']), row
+
+
+def add_planned(zonas, zona, rzad, sub_activity, quantity):
+    planned = zonas.setdefault(zona, {}).setdefault(rzad, {})
+    planned[sub_activity] = planned.get(sub_activity, 0.0) + quantity
+
+
+def build_index(config_data):
+    """Buduje indeks z config_data (pusty dla konfiguracji bez danych)"""
+    activities = {}
+    if not isinstance(config_data, dict):
+        return {'version': INDEX_VERSION, 'activities': activities}
+
+    logistics = {}
+    for zona, rzad, row in config_rows(config_data.get('logistyka')):
+        logistics.setdefault(zona, {}).setdefault(rzad, {})
+        for sub_activity, field in LOGISTICS_FIELDS.items():
+            if field in row:
+                add_planned(logistics, zona, rzad, sub_activity, to_quantity(row[field]))
+    if logistics:
+        activities['Logistyka'] = {
+            'sub_activities': list(LOGISTICS_FIELDS)[:2] + LOGISTICS_UNLIMITED + list(LOGISTICS_FIELDS)[2:],
+            'unlimited': LOGISTICS_UNLIMITED,
+            'zonas': logistics,
+        }
+
+    construction, construction_sub_activities = {}, []
+    for construction_type, rows in (config_data.get('konstrukcja') or {}).items():
+        fields = {name: 'ilość' for name in CONSTRUCTION_SUB_ACTIVITIES.get(construction_type, [])}
+        construction_sub_activities += [name for name in fields if name not in construction_sub_activities]
+        fields.update(STRUCTURE_FIELDS)
+        for zona, rzad, row in config_rows(rows):
+            construction.setdefault(zona, {}).setdefault(rzad, {})
+            for sub_activity, field in fields.items():
+                if field in row:
+                    add_planned(construction, zona, rzad, sub_activity, to_quantity(row[field]))
+    if construction:
+        activities['Konstrukcja'] = {
+            'sub_activities': construction_sub_activities + list(STRUCTURE_FIELDS),
+            'unlimited': [],
+            'zonas': construction,
+        }
+
+    modules, tables = {}, {}
+    for zona, rzad, row in config_rows(config_data.get('moduly')):
+        add_planned(modules, zona, rzad, MODULE_SUB_ACTIVITY, 0.0)
+        row_tables = tables.setdefault(zona, {}).setdefault(rzad, {})
+        for table in row.get('stoly') or []:
+            if not isinstance(table, dict):
+                continue
+            number = table.get('numer_stolu', table.get('numer'))
+            quantity = to_quantity(table.get('ilosc_modulow'))
+            if number is not None:
+                key = normalize_key(number)
+                row_tables[key] = row_tables.get(key, 0.0) + quantity
+            add_planned(modules, zona, rzad, MODULE_SUB_ACTIVITY, quantity)
+    if modules:
+        activities['Moduły'] = {
+            'sub_activities': [MODULE_SUB_ACTIVITY],
+            'unlimited': [],
+            'zonas': modules,
+            'tables': tables,
+        }
+
+    # Zakończenie budowy obejmuje wszystkie rzędy projektu, bez planowanych ilości
+    finishing = {}
+    for activity in activities.values():
+        for zona, rows in activity['zonas'].items():
+            finishing.setdefault(zona, {}).update({rzad: {} for rzad in rows})
+    activities['Zakończenie budowy'] = {
+        'sub_activities': FINISHING_SUB_ACTIVITIES,
+        'unlimited': FINISHING_SUB_ACTIVITIES,
+        'zonas': finishing,
+    }
+
+    return {'version': INDEX_VERSION, 'activities': activities}
+
+
+def project_index(config):
+    """Indeks konfiguracji - przebudowywany i zapisywany, jeśli brakuje go lub ma starą wersję"""
+    if not config.index_data or config.index_data.get('version') != INDEX_VERSION:
+        config.index_data = build_index(config.config_data)
+        type(config).objects.filter(pk=config.pk).update(index_data=config.index_data)
+    return config.index_data
+
+
+def has_sub_activity(activity, planned, sub_activity):
+    return not sub_activity or sub_activity in planned or sub_activity in activity['unlimited']
+
+
+def config_slice(index, activity_type=None, sub_activity=None, zona=None, row=None):
+    """
+    Zwraca fragment indeksu dla wybranego poziomu formularza:
+    bez typu - typy aktywności; z typem - podaktywności i zony; z zoną - rzędy
+    z planowaną ilością; z rzędem - planowaną ilość i stoły (Moduły)
+    """
+    activities = index.get('activities', {})
+    if not activity_type:
+        return {'activity_types': [name for name in ACTIVITY_TYPES if name in activities]}
+
+    activity = activities.get(activity_type)
+    if activity is None:
+        raise ConfigSliceError(f"Aktywność {activity_type} nie występuje w konfiguracji projektu")
+    if sub_activity and sub_activity not in activity['sub_activities']:
+        raise ConfigSliceError(f"Podaktywność {sub_activity} nie występuje w aktywności {activity_type}")
+
+    zonas = activity['zonas']
+    if zona is None:
+        available = [
+            key for key in sorted_keys(zonas)
+            if any(has_sub_activity(activity, planned, sub_activity) for planned in zonas[key].values())
+        ]
+        return {'sub_activities': activity['sub_activities'], 'zonas': available}
+
+    zona = normalize_key(zona)
+    if zona not in zonas:
+        raise ConfigSliceError(f"Zona {zona} nie występuje w aktywności {activity_type}")
+    rows = zonas[zona]
+    if row is None:
+        return {
+            'zona': zona,
+            'rows': [
+                {'row': key, 'planned': rows[key].get(sub_activity) if sub_activity else None}
+                for key in sorted_keys(rows) if has_sub_activity(activity, rows[key], sub_activity)
+            ],
+        }
+
+    row = normalize_key(row)
+    if row not in rows:
+        raise ConfigSliceError(f"Rząd {row} nie występuje w zonie {zona}")
+    tables = activity.get('tables', {}).get(zona, {}).get(row, {})
+    return {
+        'zona': zona,
+        'row': row,
+        'planned': rows[row].get(sub_activity) if sub_activity else None,
+        'tables': [{'table': key, 'planned': tables[key]} for key in sorted_keys(tables)],
+    }
@@ -0,0 +1,43 @@
+"""
+Przeliczenia zlecane po zatwierdzeniu transakcji i scalane w jej obrębie.
+
+Sygnały pojedynczych wierszy (np. pozycji zapotrzebowania) zgłaszają klucze
+do przeliczenia. Klucze zgłoszone w tej samej transakcji trafiają do jednego
+zbioru, a przeliczenie rejestrowane jest w transaction.on_commit tylko raz,
+więc zapis 40 pozycji uruchamia jedno przeliczenie, a nie 40.
+
+Jeśli wycofanie punktu zapisu usunie zarejestrowane przeliczenie, kolejne
+zgłoszenie rejestruje nowe. Przeliczenia są idempotentne, więc klucz
+pozostały po wycofaniu powoduje co najwyżej zbędne przeliczenie.
+"""
+from django.db import transaction
+
+
+def defer_on_commit(name, function, keys):
+    """Dodaje klucze do zbioru przeliczenia name i wywołuje function(zbiór) raz po zatwierdzeniu transakcji"""
+    keys = set(keys)
+    if not keys:
+        return
+
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # Poza transakcją on_commit wykonałby przeliczenie od razu
+        function(keys)
+        return
+
+    pending = connection.__dict__.setdefault('_deferred_on_commit', {})
+    entry = pending.get(name)
+    registered = entry is not None and any(item[1] is entry[0] for item in connection.run_on_commit)
+    if not registered:
+        collected = set()
+
+        def run():
+            if pending.get(name, (None,))[0] is run:
+                del pending[name]
+            function(collected)
+
+        entry = (run, collected)
+        pending[name] = entry
+        transaction.on_commit(run)
+
+    entry[1].update(keys)
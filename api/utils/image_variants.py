@@ -0,0 +1,137 @@
+"""
+Pomniejszone wersje przesłanych zdjęć (miniatura i wersja średnia).
+
+Zdjęcia z telefonów zapisywane są w pełnej rozdzielczości. Po zatwierdzeniu
+transakcji zapisu zdjęcia generowanie wersji zlecane jest puli wątków
+(api/utils/background.py), więc nie wydłuża żądania. Wersje są obracane według orientacji z EXIF i zapisywane
+bez metadanych (lokalizacja GPS, model telefonu) w formacie WebP, a jeśli
+Pillow nie obsługuje WebP - w JPEG.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .background import run_in_worker, submit_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Pole wersji w modelu i maksymalny dłuższy bok w pikselach
+VARIANTS = {
+    'thumbnail': 320,
+    'medium': 1280,
+}
+
+QUALITY = 80
+
+def output_format():
+    """Zwraca (format Pillow, rozszerzenie pliku) dla zapisywanych wersji"""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def open_source(field_file):
+    """Otwiera oryginał, obraca go według EXIF i sprowadza do RGB"""
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        image.load()
+    return image
+
+
+def render_variant(image, max_size, image_format):
+    """Zwraca bajty pomniejszonej kopii zdjęcia bez metadanych"""
+    variant = image.copy()
+    variant.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+
+    # Zapis bez przekazania exif/icc_profile - metadane oryginału nie trafiają do pliku
+    variant.info = {}
+    buffer = io.BytesIO()
+    variant.save(buffer, format=image_format, quality=QUALITY)
+    return buffer.getvalue()
+
+
+def generate_variants(instance, force=False):
+    """
+    Tworzy brakujące wersje zdjęcia (wszystkie przy force=True).
+    Zwraca listę nazw utworzonych wersji
+    """
+    if not instance.image:
+        return []
+    missing = [name for name in VARIANTS if force or not getattr(instance, name)]
+    if not missing:
+        return []
+
+    image = open_source(instance.image)
+    image_format, extension = output_format()
+    base_name = os.path.splitext(os.path.basename(instance.image.name))[0]
+
+    for name in missing:
+        previous = getattr(instance, name)
+        if previous:
+            previous.delete(save=False)
+        content = ContentFile(render_variant(image, VARIANTS[name], image_format))
+        getattr(instance, name).save(f"{base_name}_{name}.{extension}", content, save=False)
+
+    # Zmiana updated_at unieważnia ETag listy i przekazuje adresy wersji synchronizacji przyrostowej
+    instance.save(update_fields=missing + ['updated_at'])
+    return missing
+
+
+def process(model, pk, force=False):
+    """
+    Generuje wersje zdjęcia - błędy pliku są logowane, a nie przerywają pracy puli.
+    Zwraca listę nazw utworzonych wersji
+    """
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is not None:
+            return generate_variants(instance, force=force)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.exception("Nie udało się utworzyć wersji zdjęcia %s %s", model._meta.label, pk)
+    return []
+
+
+def process_in_worker(model, pk, force=False):
+    return run_in_worker(process, model, pk, force) or []
+
+
+def schedule_variants(instance, force=False):
+    """Zleca wygenerowanie wersji po zatwierdzeniu transakcji (pula IMAGE_VARIANT_WORKERS wątków)"""
+    submit_on_commit(
+        'image-variants', getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+        process, type(instance), instance.pk, force
+    )
+
+
+def delete_variants(instance):
+    """Usuwa pliki wersji usuniętego zdjęcia po zatwierdzeniu transakcji"""
+    files = [getattr(instance, name) for name in VARIANTS if getattr(instance, name)]
+
+    def delete():
+        for variant in files:
+            variant.storage.delete(variant.name)
+
+    if files:
+        transaction.on_commit(delete)
+
+
+def pending_ids(model, force=False):
+    """ID zdjęć bez kompletu wersji (wszystkich przy force=True)"""
+    queryset = model.objects.exclude(image='')
+    if not force:
+        missing = Q()
+        for name in VARIANTS:
+            missing |= Q(**{f'{name}__isnull': True}) | Q(**{name: ''})
+        queryset = queryset.filter(missing)
+    return list(queryset.order_by('pk').values_list('pk', flat=True))
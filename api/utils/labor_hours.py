@@ -0,0 +1,90 @@
+"""
+Tabela faktów godzin pracy (LaborHoursFact).
+
+Wiersz odpowiada kluczowi (pracownik, projekt, dzień) i przechowuje sumę godzin
+z wpisów raportów postępu, osobno godziny z wersji roboczych oraz liczbę raportów.
+Po każdej zmianie raportu lub wpisu przeliczany jest tylko dotknięty koszyk
+(projekt, dzień), więc koszt aktualizacji zależy od wielkości jednej brygady,
+a nie od liczby wszystkich wpisów.
+"""
+from django.db import transaction
+from django.db.models import Count, Sum, Q, DecimalField
+from django.db.models.functions import Coalesce
+
+from .buckets import schedule_bucket_refresh, upsert_bucket_rows
+
+
+def aggregate_entries(queryset):
+    """Agreguje wpisy raportów do wierszy tabeli faktów"""
+    output_field = DecimalField(max_digits=6, decimal_places=1)
+    return queryset.order_by().values('employee_id', 'report__project_id', 'report__date').annotate(
+        hours=Coalesce(Sum('hours_worked'), 0, output_field=output_field),
+        draft_hours=Coalesce(Sum('hours_worked', filter=Q(report__is_draft=True)), 0, output_field=output_field),
+        report_count=Count('report', distinct=True),
+    )
+
+
+def build_facts(rows):
+    from ..models import LaborHoursFact
+
+    return [
+        LaborHoursFact(
+            employee_id=row['employee_id'],
+            project_id=row['report__project_id'],
+            date=row['report__date'],
+            hours=row['hours'],
+            draft_hours=row['draft_hours'],
+            report_count=row['report_count'],
+        )
+        for row in rows
+    ]
+
+
+def refresh_buckets(buckets):
+    """Przelicza godziny dla podanych koszyków (project_id, dzień)"""
+    from ..models import ProgressReportEntry, LaborHoursFact
+
+    buckets = set(buckets)
+    if not buckets:
+        return
+
+    entries_filter = Q()
+    facts_filter = Q()
+    for project_id, date in buckets:
+        entries_filter |= Q(report__project_id=project_id, report__date=date)
+        facts_filter |= Q(project_id=project_id, date=date)
+
+    upsert_bucket_rows(
+        LaborHoursFact, facts_filter,
+        build_facts(aggregate_entries(ProgressReportEntry.objects.filter(entries_filter))),
+        unique_fields=['employee', 'project', 'date'],
+        update_fields=['hours', 'draft_hours', 'report_count'],
+    )
+
+
+def report_buckets(report_ids):
+    """Zwraca koszyki (project_id, dzień) dla raportów o podanych ID"""
+    from ..models import ProgressReport
+
+    return set(ProgressReport.objects.filter(id__in=report_ids).values_list('project_id', 'date'))
+
+
+def schedule_refresh(buckets=(), report_ids=()):
+    """
+    Planuje przeliczenie godzin po zatwierdzeniu transakcji - jedno dla całej transakcji.
+    Koszyki raportów podanych przez ID ustalane są dopiero w momencie przeliczenia.
+    """
+    schedule_bucket_refresh('labor_hours', refresh_buckets, report_buckets, buckets, report_ids)
+
+
+def rebuild_labor_hours():
+    """Przebudowuje całą tabelę faktów od zera. Zwraca liczbę utworzonych wierszy"""
+    from ..models import ProgressReportEntry, LaborHoursFact
+
+    with transaction.atomic():
+        LaborHoursFact.objects.all().delete()
+        facts = LaborHoursFact.objects.bulk_create(
+            build_facts(aggregate_entries(ProgressReportEntry.objects.all())),
+            batch_size=1000
+        )
+    return len(facts)
@@ -0,0 +1,120 @@
+"""
+Numeracja dokumentów (ZAP/..., HR/..., TR/...).
+
+Dla każdego prefiksu (np. "ZAP/2025/03/14/") przechowywany jest licznik
+w tabeli DocumentCounter. Przydział numeru to blokada jednego wiersza
+(select_for_update) i jego inkrementacja, więc koszt nie zależy od liczby
+dokumentów z danego dnia, a równoległe zapisy nie dostają tego samego numeru.
+"""
+import datetime
+from django.db import transaction, IntegrityError, OperationalError
+
+# Kod błędu MySQL/InnoDB dla wykrytego zakleszczenia (transakcja została wycofana)
+DEADLOCK_ERROR = 1213
+DEADLOCK_RETRIES = 3
+
+
+def daily_prefix(code, day=None):
+    """Zwraca prefiks numeru dokumentu dla danego dnia, np. ZAP/2025/03/14/"""
+    day = day or datetime.date.today()
+    return f"{code}/{day.year}/{day.month:02d}/{day.day:02d}/"
+
+
+def existing_max_suffix(model, prefix, field='number'):
+    """Najwyższy numer porządkowy istniejących dokumentów z prefiksem (do zainicjowania licznika)"""
+    max_number = 0
+    numbers = model.objects.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True)
+    for number in numbers:
+        try:
+            max_number = max(max_number, int(number.split('/')[-1]))
+        except (ValueError, IndexError):
+            pass
+    return max_number
+
+
+def lock_counter(prefix, initial):
+    """
+    Zwraca zablokowany (select_for_update) wiersz licznika, tworząc go przy pierwszym użyciu.
+    Wymaga otwartej transakcji.
+    """
+    from ..models import DocumentCounter
+
+    # Wiersz tworzony jest przed blokującym odczytem - select_for_update na brakującym
+    # wierszu zakłada w InnoDB blokadę przerwy, przez co dwa żądania otwierające
+    # ten sam nowy prefiks zakleszczały się przy wstawianiu
+    if not DocumentCounter.objects.filter(prefix=prefix).exists():
+        # Równoległe utworzenie wiersza kończy się IntegrityError, a blokujący
+        # odczyt poniżej widzi wiersz zatwierdzony przez drugą transakcję
+        try:
+            with transaction.atomic():
+                DocumentCounter.objects.create(prefix=prefix, last_value=initial() if initial else 0)
+        except IntegrityError:
+            pass
+    return DocumentCounter.objects.select_for_update().get(prefix=prefix)
+
+
+def is_deadlock(error):
+    return bool(error.args) and error.args[0] == DEADLOCK_ERROR
+
+
+def with_deadlock_retry(function):
+    """
+    Wykonuje function() w nowej transakcji, ponawiając ją po zakleszczeniu.
+    Wewnątrz otwartej transakcji ponowienie nie jest możliwe (baza wycofała całą
+    transakcję), więc błąd jest przekazywany dalej
+    """
+    retry = not transaction.get_connection().in_atomic_block
+    for attempt in range(DEADLOCK_RETRIES):
+        try:
+            with transaction.atomic():
+                return function()
+        except OperationalError as e:
+            if not retry or not is_deadlock(e) or attempt == DEADLOCK_RETRIES - 1:
+                raise
+
+
+def reserve_numbers(prefix, count=1, model=None, initial=None):
+    """
+    Rezerwuje blok kolejnych numerów dla prefiksu.
+
+    Args:
+        prefix (str): Prefiks numeru, np. wynik daily_prefix('ZAP')
+        count (int): Liczba rezerwowanych numerów
+        model: Model dokumentu - przy pierwszym użyciu prefiksu licznik startuje
+            od najwyższego istniejącego numeru tego modelu
+        initial (callable, optional): Zwraca wartość początkową licznika (zamiast model)
+
+    Returns:
+        range: Zarezerwowane numery porządkowe
+    """
+    if count < 1:
+        raise ValueError("Liczba rezerwowanych numerów musi być dodatnia")
+
+    if initial is None and model is not None:
+        initial = lambda: existing_max_suffix(model, prefix)
+
+    def reserve():
+        counter = lock_counter(prefix, initial)
+        first = counter.last_value + 1
+        counter.last_value += count
+        counter.save(update_fields=['last_value'])
+        return first
+
+    first = with_deadlock_retry(reserve)
+    return range(first, first + count)
+
+
+def next_number(prefix, model=None, initial=None):
+    """Przydziela jeden kolejny numer porządkowy dla prefiksu"""
+    return reserve_numbers(prefix, 1, model=model, initial=initial)[0]
+
+
+def advance_counter(prefix, value, initial=None):
+    """Przesuwa licznik co najmniej do value (np. po imporcie rekordów z jawnie podanymi numerami)"""
+    def advance():
+        counter = lock_counter(prefix, initial)
+        if counter.last_value < value:
+            counter.last_value = value
+            counter.save(update_fields=['last_value'])
+
+    with_deadlock_retry(advance)
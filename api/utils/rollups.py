@@ -0,0 +1,128 @@
+"""
+Zestawienia wartości zapotrzebowań (RequisitionSpendRollup).
+
+Wiersz zestawienia odpowiada kluczowi (projekt, miesiąc utworzenia, status, typ)
+i przechowuje liczbę zapotrzebowań, liczbę pozycji, sumę ilości oraz wartość.
+Po każdej zmianie zapotrzebowania lub pozycji przeliczany jest tylko
+dotknięty koszyk (projekt, miesiąc), więc koszt aktualizacji zależy od liczby
+zapotrzebowań w jednym miesiącu projektu, a nie od rozmiaru całej tabeli.
+"""
+import datetime
+from django.db import transaction
+from django.db.models import Count, Sum, F, Q, DecimalField
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .buckets import schedule_bucket_refresh, upsert_bucket_rows
+
+ROLLUP_FIELDS = ['requisition_count', 'item_count', 'total_quantity', 'total_value']
+
+
+def month_start(value):
+    """Zwraca pierwszy dzień miesiąca dla daty lub daty z czasem (w bieżącej strefie czasowej)"""
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def month_bounds(month):
+    """Zwraca zakres [początek, koniec) miesiąca jako daty z czasem w bieżącej strefie czasowej"""
+    next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    start = datetime.datetime.combine(month, datetime.time.min)
+    end = datetime.datetime.combine(next_month, datetime.time.min)
+    if timezone.is_naive(timezone.now()):
+        return start, end
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def aggregate_requisitions(queryset):
+    """Agreguje zapotrzebowania do wierszy zestawienia"""
+    output_field = DecimalField(max_digits=14, decimal_places=2)
+    return queryset.order_by().annotate(
+        month=TruncMonth('created_at')
+    ).values('project_id', 'month', 'status', 'requisition_type').annotate(
+        requisition_count=Count('id', distinct=True),
+        item_count=Count('items'),
+        total_quantity=Coalesce(Sum('items__quantity'), 0),
+        total_value=Coalesce(
+            Sum(F('items__price') * F('items__quantity'), output_field=output_field),
+            0,
+            output_field=output_field
+        ),
+    )
+
+
+def build_rollups(rows):
+    from ..models import RequisitionSpendRollup
+
+    return [
+        RequisitionSpendRollup(
+            project_id=row['project_id'],
+            month=month_start(row['month']),
+            status=row['status'],
+            requisition_type=row['requisition_type'],
+            requisition_count=row['requisition_count'],
+            item_count=row['item_count'],
+            total_quantity=row['total_quantity'],
+            total_value=row['total_value'],
+        )
+        for row in rows
+    ]
+
+
+def refresh_buckets(buckets):
+    """Przelicza zestawienia dla podanych koszyków (project_id, miesiąc)"""
+    from ..models import Requisition, RequisitionSpendRollup
+
+    buckets = set(buckets)
+    if not buckets:
+        return
+
+    requisitions_filter = Q()
+    rollups_filter = Q()
+    for project_id, month in buckets:
+        start, end = month_bounds(month)
+        requisitions_filter |= Q(project_id=project_id, created_at__gte=start, created_at__lt=end)
+        rollups_filter |= Q(project_id=project_id, month=month)
+
+    upsert_bucket_rows(
+        RequisitionSpendRollup, rollups_filter,
+        build_rollups(aggregate_requisitions(Requisition.objects.filter(requisitions_filter))),
+        unique_fields=['project', 'month', 'status', 'requisition_type'],
+        update_fields=ROLLUP_FIELDS,
+    )
+
+
+def requisition_buckets(requisition_ids):
+    """Zwraca koszyki (project_id, miesiąc) dla zapotrzebowań o podanych ID"""
+    from ..models import Requisition
+
+    return {
+        (project_id, month_start(created_at))
+        for project_id, created_at in Requisition.objects.filter(
+            id__in=requisition_ids
+        ).values_list('project_id', 'created_at')
+    }
+
+
+def schedule_refresh(buckets=(), requisition_ids=()):
+    """
+    Planuje przeliczenie zestawień po zatwierdzeniu transakcji - jedno dla całej transakcji.
+    Koszyki zapotrzebowań podanych przez ID ustalane są dopiero w momencie przeliczenia.
+    """
+    schedule_bucket_refresh('requisition_rollups', refresh_buckets, requisition_buckets, buckets, requisition_ids)
+
+
+def rebuild_rollups():
+    """Przebudowuje wszystkie zestawienia od zera. Zwraca liczbę utworzonych wierszy"""
+    from ..models import Requisition, RequisitionSpendRollup
+
+    with transaction.atomic():
+        RequisitionSpendRollup.objects.all().delete()
+        rollups = RequisitionSpendRollup.objects.bulk_create(
+            build_rollups(aggregate_requisitions(Requisition.objects.all())),
+            batch_size=1000
+        )
+    return len(rollups)
@@ -0,0 +1,113 @@
+"""
+Indeks wyszukiwania zapotrzebowań.
+
+Dla każdego zapotrzebowania przechowujemy zbiór prefiksów słów pochodzących
+z numeru, komentarza, nazwy projektu oraz nazw i indeksów przedmiotów z pozycji
+(model RequisitionSearchToken). Wyszukiwanie sprowadza się do dopasowania
+równości na zaindeksowanej kolumnie token, więc jego koszt zależy od liczby
+trafień, a nie od rozmiaru tabel.
+"""
+import re
+from django.db import transaction
+from django.db.models import Count
+
+from .deferred import defer_on_commit
+
+# Maksymalna długość przechowywanego prefiksu (dłuższe frazy są przycinane)
+MAX_TOKEN_LENGTH = 20
+# Minimalna długość prefiksu - krótsze fragmenty trafiają do indeksu tylko jako całe słowa
+MIN_PREFIX_LENGTH = 2
+
+WORD_SPLIT_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def split_words(text):
+    """Dzieli tekst na słowa pisane małymi literami"""
+    if not text:
+        return []
+    return [word for word in WORD_SPLIT_RE.split(str(text).lower()) if word]
+
+
+def word_prefixes(word):
+    """Zwraca prefiksy słowa indeksowane dla wyszukiwania w trakcie pisania"""
+    word = word[:MAX_TOKEN_LENGTH]
+    prefixes = {word[:length] for length in range(MIN_PREFIX_LENGTH, len(word) + 1)}
+    prefixes.add(word)
+    return prefixes
+
+
+def requisition_tokens(requisition):
+    """Buduje zbiór tokenów dla zapotrzebowania i jego pozycji"""
+    texts = [requisition.number, requisition.comment]
+    if requisition.project_id:
+        texts.append(requisition.project.name)
+    for requisition_item in requisition.items.select_related('item'):
+        texts.append(requisition_item.item.name)
+        texts.append(requisition_item.item.index)
+
+    tokens = set()
+    for text in texts:
+        for word in split_words(text):
+            tokens |= word_prefixes(word)
+    return tokens
+
+
+def reindex_requisition(requisition_id):
+    """Przebudowuje tokeny wyszukiwania dla jednego zapotrzebowania"""
+    from ..models import Requisition, RequisitionSearchToken
+
+    requisition = Requisition.objects.select_related('project').filter(pk=requisition_id).first()
+    if requisition is None:
+        return
+
+    with transaction.atomic():
+        RequisitionSearchToken.objects.filter(requisition_id=requisition_id).delete()
+        # Porównanie bez rozróżniania wielkości liter i znaków diakrytycznych (collation MySQL)
+        # może uznać różne tokeny (np. żółty i zolty) za duplikaty - wystarczy jeden z nich
+        RequisitionSearchToken.objects.bulk_create([
+            RequisitionSearchToken(requisition_id=requisition_id, token=token)
+            for token in requisition_tokens(requisition)
+        ], ignore_conflicts=True)
+
+
+def reindex_requisitions(requisition_ids):
+    for requisition_id in sorted(requisition_ids):
+        reindex_requisition(requisition_id)
+
+
+def schedule_reindex(requisition_ids):
+    """
+    Planuje przebudowę indeksu po zatwierdzeniu transakcji - jedną dla wszystkich
+    zapotrzebowań zgłoszonych w transakcji (api/utils/deferred.py).
+    Dzięki temu kaskadowe usuwanie nie odtwarza tokenów usuwanego zapotrzebowania.
+    """
+    defer_on_commit('search_index', reindex_requisitions, [pk for pk in requisition_ids if pk])
+
+
+def rebuild_index():
+    """Przebudowuje indeks dla wszystkich zapotrzebowań. Zwraca liczbę przetworzonych rekordów"""
+    from ..models import Requisition
+
+    count = 0
+    for requisition_id in Requisition.objects.values_list('id', flat=True).iterator():
+        reindex_requisition(requisition_id)
+        count += 1
+    return count
+
+
+def search_requisition_ids(search_term):
+    """
+    Zwraca podzapytanie z ID zapotrzebowań, które zawierają wszystkie słowa frazy
+    (każde słowo dopasowane jako prefiks słowa w indeksie) lub None, jeśli fraza nie zawiera słów.
+    """
+    from ..models import RequisitionSearchToken
+
+    terms = {word[:MAX_TOKEN_LENGTH] for word in split_words(search_term)}
+    if not terms:
+        return None
+
+    return RequisitionSearchToken.objects.filter(
+        token__in=terms
+    ).values('requisition_id').annotate(
+        matched=Count('token', distinct=True)
+    ).filter(matched=len(terms)).values('requisition_id')
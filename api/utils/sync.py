@@ -0,0 +1,173 @@
+"""
+Synchronizacja przyrostowa dla aplikacji brygadzisty.
+
+Klient przesyła token synchronizacji wydany przy poprzednim wywołaniu i dostaje
+tylko obiekty utworzone lub zmienione od tego momentu (updated_at) oraz ślady
+usunięć (SyncTombstone) z zakresu danych użytkownika. Brak tokenu albo token
+starszy niż okres przechowywania śladów oznacza pełną synchronizację (reset).
+
+Ślady wpisów, zdjęć i aktywności raportów zapisywane są zbiorczo w miejscach
+usuwania (różnice wpisów i aktywności, endpointy API, usunięcie raportu lub
+pracownika) zamiast sygnałem post_delete, który kosztował dwa zapytania na wiersz.
+"""
+import datetime
+
+from django.core import signing
+from django.utils import timezone
+
+SYNC_TOKEN_SALT = 'api.sync'
+
+# Jak długo przechowywane są ślady usunięć - starsze tokeny wymagają pełnej synchronizacji
+TOMBSTONE_RETENTION = datetime.timedelta(days=30)
+
+# Zakładka czasu na transakcje zatwierdzone po wydaniu tokenu (duplikaty są nieszkodliwe)
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+# Nazwy kolekcji w odpowiedzi dla synchronizowanych modeli
+COLLECTIONS = {
+    'BrigadeMember': 'brigade_members',
+    'ProgressReport': 'progress_reports',
+    'ProgressReportEntry': 'entries',
+    'ProgressReportActivity': 'activities',
+    'ProgressReportImage': 'images',
+}
+
+
+class SyncTokenError(Exception):
+    """Token synchronizacji jest nieprawidłowy lub należy do innego użytkownika"""
+
+
+def issue_token(user, moment):
+    return signing.dumps({'user': user.pk, 'since': moment.timestamp()}, salt=SYNC_TOKEN_SALT)
+
+
+def read_token(token, user):
+    """Zwraca moment wydania tokenu"""
+    try:
+        data = signing.loads(token, salt=SYNC_TOKEN_SALT)
+    except signing.BadSignature:
+        raise SyncTokenError('Nieprawidłowy token synchronizacji')
+    if data.get('user') != user.pk:
+        raise SyncTokenError('Token synchronizacji należy do innego użytkownika')
+    return datetime.datetime.fromtimestamp(data['since'], tz=datetime.timezone.utc)
+
+
+def record_tombstones(model, object_ids, owner_id):
+    """Zapisuje ślady usunięcia obiektów jednego modelu jednym zapytaniem"""
+    from ..models import SyncTombstone
+
+    if owner_id is None or not object_ids:
+        return
+    collection = COLLECTIONS[model.__name__]
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(model=collection, object_id=object_id, owner_id=owner_id) for object_id in object_ids
+    ])
+
+
+def record_tombstone(instance, owner_id):
+    """Zapisuje ślad usunięcia obiektu (wywoływane z sygnałów post_delete)"""
+    record_tombstones(type(instance), [instance.pk], owner_id)
+
+
+def record_report_children_tombstones(queryset):
+    """
+    Zapisuje ślady wpisów, zdjęć lub aktywności z queryset przed ich usunięciem -
+    autorzy raportów pobierani są tym samym zapytaniem co ID
+    """
+    from ..models import SyncTombstone
+
+    collection = COLLECTIONS[queryset.model.__name__]
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(model=collection, object_id=object_id, owner_id=owner_id)
+        for object_id, owner_id in queryset.values_list('id', 'report__created_by_id')
+        if owner_id is not None
+    ])
+
+
+def delete_report_children(report, model, object_ids):
+    """Usuwa wpisy, zdjęcia lub aktywności raportu i zapisuje ich ślady usunięcia"""
+    if not object_ids:
+        return
+    model.objects.filter(id__in=object_ids).delete()
+    record_tombstones(model, object_ids, report.created_by_id)
+
+
+def report_owner_id(instance):
+    """Autor raportu, do którego należy wpis, zdjęcie lub aktywność"""
+    from ..models import ProgressReport
+
+    report = instance._state.fields_cache.get('report')
+    if report is not None:
+        return report.created_by_id
+    return ProgressReport.objects.filter(pk=instance.report_id).values_list('created_by_id', flat=True).first()
+
+
+def scoped_querysets(user):
+    """Zakres danych synchronizowanych dla brygadzisty wraz z serializerami"""
+    from ..models import BrigadeMember, ProgressReport, ProgressReportEntry, ProgressReportActivity, ProgressReportImage
+    from ..serializers import (
+        BrigadeMemberSerializer, ProgressReportSyncSerializer, ProgressReportEntrySerializer,
+        ProgressReportActivitySerializer, ProgressReportImageSerializer
+    )
+
+    return {
+        'brigade_members': (
+            BrigadeMember.objects.filter(brigade_leader=user).select_related('employee', 'brigade_leader'),
+            BrigadeMemberSerializer,
+        ),
+        'progress_reports': (
+            ProgressReport.objects.filter(created_by=user).select_related('project', 'created_by'),
+            ProgressReportSyncSerializer,
+        ),
+        'entries': (
+            ProgressReportEntry.objects.filter(report__created_by=user).select_related('employee'),
+            ProgressReportEntrySerializer,
+        ),
+        'activities': (
+            ProgressReportActivity.objects.filter(report__created_by=user),
+            ProgressReportActivitySerializer,
+        ),
+        'images': (
+            ProgressReportImage.objects.filter(report__created_by=user).select_related('created_by'),
+            ProgressReportImageSerializer,
+        ),
+    }
+
+
+def build_sync_payload(user, since, context):
+    """
+    Zwraca zmiany od momentu since (None - pełna synchronizacja) i nowy token.
+    Moment nowego tokenu ustalany jest przed odczytem danych, aby nie pominąć równoległych zmian
+    """
+    from ..models import SyncTombstone
+
+    now = timezone.now()
+    reset = since is None or since < now - TOMBSTONE_RETENTION
+    changed_after = None if reset else since - SYNC_OVERLAP
+
+    changes = {}
+    for collection, (queryset, serializer_class) in scoped_querysets(user).items():
+        if changed_after is not None:
+            queryset = queryset.filter(updated_at__gte=changed_after)
+        changes[collection] = serializer_class(queryset.order_by('id'), many=True, context=context).data
+
+    deleted = {collection: [] for collection in COLLECTIONS.values()}
+    if changed_after is not None:
+        tombstones = SyncTombstone.objects.filter(owner=user, deleted_at__gte=changed_after).values_list('model', 'object_id')
+        for collection, object_id in tombstones:
+            deleted[collection].append(object_id)
+
+    return {
+        'sync_token': issue_token(user, now),
+        'reset': reset,
+        'changes': changes,
+        'deleted': deleted,
+    }
+
+
+def purge_tombstones():
+    """Usuwa ślady starsze niż okres przechowywania. Zwraca liczbę usuniętych wierszy"""
+    from ..models import SyncTombstone
+
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+    return deleted
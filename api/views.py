@@ -1,4 +1,5 @@
 from rest_framework import viewsets, permissions, status, parsers
+from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.decorators import action, api_view, permission_classes
 from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
@@ -8,11 +9,30 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.models import User
 from .utils.email_utils import send_requisition_notification
-from django.db.models import Q
+from .pagination import DateKeysetPagination, IdKeysetPagination
+from .utils.search_index import search_requisition_ids
+from .utils.catalog_import import import_catalog, CatalogImportError
+from .utils import rollups, sync, chunked_upload, config_import
+from .utils.activity_progress import project_progress
+from .utils.config_index import INDEX_VERSION, ConfigSliceError, config_slice, project_index
+from .utils.conditional import related_aggregates
+from django.db.models import Q, F, Count, Max, Sum
+from django.db.models.functions import TruncMonth
+from django.db import transaction, IntegrityError
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils import timezone
 from django.utils.decorators import method_decorator
+import base64
+import binascii
 import datetime
+import hashlib
 import json
-from .models import UserProfile, Project, Client, ProjectTag, Employee, Empl_tag, Requisition, Item, RequisitionItem, Quarter, QuarterImage, UserSettings, BrigadeMember,HRRequisitionPosition, HRRequisition, TransportRequest, TransportItem
+import os
+from .models import UserProfile, Project, Client, ProjectTag, Employee, Empl_tag, Requisition, Item, RequisitionItem, Quarter, QuarterImage, UserSettings, BrigadeMember,HRRequisitionPosition, HRRequisition, TransportRequest, TransportItem, RequisitionSpendRollup, LaborHoursFact, ClientOperation, ChunkedUpload, ActivityConfigImport
 from .serializers import (
     UserSerializer, UserProfileSerializer, ProjectSerializer,
     ClientSerializer, ProjectTagSerializer, EmployeeSerializer, EmplTagSerializer,
@@ -20,7 +40,9 @@ from .serializers import (
     UserSettingsSerializer, BrigadeMemberSerializer, ProgressReportSerializer,
     ProgressReport, ProgressReportEntrySerializer, ProgressReportEntry, ProgressReportImageSerializer,
     ProgressReportImage, HRRequisitionPositionSerializer, HRRequisitionSerializer, TransportRequestSerializer, TransportItemSerializer,
-    ProgressReportActivitySerializer, ProjectActivityConfig, ProgressReportActivity, ProjectActivityConfigSerializer
+    ProgressReportActivitySerializer, ProjectActivityConfig, ProgressReportActivity, ProjectActivityConfigSerializer,
+    ProgressReportUpsertSerializer, ProgressReportActivityLineSerializer, ProgressReportSummarySerializer,
+    ActivityConfigImportSerializer
 )
 
 class IsAdminOrOwner(permissions.BasePermission):
@@ -74,11 +96,161 @@ class HasModulePrivilege(permissions.BasePermission):
         # Dla bezpieczeństwa sprawdzamy również na poziomie obiektu
         return self.has_permission(request, view)
 
-class UserViewSet(viewsets.ModelViewSet):
+class ConditionalGetMixin:
+    """
+    Obsługa warunkowych żądań GET (ETag / Last-Modified) dla list i szczegółów.
+
+    Walidator wyliczany jest jednym zapytaniem agregującym (liczba rekordów i najnowsze
+    wartości pól z conditional_fields) dla zakresu danych widocznego dla użytkownika.
+    Przy zgodności If-None-Match / If-Modified-Since zwracane jest 304 bez serializacji.
+    Ustaw conditional_fields = None, aby wyłączyć obsługę dla modeli bez znacznika czasu.
+
+    conditional_related wymienia modele, z których serializer pobiera dane (np. nazwę
+    projektu lub autora) - wersje ich tabel wchodzą do walidatorów (api/utils/conditional.py).
+    """
+    conditional_fields = ('updated_at',)
+    conditional_related = ()
+
+    def get_conditional_state(self, queryset):
+        """Zwraca (etag, last_modified) dla podanego zbioru danych"""
+        model = queryset.model
+        aggregates = {'count': Count('pk', distinct=True)}
+        for position, field in enumerate(self.conditional_fields):
+            aggregates[f'max_{position}'] = Max(field)
+            # Liczba powiązanych wierszy wykrywa usunięcia pozycji zagnieżdżonych
+            aggregates[f'rows_{position}'] = Count(field)
+        related = related_aggregates(self.conditional_related)
+        aggregates.update({name: aggregate for name, (aggregate, _) in related.items()})
+
+        # Agregacja po ID z docelowego zapytania - bez adnotacji, prefetchy i DISTINCT
+        state = model.objects.filter(pk__in=queryset.order_by().values('pk')).aggregate(**aggregates)
+        timestamps = [state[f'max_{position}'] for position in range(len(self.conditional_fields))]
+        timestamps += [state[name] for name, (_, is_timestamp) in related.items() if is_timestamp]
+        last_modified = max((value for value in timestamps if value), default=None)
+
+        user = self.request.user
+        fingerprint = '|'.join(str(part) for part in [
+            model._meta.label, self.action, user.pk, user.is_staff,
+            sorted(self.request.query_params.lists()), self.kwargs,
+            state['count'], *[state[f'rows_{position}'] for position in range(len(self.conditional_fields))],
+            *[value.isoformat() if value else '' for value in timestamps],
+            *[state[name] for name, (_, is_timestamp) in related.items() if not is_timestamp],
+        ])
+        etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+        return etag, (last_modified.timestamp() if last_modified else None)
+
+    def conditional_response(self, queryset, build_response):
+        """Zwraca 304, jeśli klient ma aktualne dane, w przeciwnym razie odpowiedź z nagłówkami walidatorów"""
+        if not self.conditional_fields:
+            return build_response()
+
+        etag, last_modified = self.get_conditional_state(queryset)
+        not_modified = get_conditional_response(self.request, etag=quote_etag(etag), last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = quote_etag(etag)
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Klient zawsze weryfikuje dane z serwerem, ale może użyć zapisanej kopii po 304
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        # get_object sprawdza uprawnienia do obiektu przed porównaniem walidatorów
+        instance = self.get_object()
+        queryset = self.get_queryset().filter(pk=instance.pk)
+        return self.conditional_response(queryset, lambda: Response(self.get_serializer(instance).data))
+
+class BulkStatusChangeMixin:
+    """
+    Zbiorcza zmiana statusu dla ViewSetów z polami status i updated_by.
+
+    POST {"ids": [...], "status": "..."} sprawdza dozwolone przejścia
+    (model.ALLOWED_STATUS_TRANSITIONS) i zapisuje zmianę jednym poleceniem UPDATE.
+    Liczba zapytań nie zależy od liczby przesłanych ID.
+    """
+    # Maksymalna liczba obiektów w jednym żądaniu
+    bulk_status_limit = 500
+
+    @action(detail=False, methods=['post'])
+    def bulk_change_status(self, request):
+        model = self.get_queryset().model
+        ids = request.data.get('ids')
+        new_status = request.data.get('status')
+
+        if not isinstance(ids, list) or not ids:
+            return Response({'detail': 'Lista ids jest wymagana'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.bulk_status_limit:
+            return Response(
+                {'detail': f'Maksymalnie {self.bulk_status_limit} obiektów w jednym żądaniu'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response({'detail': 'Nieprawidłowe ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if new_status not in model.ALLOWED_STATUS_TRANSITIONS:
+            return Response({'detail': 'Nieprawidłowy status'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Zakres widoczności użytkownika z get_queryset, bez adnotacji i prefetchy
+        visible_ids = self.get_queryset().order_by().values('id')
+
+        with transaction.atomic():
+            # Jedno zapytanie blokujące wiersze - status nie zmieni się do końca transakcji
+            current = dict(
+                model.objects.select_for_update().filter(
+                    id__in=ids
+                ).filter(id__in=visible_ids).values_list('id', 'status')
+            )
+
+            results = {}
+            to_update = []
+            for pk in ids:
+                if pk not in current:
+                    results[pk] = 'not_found'
+                elif current[pk] == new_status:
+                    results[pk] = 'unchanged'
+                elif new_status not in model.ALLOWED_STATUS_TRANSITIONS.get(current[pk], set()):
+                    results[pk] = 'invalid_transition'
+                else:
+                    results[pk] = 'updated'
+                    to_update.append(pk)
+
+            if to_update:
+                model.objects.filter(id__in=to_update).update(
+                    status=new_status,
+                    updated_by=request.user,
+                    updated_at=timezone.now()
+                )
+                self.after_bulk_status_change(to_update, current, new_status)
+
+        return Response({
+            'status': new_status,
+            'updated': len(to_update),
+            'results': [
+                {'id': pk, 'result': results[pk], 'previous_status': current.get(pk)}
+                for pk in ids
+            ]
+        })
+
+    def after_bulk_status_change(self, ids, previous_statuses, new_status):
+        """Punkt rozszerzenia wywoływany w transakcji po zbiorczej zmianie statusu"""
+        pass
+
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla użytkowników"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = IdKeysetPagination
+    conditional_fields = None  # Brak znacznika modyfikacji w modelu User
     required_privilege = 'admin_users'  # Uprawnienie do zarządzania użytkownikami
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
@@ -87,11 +259,12 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla profili użytkowników"""
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [IsAdminOrOwner, HasModulePrivilege]
+    conditional_related = (User,)
     required_privilege = 'manage_users'  # Uprawnienie do zarządzania profilami
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
@@ -101,11 +274,12 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(profile)
         return Response(serializer.data)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla projektów"""
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [IsAdminOrOwner, HasModulePrivilege]
+    conditional_related = (Client, ProjectTag, User)
     required_privilege = 'manage_projects'  # Uprawnienie do zarządzania projektami
 
     def get_queryset(self):
@@ -134,11 +308,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla klientów"""
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
     permission_classes = [IsAdminOrOwner, HasModulePrivilege]
+    conditional_related = (User,)
     required_privilege = 'manage_clients'  # Nowe uprawnienie
 
     def perform_create(self, serializer):
@@ -160,11 +335,12 @@ class ClientViewSet(viewsets.ModelViewSet):
         # Domyślnie zwracamy pustą listę dla zwykłego użytkownika
         return Client.objects.none()
 
-class ProjectTagViewSet(viewsets.ModelViewSet):
+class ProjectTagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla tagów projektów"""
     queryset = ProjectTag.objects.all()
     serializer_class = ProjectTagSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (User,)
     required_privilege = 'manage_project_tags'  # Uprawnienie do zarządzania tagami
 
     def perform_create(self, serializer):
@@ -265,11 +441,12 @@ def check_project_name(request):
 
 # Add these ViewSets to the existing views.py file
 
-class EmplTagViewSet(viewsets.ModelViewSet):
+class EmplTagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla tagów pracowników"""
     queryset = Empl_tag.objects.all()
     serializer_class = EmplTagSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (User,)
     required_privilege = 'manage_employee_tags'  # Uprawnienie do zarządzania tagami
 
     def perform_create(self, serializer):
@@ -278,11 +455,12 @@ class EmplTagViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla pracowników"""
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (Project, Empl_tag, Quarter, User)
     required_privilege = 'manage_employees'  # Uprawnienie do zarządzania pracownikami
 
     def perform_create(self, serializer):
@@ -319,11 +497,12 @@ def check_pesel(request):
     else:
         return Response({'valid': True, 'message': 'PESEL dostępny'})
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla przedmiotów"""
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (User,)
     required_privilege = 'manage_items'
 
     def perform_create(self, serializer):
@@ -332,13 +511,38 @@ class ItemViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
+    @action(detail=False, methods=['post'], parser_classes=[parsers.MultiPartParser, parsers.FormParser])
+    def import_catalog(self, request):
+        """
+        Import katalogu przedmiotów z pliku XLSX lub CSV (pole catalog_file).
+        Import jest atomowy - przy jakimkolwiek błędzie żaden przedmiot nie jest zapisywany.
+        """
+        catalog_file = request.FILES.get('catalog_file')
+        if not catalog_file:
+            return Response(
+                {'detail': 'Plik katalogu jest wymagany'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            created = import_catalog(catalog_file, request.user)
+        except CatalogImportError as e:
+            return Response(
+                {'detail': str(e), 'errors': e.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
-class RequisitionViewSet(viewsets.ModelViewSet):
+class RequisitionViewSet(ConditionalGetMixin, BulkStatusChangeMixin, viewsets.ModelViewSet):
     """API endpoint dla zapotrzebowań"""
     queryset = Requisition.objects.all()
     serializer_class = RequisitionSerializer
+    conditional_fields = ('updated_at', 'items__updated_at')
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (Project, Item, User)
     required_privilege = 'manage_requisitions'
 
     def get_queryset(self):
@@ -351,6 +555,9 @@ class RequisitionViewSet(viewsets.ModelViewSet):
             # Pozostali użytkownicy widzą tylko swoje zapotrzebowania
             queryset = Requisition.objects.filter(created_by=user).order_by('-created_at')
 
+        # Relacje i suma wartości pobierane stałą liczbą zapytań, niezależnie od liczby wierszy
+        queryset = queryset.with_list_relations().with_total_price()
+
         # Filtruj po typie zapotrzebowania
         requisition_type = self.request.query_params.get('requisition_type', None)
         if requisition_type:
@@ -359,21 +566,10 @@ class RequisitionViewSet(viewsets.ModelViewSet):
         # Filtruj po frazie wyszukiwania
         search_term = self.request.query_params.get('search', None)
         if search_term:
-            # Wyszukiwanie w podstawowych polach zapotrzebowania
-            basic_search = Q(number__icontains=search_term) | \
-                           Q(comment__icontains=search_term)
-
-            # Dodaj wyszukiwanie w polach powiązanego projektu
-            basic_search |= Q(project__name__icontains=search_term)
-
-            # Wyszukiwanie w przedmiotach zapotrzebowania
-            items_search = RequisitionItem.objects.filter(
-                Q(item__name__icontains=search_term) |
-                Q(item__index__icontains=search_term)
-            ).values_list('requisition_id', flat=True).distinct()
-
-            # Łączymy oba warunki - podstawowe pola lub powiązane przedmioty
-            queryset = queryset.filter(basic_search | Q(id__in=items_search))
+            # Wyszukiwanie po indeksie tokenów (numer, komentarz, projekt, przedmioty pozycji)
+            matching_ids = search_requisition_ids(search_term)
+            if matching_ids is not None:
+                queryset = queryset.filter(id__in=matching_ids)
 
         return queryset.distinct()
 
@@ -383,6 +579,10 @@ class RequisitionViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    def after_bulk_status_change(self, ids, previous_statuses, new_status):
+        """UPDATE pomija sygnały - przelicz zestawienia wartości dla zmienionych zapotrzebowań"""
+        rollups.schedule_refresh(requisition_ids=ids)
+
     def perform_create(self, serializer):
         """
         Modyfikacja procesu tworzenia zapotrzebowania,
@@ -474,11 +674,12 @@ class RequisitionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class RequisitionItemViewSet(viewsets.ModelViewSet):
+class RequisitionItemViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla pozycji zapotrzebowań"""
     queryset = RequisitionItem.objects.all()
     serializer_class = RequisitionItemSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (Item,)
     required_privilege = 'manage_requisitions'
 
     def update(self, request, *args, **kwargs):
@@ -517,28 +718,38 @@ class RequisitionItemViewSet(viewsets.ModelViewSet):
 
         return response
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from django.db.models import Value
+from django.db.models.functions import Concat, Trim
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side
-import datetime
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment
+import csv
+import tempfile
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def export_requisitions(request):
-    """Eksport zapotrzebowań do pliku Excel"""
-    # Parametry filtrowania
+# Liczba zapotrzebowań pobieranych jednym zapytaniem podczas eksportu
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_HEADERS = [
+    'Numer', 'Projekt', 'Status', 'Termin realizacji',
+    'Data utworzenia', 'Utworzony przez', 'Wartość', 'Komentarz'
+]
+
+EXPORT_ITEM_HEADERS = ['Numer zapotrzebowania', 'Indeks', 'Przedmiot', 'Ilość', 'Cena', 'Wartość']
+
+def filter_requisitions_for_export(request):
+    """Zwraca zapotrzebowania przefiltrowane parametrami eksportu"""
     requisition_type = request.GET.get('type', 'material')
-    status = request.GET.get('status', None)
+    status_filter = request.GET.get('status', None)
     date_from = request.GET.get('date_from', None)
     date_to = request.GET.get('date_to', None)
     project_id = request.GET.get('project_id', None)
 
-    # Filtrowanie zapotrzebowań
-    queryset = Requisition.objects.filter(requisition_type=requisition_type).order_by('-created_at')
+    queryset = Requisition.objects.filter(requisition_type=requisition_type)
 
     # Filtruj po statusie
-    if status and status != 'all':
-        queryset = queryset.filter(status=status)
+    if status_filter and status_filter != 'all':
+        queryset = queryset.filter(status=status_filter)
 
     # Filtruj po dacie utworzenia
     if date_from:
@@ -560,78 +771,218 @@ def export_requisitions(request):
     if project_id:
         queryset = queryset.filter(project_id=project_id)
 
-    # Tworzenie pliku Excel
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Zapotrzebowania"
+    return queryset
 
-    # Styl nagłówków
-    header_font = Font(bold=True)
-    header_alignment = Alignment(horizontal='center')
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+def export_chunks(queryset):
+    """
+    Dzieli zapytanie na porcje stronicowane kluczem (created_at, id) malejąco.
+    Każda porcja to osobne zapytanie z warunkiem na ostatnim kluczu - sterownik MySQL
+    buforuje cały wynik zapytania, więc .iterator() nie ogranicza zużycia pamięci
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    chunk = list(queryset[:EXPORT_CHUNK_SIZE])
+    while chunk:
+        yield chunk
+        last = chunk[-1]
+        chunk = list(queryset.filter(
+            Q(created_at__lt=last['created_at']) | Q(created_at=last['created_at'], id__lt=last['id'])
+        )[:EXPORT_CHUNK_SIZE])
+
+def iter_export_rows(queryset):
+    """
+    Generuje wiersze eksportu zapotrzebowań.
+    Wartość liczona jest w bazie, a wiersze pobierane porcjami bez tworzenia obiektów modeli.
+    """
+    status_map = dict(Requisition.REQUISITION_STATUS_CHOICES)
+    rows = queryset.with_total_price().annotate(
+        creator_name=Trim(Concat(F('created_by__first_name'), Value(' '), F('created_by__last_name')))
+    ).values(
+        'id', 'number', 'project__name', 'status', 'deadline', 'created_at',
+        'creator_name', 'total_value', 'comment'
     )
 
-    # Nagłówki
-    headers = [
-        'Numer', 'Projekt', 'Status', 'Termin realizacji',
-        'Data utworzenia', 'Utworzony przez', 'Wartość', 'Komentarz'
-    ]
+    for chunk in export_chunks(rows):
+        for row in chunk:
+            yield [
+                row['number'],
+                row['project__name'] or '-',
+                status_map.get(row['status'], row['status']),
+                row['deadline'].strftime('%Y-%m-%d') if row['deadline'] else '-',
+                row['created_at'].strftime('%Y-%m-%d') if row['created_at'] else '-',
+                row['creator_name'] or '-',
+                float(row['total_value']),
+                row['comment'] or '-',
+            ]
+
+def iter_export_item_rows(queryset):
+    """
+    Generuje wiersze arkusza szczegółów - po jednym na pozycję zapotrzebowania.
+    Pozycje pobierane są dla kolejnych porcji zapotrzebowań
+    """
+    requisitions = queryset.values('id', 'created_at')
 
-    for col_num, header in enumerate(headers, 1):
-        cell = worksheet.cell(row=1, column=col_num)
-        cell.value = header
-        cell.font = header_font
-        cell.alignment = header_alignment
-        cell.border = thin_border
+    for chunk in export_chunks(requisitions):
+        rows = RequisitionItem.objects.filter(
+            requisition_id__in=[row['id'] for row in chunk]
+        ).order_by('-requisition__created_at', '-requisition_id', 'id').values_list(
+            'requisition__number', 'item__index', 'item__name', 'quantity', 'price'
+        )
 
-    # Szerokości kolumn
-    column_widths = [15, 25, 15, 15, 15, 20, 15, 40]
+        for number, index, name, quantity, price in rows:
+            yield [
+                number,
+                index,
+                name,
+                quantity,
+                float(price) if price is not None else None,
+                float(price * quantity) if price is not None else None,
+            ]
+
+def iter_file_chunks(file_obj, chunk_size=64 * 1024):
+    """Czyta plik porcjami i zamyka go po zakończeniu"""
+    try:
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file_obj.close()
+
+class Echo:
+    """Pseudo-bufor dla csv.writer - zwraca zapisany wiersz zamiast go przechowywać"""
+    def write(self, value):
+        return value
+
+def stream_requisitions_csv(queryset, with_items):
+    """Generuje kolejne linie pliku CSV z eksportem zapotrzebowań"""
+    writer = csv.writer(Echo(), delimiter=';')
+    # BOM, aby Excel poprawnie rozpoznał kodowanie UTF-8
+    yield '\ufeff'
+    if with_items:
+        yield writer.writerow(EXPORT_ITEM_HEADERS)
+        for row in iter_export_item_rows(queryset):
+            yield writer.writerow(row)
+    else:
+        yield writer.writerow(EXPORT_HEADERS)
+        for row in iter_export_rows(queryset):
+            yield writer.writerow(row)
+
+def write_export_sheet(workbook, title, headers, column_widths, rows):
+    """Dopisuje arkusz w trybie write-only - wiersze trafiają od razu do pliku tymczasowego"""
+    worksheet = workbook.create_sheet(title=title)
     for i, width in enumerate(column_widths, 1):
         worksheet.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
 
-    # Dodawanie danych
-    status_map = {
-        'to_accept': 'Do akceptacji',
-        'accepted': 'Zaakceptowano',
-        'rejected': 'Odrzucono',
-        'in_progress': 'W trakcie realizacji',
-        'completed': 'Zrealizowano'
-    }
+    header_font = Font(bold=True)
+    header_alignment = Alignment(horizontal='center')
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(worksheet, value=header)
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
+    for row in rows:
+        worksheet.append(row)
 
-    for row_num, req in enumerate(queryset, 2):
-        # Oblicz całkowitą wartość
-        total_value = sum(
-            item.price * item.quantity for item in req.items.all() if item.price
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_requisitions(request):
+    """
+    Strumieniowy eksport zapotrzebowań do pliku Excel lub CSV.
+
+    Parametry: type, status, date_from, date_to, project_id - filtrowanie,
+    format=xlsx|csv (domyślnie xlsx), details=1 - dodatkowy arkusz z pozycjami
+    (dla CSV - eksport pozycji zamiast nagłówków).
+    """
+    queryset = filter_requisitions_for_export(request)
+    export_format = request.GET.get('format', 'xlsx')
+    with_items = request.GET.get('details') in ('1', 'true')
+    date_suffix = datetime.datetime.now().strftime('%Y-%m-%d')
+
+    if export_format == 'csv':
+        response = StreamingHttpResponse(
+            stream_requisitions_csv(queryset, with_items),
+            content_type='text/csv; charset=utf-8'
         )
+        response['Content-Disposition'] = f'attachment; filename="zapotrzebowania_{date_suffix}.csv"'
+        return response
 
-        # Zapełnij wiersz danymi
-        worksheet.cell(row=row_num, column=1).value = req.number
-        worksheet.cell(row=row_num, column=2).value = req.project.name if req.project else '-'
-        worksheet.cell(row=row_num, column=3).value = status_map.get(req.status, req.status)
-        worksheet.cell(row=row_num, column=4).value = req.deadline.strftime('%Y-%m-%d') if req.deadline else '-'
-        worksheet.cell(row=row_num, column=5).value = req.created_at.strftime('%Y-%m-%d') if req.created_at else '-'
-        worksheet.cell(row=row_num, column=6).value = f"{req.created_by.first_name} {req.created_by.last_name}".strip() if req.created_by else '-'
-        worksheet.cell(row=row_num, column=7).value = float(total_value)
-        worksheet.cell(row=row_num, column=8).value = req.comment or '-'
-
-        # Ustaw obramowanie dla wszystkich komórek
-        for col_num in range(1, len(headers) + 1):
-            worksheet.cell(row=row_num, column=col_num).border = thin_border
-
-    # Zapisz do tymczasowego pliku
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # Tryb write-only zapisuje wiersze na bieżąco do pliku tymczasowego, więc zużycie pamięci jest stałe
+    workbook = openpyxl.Workbook(write_only=True)
+    write_export_sheet(
+        workbook, "Zapotrzebowania", EXPORT_HEADERS,
+        [15, 25, 15, 15, 15, 20, 15, 40], iter_export_rows(queryset)
     )
-    filename = f"zapotrzebowania_{datetime.datetime.now().strftime('%Y-%m-%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    workbook.save(response)
+    if with_items:
+        write_export_sheet(
+            workbook, "Pozycje", EXPORT_ITEM_HEADERS,
+            [25, 12, 40, 10, 12, 15], iter_export_item_rows(queryset)
+        )
+
+    export_file = tempfile.TemporaryFile()
+    workbook.save(export_file)
+    export_file.seek(0)
 
+    response = StreamingHttpResponse(
+        iter_file_chunks(export_file),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename="zapotrzebowania_{date_suffix}.xlsx"'
     return response
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def requisition_spend(request):
+    """
+    Zestawienie wartości zapotrzebowań z tabeli RequisitionSpendRollup.
+
+    Parametry: project_id, status, requisition_type, month_from, month_to (RRRR-MM).
+    """
+    user = request.user
+    if not (user.is_staff or hasattr(user, 'profile') and user.profile.has_privilege('view_all_requisitions')):
+        return Response({'detail': 'Brak uprawnień do zestawień'}, status=status.HTTP_403_FORBIDDEN)
+
+    queryset = RequisitionSpendRollup.objects.select_related('project').order_by('month', 'project_id', 'status')
+
+    project_id = request.query_params.get('project_id')
+    if project_id:
+        queryset = queryset.filter(project_id=project_id)
+
+    status_filter = request.query_params.get('status')
+    if status_filter and status_filter != 'all':
+        queryset = queryset.filter(status=status_filter)
+
+    requisition_type = request.query_params.get('requisition_type')
+    if requisition_type:
+        queryset = queryset.filter(requisition_type=requisition_type)
+
+    for param, lookup in (('month_from', 'month__gte'), ('month_to', 'month__lte')):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                month = datetime.datetime.strptime(value, '%Y-%m').date()
+            except ValueError:
+                return Response({'detail': f'Nieprawidłowy format {param}, oczekiwano RRRR-MM'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**{lookup: month})
+
+    return Response([
+        {
+            'project': rollup.project_id,
+            'project_name': rollup.project.name if rollup.project else None,
+            'month': rollup.month.strftime('%Y-%m'),
+            'status': rollup.status,
+            'requisition_type': rollup.requisition_type,
+            'requisition_count': rollup.requisition_count,
+            'item_count': rollup.item_count,
+            'total_quantity': rollup.total_quantity,
+            'total_value': float(rollup.total_value),
+        }
+        for rollup in queryset
+    ])
+
 @api_view(['POST'])
 @ensure_csrf_cookie
 @permission_classes([permissions.IsAuthenticated])
@@ -679,11 +1030,12 @@ def validate_requisition(request):
 
 # Add this to api/views.py
 
-class QuarterViewSet(viewsets.ModelViewSet):
+class QuarterViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint for Quarters"""
     queryset = Quarter.objects.all()
     serializer_class = QuarterSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (Employee, User)
     required_privilege = 'manage_quarters'  # You can define this privilege
 
     def perform_create(self, serializer):
@@ -776,11 +1128,12 @@ def remove_employee_from_quarter(request):
         }, status=status.HTTP_404_NOT_FOUND)
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
-class QuarterImageViewSet(viewsets.ModelViewSet):
+class QuarterImageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla zdjęć kwater"""
     queryset = QuarterImage.objects.all()
     serializer_class = QuarterImageSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (User,)
     required_privilege = 'manage_quarters'  # To samo uprawnienie co dla kwater
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
 
@@ -802,11 +1155,12 @@ class QuarterImageViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
-class UserSettingsViewSet(viewsets.ModelViewSet):
+class UserSettingsViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla ustawień użytkownika"""
     queryset = UserSettings.objects.all()
     serializer_class = UserSettingsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = (Project, User)
 
     def get_queryset(self):
         """Filtrowanie ustawień użytkownika"""
@@ -875,11 +1229,12 @@ class UserSettingsViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data)
 
-class BrigadeMemberViewSet(viewsets.ModelViewSet):
+class BrigadeMemberViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla członków brygady"""
     queryset = BrigadeMember.objects.all()
     serializer_class = BrigadeMemberSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = (Employee, User)
 
     def get_queryset(self):
         """Filtrowanie członków brygady"""
@@ -1037,31 +1392,74 @@ def create_user_settings(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-class ProgressReportViewSet(viewsets.ModelViewSet):
+class ProgressReportViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla raportów postępu"""
     queryset = ProgressReport.objects.all()
     serializer_class = ProgressReportSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DateKeysetPagination
+    conditional_fields = ('updated_at', 'entries__updated_at', 'images__updated_at')
+    conditional_related = (Project, Employee, User)
+
+    def is_summary(self):
+        """Tryb summary (?summary=1) pomija zagnieżdżone listy zdjęć"""
+        return self.action == 'list' and self.request.query_params.get('summary') in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return ProgressReportSummarySerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        """Filtrowanie raportów - użytkownik widzi tylko swoje raporty lub wszystkie, jeśli jest adminem"""
+        """
+        Filtrowanie raportów - użytkownik widzi tylko swoje raporty lub wszystkie, jeśli jest adminem.
+        Obsługiwane parametry: date_from, date_to, project, is_draft, brigade_leader (tylko admin), summary
+        """
         user = self.request.user
+        params = self.request.query_params
+
+        # Admin widzi wszystkie raporty, pozostali użytkownicy tylko swoje
+        queryset = ProgressReport.objects.all() if user.is_staff else ProgressReport.objects.filter(created_by=user)
+
+        if params.get('date_from'):
+            queryset = queryset.filter(date__gte=params['date_from'])
+        if params.get('date_to'):
+            queryset = queryset.filter(date__lte=params['date_to'])
+        if params.get('project'):
+            queryset = queryset.filter(project_id=params['project'])
+        if params.get('is_draft') in ('1', 'true'):
+            queryset = queryset.filter(is_draft=True)
+        elif params.get('is_draft') in ('0', 'false'):
+            queryset = queryset.filter(is_draft=False)
+        if user.is_staff and params.get('brigade_leader'):
+            queryset = queryset.filter(created_by_id=params['brigade_leader'])
+
+        queryset = queryset.select_related('project', 'created_by').prefetch_related('entries__employee')
+        if self.is_summary():
+            queryset = queryset.annotate(image_count=Count('images'))
+        else:
+            queryset = queryset.prefetch_related('images__created_by')
 
-        # Admin widzi wszystkie raporty
-        if user.is_staff:
-            return ProgressReport.objects.all().order_by('-date')
-
-        # Pozostali użytkownicy widzą tylko swoje raporty
-        return ProgressReport.objects.filter(created_by=user).order_by('-date')
+        return queryset.order_by('-date')
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
-class ProgressReportEntryViewSet(viewsets.ModelViewSet):
+class ReportChildTombstoneMixin:
+    """Usunięcie wpisu, zdjęcia lub aktywności raportu przez API zapisuje ślad dla synchronizacji (api/utils/sync.py)"""
+
+    def perform_destroy(self, instance):
+        object_id, owner_id = instance.pk, sync.report_owner_id(instance)
+        super().perform_destroy(instance)
+        sync.record_tombstones(type(instance), [object_id], owner_id)
+
+class ProgressReportEntryViewSet(ReportChildTombstoneMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla wpisów w raportach postępu"""
     queryset = ProgressReportEntry.objects.all()
     serializer_class = ProgressReportEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdKeysetPagination
+    conditional_related = (Employee,)
 
     def get_queryset(self):
         """Filtrowanie wpisów - powiązanie z raportem"""
@@ -1070,11 +1468,12 @@ class ProgressReportEntryViewSet(viewsets.ModelViewSet):
             return ProgressReportEntry.objects.filter(report_id=report_id)
         return ProgressReportEntry.objects.all()
 
-class ProgressReportImageViewSet(viewsets.ModelViewSet):
+class ProgressReportImageViewSet(ReportChildTombstoneMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla zdjęć raportów postępu"""
     queryset = ProgressReportImage.objects.all()
     serializer_class = ProgressReportImageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = (User,)
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
 
     def get_queryset(self):
@@ -1098,67 +1497,50 @@ class ProgressReportImageViewSet(viewsets.ModelViewSet):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_progress_report(request):
-    """Endpoint do tworzenia raportu postępu wraz z wpisami w jednym żądaniu"""
+    """
+    Endpoint do tworzenia lub aktualizacji raportu postępu wraz z wpisami w jednym żądaniu.
+    Ponowne wysłanie raportu z tą samą datą i projektem aktualizuje istniejący raport,
+    a wpisy pominięte w przesłanej liście entries są usuwane.
+    """
     try:
-        # Dane raportu
-        report_data = {
-            'date': request.data.get('date'),
-            'project': request.data.get('project'),
-            'is_draft': request.data.get('is_draft', False)  # Dodane obsługa flagi draft
-        }
-
-        # Walidacja
-        if not report_data['date'] or not report_data['project']:
-            return Response(
-                {'detail': 'Data i projekt są wymagane'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Sprawdź, czy już istnieje raport z tą datą i projektem dla tego użytkownika
-        existing_report = ProgressReport.objects.filter(
-            date=report_data['date'],
-            project=report_data['project'],
-            created_by=request.user
-        ).first()
-
-        if existing_report:
-            # Zaktualizuj status draft istniejącego raportu
-            existing_report.is_draft = report_data['is_draft']
-            existing_report.save()
-
-            # Zwróć istniejący raport
-            serializer = ProgressReportSerializer(existing_report)
-            return Response(serializer.data)
-
-        # Utwórz raport
-        report = ProgressReport.objects.create(
-            date=report_data['date'],
-            project_id=report_data['project'],
-            created_by=request.user,
-            is_draft=report_data['is_draft']  # Zapisz status draft
-        )
-
-        # Utwórz wpisy
-        entries_data = request.data.get('entries', [])
-        for entry_data in entries_data:
-            if entry_data.get('employee') and entry_data.get('hours_worked') is not None:
-                ProgressReportEntry.objects.create(
-                    report=report,
-                    employee_id=entry_data['employee'],
-                    hours_worked=entry_data['hours_worked'],
-                    notes=entry_data.get('notes', '')
-                )
-
-        # Zwróć utworzony raport z wpisami
-        serializer = ProgressReportSerializer(report)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        data, created = save_progress_report(request, request.data)
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+    except ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response(
             {'detail': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+def save_progress_report(request, payload):
+    """
+    Tworzy lub aktualizuje raport z wpisami (ProgressReportUpsertSerializer).
+    Zwraca (dane raportu, czy utworzono) - błędy walidacji zgłaszane jako ValidationError
+    """
+    data = payload.copy()
+    # Wpisy bez pracownika lub godzin są pomijane (jak dotychczas). Bez klucza entries
+    # wpisy raportu pozostają bez zmian - pusta lista usuwa wszystkie
+    if 'entries' in payload:
+        data['entries'] = [
+            entry for entry in (payload.get('entries') or [])
+            if entry.get('employee') and entry.get('hours_worked') is not None
+        ]
+
+    if not data.get('date') or not data.get('project'):
+        raise ValidationError({'detail': 'Data i projekt są wymagane'})
+
+    serializer = ProgressReportUpsertSerializer(data=data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    report = serializer.save()
+
+    # Zwróć raport z wpisami - dane powiązane pobierane stałą liczbą zapytań
+    report = ProgressReport.objects.select_related('project', 'created_by').prefetch_related(
+        'entries__employee', 'images__created_by'
+    ).get(pk=report.pk)
+    return ProgressReportSerializer(report, context={'request': request}).data, serializer.created
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_progress_reports_for_date(request):
@@ -1186,18 +1568,159 @@ def get_progress_reports_for_date(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-class HRRequisitionPositionViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def progress_report_calendar(request):
+    """
+    Dzienne podsumowanie raportów postępu dla miesiąca (kalendarz raportów).
+
+    Parametry: month (RRRR-MM, domyślnie bieżący miesiąc), project.
+    Wynik liczony jednym zapytaniem GROUP BY po dacie raportu.
+    """
+    month_param = request.query_params.get('month')
+    try:
+        month = datetime.datetime.strptime(month_param, '%Y-%m').date() if month_param else timezone.localdate().replace(day=1)
+    except ValueError:
+        return Response({'detail': 'Nieprawidłowy format month, oczekiwano RRRR-MM'}, status=status.HTTP_400_BAD_REQUEST)
+    next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+    # Admin widzi wszystkie raporty, pozostali użytkownicy tylko swoje
+    queryset = ProgressReport.objects.filter(date__gte=month, date__lt=next_month)
+    if not request.user.is_staff:
+        queryset = queryset.filter(created_by=request.user)
+    project_id = request.query_params.get('project')
+    if project_id:
+        queryset = queryset.filter(project_id=project_id)
+
+    days = queryset.values('date').annotate(
+        report_count=Count('id', distinct=True),
+        draft_count=Count('id', filter=Q(is_draft=True), distinct=True),
+        final_count=Count('id', filter=Q(is_draft=False), distinct=True),
+        employee_count=Count('entries__employee', distinct=True),
+        total_hours=Sum('entries__hours_worked'),
+    ).order_by('date')
+
+    return Response({
+        'month': month.strftime('%Y-%m'),
+        'days': [
+            {
+                'date': day['date'].isoformat(),
+                'report_count': day['report_count'],
+                'draft_count': day['draft_count'],
+                'final_count': day['final_count'],
+                'employee_count': day['employee_count'],
+                'total_hours': float(day['total_hours'] or 0),
+            }
+            for day in days
+        ]
+    })
+
+LABOR_HOURS_GROUPS = {
+    'employee': ['employee_id', 'employee__first_name', 'employee__last_name'],
+    'project': ['project_id', 'project__name'],
+    'month': ['month'],
+    'day': ['date'],
+}
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def labor_hours_report(request):
+    """
+    Godziny pracy z tabeli LaborHoursFact.
+
+    Parametry: group_by (lista z employee, project, month, day; domyślnie employee,project,month),
+    date_from, date_to, employee, project, include_drafts (domyślnie tylko raporty finalne).
+    """
+    user = request.user
+    if not (user.is_staff or hasattr(user, 'profile') and user.profile.has_privilege('manage_employees')):
+        return Response({'detail': 'Brak uprawnień do zestawień godzin pracy'}, status=status.HTTP_403_FORBIDDEN)
+
+    params = request.query_params
+    groups = [group.strip() for group in params.get('group_by', 'employee,project,month').split(',') if group.strip()]
+    unknown = [group for group in groups if group not in LABOR_HOURS_GROUPS]
+    if unknown or not groups:
+        return Response(
+            {'detail': f"Nieprawidłowe group_by, dozwolone: {', '.join(LABOR_HOURS_GROUPS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    queryset = LaborHoursFact.objects.all()
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                queryset = queryset.filter(**{lookup: datetime.datetime.strptime(value, '%Y-%m-%d').date()})
+            except ValueError:
+                return Response({'detail': f'Nieprawidłowy format {param}, oczekiwano RRRR-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    if params.get('employee'):
+        queryset = queryset.filter(employee_id=params['employee'])
+    if params.get('project'):
+        queryset = queryset.filter(project_id=params['project'])
+
+    include_drafts = params.get('include_drafts') in ('1', 'true')
+    if include_drafts:
+        hours = Sum('hours')
+    else:
+        # Dni z samymi wersjami roboczymi nie są liczone
+        queryset = queryset.filter(hours__gt=F('draft_hours'))
+        hours = Sum(F('hours') - F('draft_hours'))
+    if 'month' in groups:
+        queryset = queryset.annotate(month=TruncMonth('date'))
+
+    fields = [field for group in groups for field in LABOR_HOURS_GROUPS[group]]
+    rows = queryset.values(*fields).annotate(
+        hours=hours,
+        days=Count('date', distinct=True),
+    ).order_by(*fields)
+
+    result = []
+    for row in rows:
+        item = {'hours': float(row['hours'] or 0), 'days': row['days']}
+        if 'employee' in groups:
+            item['employee'] = row['employee_id']
+            item['employee_name'] = f"{row['employee__first_name']} {row['employee__last_name']}"
+        if 'project' in groups:
+            item['project'] = row['project_id']
+            item['project_name'] = row['project__name']
+        if 'month' in groups:
+            item['month'] = row['month'].strftime('%Y-%m')
+        if 'day' in groups:
+            item['date'] = row['date'].isoformat()
+        result.append(item)
+    return Response(result)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_changes(request):
+    """
+    Synchronizacja przyrostowa dla aplikacji mobilnej brygadzisty.
+
+    Parametr token: sync_token z poprzedniej odpowiedzi (brak - pełna synchronizacja).
+    Zwraca członków brygady, raporty, wpisy, aktywności i metadane zdjęć zmienione od
+    wydania tokenu oraz ID usuniętych obiektów w polu deleted.
+    """
+    token = request.query_params.get('token')
+    try:
+        since = sync.read_token(token, request.user) if token else None
+    except sync.SyncTokenError as e:
+        return Response({'detail': str(e), 'reset_required': True}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(sync.build_sync_payload(request.user, since, {'request': request}))
+
+class HRRequisitionPositionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla pozycji zapotrzebowań HR"""
     queryset = HRRequisitionPosition.objects.all()
     serializer_class = HRRequisitionPositionSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
     required_privilege = 'manage_hr_requisitions'
 
-class HRRequisitionViewSet(viewsets.ModelViewSet):
+class HRRequisitionViewSet(ConditionalGetMixin, BulkStatusChangeMixin, viewsets.ModelViewSet):
     """API endpoint dla zapotrzebowań HR"""
     queryset = HRRequisition.objects.all()
     serializer_class = HRRequisitionSerializer
+    conditional_fields = ('updated_at', 'positions__updated_at')
     permission_classes = [permissions.IsAuthenticated, HasModulePrivilege]
+    conditional_related = (Project, User)
     required_privilege = 'manage_hr_requisitions'
 
     def get_queryset(self):
@@ -1374,11 +1897,12 @@ def get_employee_by_tag(request, tag_id):
         )
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
-class TransportRequestViewSet(viewsets.ModelViewSet):
+class TransportRequestViewSet(ConditionalGetMixin, BulkStatusChangeMixin, viewsets.ModelViewSet):
     """API endpoint dla zapotrzebowań na transport"""
     queryset = TransportRequest.objects.all()
     serializer_class = TransportRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_fields = None  # Zagnieżdżone przesyłki nie mają znacznika modyfikacji
 
     def get_queryset(self):
         """Filtruje zapotrzebowania na transport w zależności od uprawnień użytkownika"""
@@ -1447,11 +1971,13 @@ class TransportRequestViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(transport)
         return Response(serializer.data)
 
-class TransportItemViewSet(viewsets.ModelViewSet):
+class TransportItemViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla przesyłek w transporcie"""
     queryset = TransportItem.objects.all()
     serializer_class = TransportItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdKeysetPagination
+    conditional_fields = None
 
     def get_queryset(self):
         """Filtruje przesyłki po powiązanym transporcie"""
@@ -1496,11 +2022,12 @@ def validate_transport(request):
 
     return Response({'valid': True}, status=status.HTTP_200_OK)
 
-class ProjectActivityConfigViewSet(viewsets.ModelViewSet):
+class ProjectActivityConfigViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla konfiguracji aktywności projektu"""
     queryset = ProjectActivityConfig.objects.all()
     serializer_class = ProjectActivityConfigSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = (Project,)
 
     def get_queryset(self):
         """Filtrowanie konfiguracji aktywności"""
@@ -1515,7 +2042,7 @@ class ProjectActivityConfigViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
-class ProgressReportActivityViewSet(viewsets.ModelViewSet):
+class ProgressReportActivityViewSet(ReportChildTombstoneMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """API endpoint dla aktywności w raportach postępu"""
     queryset = ProgressReportActivity.objects.all()
     serializer_class = ProgressReportActivitySerializer
@@ -1560,6 +2087,74 @@ def get_project_activities_config(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def project_activities_config_slice(request):
+    """
+    Fragment konfiguracji aktywności dla formularza raportu z indeksu zapisanego
+    przy konfiguracji (api/utils/config_index.py). Parametry activity_type,
+    sub_activity, zona i row zawężają odpowiedź do kolejnego poziomu wyboru.
+    """
+    project_id = request.query_params.get('project_id', None)
+
+    if not project_id:
+        return Response(
+            {'detail': 'Identyfikator projektu jest wymagany'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    config = ProjectActivityConfig.objects.filter(project_id=project_id).first()
+    if config is None:
+        return Response({'project': project_id, 'has_config': False})
+
+    # Wycinek zmienia się tylko wraz z konfiguracją lub strukturą indeksu - klient może użyć zapisanej kopii po 304
+    fingerprint = '|'.join(str(part) for part in [
+        config.pk, config.updated_at.isoformat(), INDEX_VERSION, sorted(request.query_params.lists()),
+    ])
+    etag = quote_etag(hashlib.sha1(fingerprint.encode('utf-8')).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    params = {
+        name: request.query_params.get(name) or None
+        for name in ('activity_type', 'sub_activity', 'zona', 'row')
+    }
+    if params['row'] is not None and params['zona'] is None:
+        return Response({'detail': 'Parametr row wymaga parametru zona'}, status=status.HTTP_400_BAD_REQUEST)
+    if params['zona'] is not None and params['activity_type'] is None:
+        return Response({'detail': 'Parametr zona wymaga parametru activity_type'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        data = config_slice(project_index(config), **params)
+    except ConfigSliceError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+    response = Response({'project': config.project_id, 'has_config': True, **data})
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def project_activity_progress(request):
+    """
+    Postęp prac projektu: zakres planowany z konfiguracji aktywności zestawiony
+    z ilościami z raportów postępu (wiersze, podaktywności, aktywności i całość).
+    """
+    project_id = request.query_params.get('project_id', None)
+
+    if not project_id:
+        return Response(
+            {'detail': 'Identyfikator projektu jest wymagany'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not Project.objects.filter(id=project_id).exists():
+        return Response({'detail': 'Projekt nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(project_progress(project_id))
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def upload_project_activities_config(request):
@@ -1583,64 +2178,491 @@ def upload_project_activities_config(request):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Wczytaj plik JSON
-        try:
-            json_data = json.load(config_file)
-        except json.JSONDecodeError:
-            return Response(
-                {'detail': 'Nieprawidłowy format pliku JSON'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Utwórz lub zaktualizuj konfigurację
-        config, created = ProjectActivityConfig.objects.update_or_create(
-            project=project,
-            defaults={
-                'config_data': json_data,
-                'created_by': request.user if created else None,
-                'updated_by': request.user
-            }
-        )
-
-        serializer = ProjectActivityConfigSerializer(config)
-        return Response(serializer.data)
+        return Response(save_activities_config(project, config_file, request.user))
 
+    except ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response(
             {'detail': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def save_activities_config(project, config_file, user):
+    """Zapisuje konfigurację aktywności projektu z pliku JSON - zwraca dane konfiguracji"""
+    try:
+        json_data = json.load(config_file)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ValidationError({'detail': 'Nieprawidłowy format pliku JSON'})
+
+    # Utwórz lub zaktualizuj konfigurację (autor ustawiany tylko przy utworzeniu)
+    config, created = ProjectActivityConfig.objects.update_or_create(
+        project=project,
+        defaults={'config_data': json_data, 'updated_by': user},
+        create_defaults={'config_data': json_data, 'created_by': user, 'updated_by': user}
+    )
+    return ProjectActivityConfigSerializer(config).data
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def activity_config_imports(request):
+    """
+    Import konfiguracji aktywności z pliku Excel z układem projektu.
+
+    POST (multipart): project_id, file (.xlsx) - zapisuje plik i zleca konwersję w tle,
+    zwraca 202 z zadaniem. Stan zadania: GET activity-config-imports/<id>/.
+    GET: lista zadań (parametr project_id), użytkownicy bez uprawnień admina widzą swoje.
+    """
+    if request.method == 'GET':
+        jobs = ActivityConfigImport.objects.select_related('project')
+        if not request.user.is_staff:
+            jobs = jobs.filter(created_by=request.user)
+        project_id = request.query_params.get('project_id')
+        if project_id:
+            jobs = jobs.filter(project_id=project_id)
+        return Response(ActivityConfigImportSerializer(jobs[:50], many=True).data)
+
+    project_id = request.data.get('project_id')
+    excel_file = request.FILES.get('file')
+    if not project_id or not excel_file:
+        return Response(
+            {'detail': 'Identyfikator projektu i plik Excel są wymagane'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    errors = config_import.validate_upload(excel_file)
+    if errors:
+        return Response({'detail': errors[0], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    project = Project.objects.filter(id=project_id).first() if str(project_id).isdigit() else None
+    if project is None:
+        return Response({'detail': 'Projekt nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
+
+    with transaction.atomic():
+        job = ActivityConfigImport.objects.create(project=project, file=excel_file, created_by=request.user)
+        config_import.schedule_import(job)
+    return Response(ActivityConfigImportSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def activity_config_import_detail(request, pk):
+    """Stan zadania importu: status, postęp (%), przetwarzany arkusz, błędy walidacji i ostrzeżenia"""
+    jobs = ActivityConfigImport.objects.select_related('project')
+    if not request.user.is_staff:
+        jobs = jobs.filter(created_by=request.user)
+    job = jobs.filter(pk=pk).first()
+    if job is None:
+        return Response({'detail': 'Zadanie nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(ActivityConfigImportSerializer(job).data)
+
+ACTIVITY_KEY_FIELDS = ('activity_type', 'sub_activity', 'zona', 'row')
+ACTIVITY_VALUE_FIELDS = ('quantity', 'unit', 'notes')
+
+def apply_report_activities_diff(report, activities):
+    """
+    Zapisuje aktywności raportu jako różnicę względem istniejących wierszy.
+    Wiersze są dopasowywane po (activity_type, sub_activity, zona, row) - powtórzenia klucza
+    dopasowywane są kolejno. Zwraca liczbę dodanych, zmienionych i usuniętych wierszy.
+    """
+    existing = {}
+    for activity in report.activities.order_by('id'):
+        existing.setdefault(tuple(getattr(activity, field) for field in ACTIVITY_KEY_FIELDS), []).append(activity)
+
+    to_create, to_update = [], []
+    now = timezone.now()
+    for data in activities:
+        key = tuple(data[field] for field in ACTIVITY_KEY_FIELDS)
+        values = {field: data.get(field) for field in ACTIVITY_VALUE_FIELDS}
+        matches = existing.get(key)
+        if not matches:
+            to_create.append(ProgressReportActivity(report=report, **dict(zip(ACTIVITY_KEY_FIELDS, key)), **values))
+            continue
+
+        current = matches.pop(0)
+        if any(getattr(current, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(current, field, value)
+            # bulk_update nie ustawia auto_now
+            current.updated_at = now
+            to_update.append(current)
+
+    removed_ids = [activity.id for matches in existing.values() for activity in matches]
+    sync.delete_report_children(report, ProgressReportActivity, removed_ids)
+    if to_update:
+        ProgressReportActivity.objects.bulk_update(to_update, [*ACTIVITY_VALUE_FIELDS, 'updated_at'], batch_size=500)
+    if to_create:
+        ProgressReportActivity.objects.bulk_create(to_create, batch_size=500)
+    return len(to_create), len(to_update), len(removed_ids)
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def add_activities_to_report(request):
-    """Endpoint do dodawania aktywności do raportu postępu"""
+    """
+    Endpoint do zapisywania aktywności raportu postępu.
+    Cała lista jest walidowana jednym przebiegiem, a zapisywane są tylko zmienione wiersze (atomowo).
+    """
     try:
         report_id = request.data.get('report_id')
-        activities_data = request.data.get('activities', [])
 
         if not report_id:
             return Response({'detail': 'Brak ID raportu'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Pobierz raport
+        result = save_report_activities(report_id, request.data.get('activities', []))
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    except ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except NotFound as e:
+        return Response({'detail': e.detail}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def save_report_activities(report_id, activities_data, owner=None):
+    """
+    Waliduje listę aktywności i zapisuje ją jako różnicę względem raportu.
+    Opcjonalnie ogranicza raport do autora (owner). Zgłasza ValidationError lub NotFound
+    """
+    serializer = ProgressReportActivityLineSerializer(data=activities_data, many=True)
+    if not serializer.is_valid():
+        raise ValidationError(serializer.errors)
+
+    with transaction.atomic():
+        # Blokada raportu serializuje równoległe zapisy aktywności tego samego raportu
+        reports = ProgressReport.objects.select_for_update().filter(id=report_id)
+        if owner is not None:
+            reports = reports.filter(created_by=owner)
+        report = reports.first()
+        if report is None:
+            raise NotFound('Raport nie istnieje')
+
+        created, updated, deleted = apply_report_activities_diff(report, serializer.validated_data)
+
+    return {
+        'detail': 'Aktywności zapisane pomyślnie',
+        'created': created,
+        'updated': updated,
+        'deleted': deleted
+    }
+
+BATCH_OPERATION_LIMIT = 100
+
+def batch_progress_report(request, payload, resolve_report):
+    data, created = save_progress_report(request, payload)
+    return (status.HTTP_201_CREATED if created else status.HTTP_200_OK), data
+
+def batch_report_activities(request, payload, resolve_report):
+    result = save_report_activities(resolve_report(payload), payload.get('activities', []), owner=request.user)
+    return status.HTTP_201_CREATED, result
+
+def batch_report_image(request, payload, resolve_report):
+    """Zdjęcie przesyłane w partii jako base64 (pole image_base64 oraz filename)"""
+    report_id = resolve_report(payload)
+    if not ProgressReport.objects.filter(id=report_id, created_by=request.user).exists():
+        raise NotFound('Raport nie istnieje')
+    encoded = payload.get('image_base64') or ''
+    if encoded.startswith('data:'):
+        # Format data URL z przeglądarki: data:image/jpeg;base64,...
+        encoded = encoded.partition(',')[2]
+    try:
+        content = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValidationError({'image_base64': ['Nieprawidłowe dane base64']})
+
+    serializer = ProgressReportImageSerializer(data={
+        'report': report_id,
+        'image': ContentFile(content, name=payload.get('filename') or 'zdjecie.jpg'),
+        'name': payload.get('name'),
+        'description': payload.get('description'),
+    }, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    serializer.save(created_by=request.user)
+    return status.HTTP_201_CREATED, serializer.data
+
+class DuplicateOperation(Exception):
+    """Wynik operacji o tym kluczu idempotencji został już zapisany przez inne żądanie"""
+
+BATCH_OPERATIONS = {
+    'create_progress_report': batch_progress_report,
+    'add_activities_to_report': batch_report_activities,
+    'upload_report_image': batch_report_image,
+}
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def submit_batch(request):
+    """
+    Przesłanie kolejki operacji zapisanych offline w jednym żądaniu.
+
+    Body: {"operations": [{"idempotency_key": "...", "type": "...", "payload": {...}}, ...]}
+    Typy: create_progress_report, add_activities_to_report, upload_report_image.
+    Operacje na raporcie utworzonym w tej samej partii mogą wskazać go przez report_key
+    (klucz idempotencji operacji create_progress_report) zamiast report_id.
+
+    Partia wykonywana jest w jednej transakcji, każda operacja we własnym punkcie zapisu.
+    Wynik udanej operacji jest zapamiętywany pod kluczem idempotencji, więc ponowienie
+    partii zwraca zapisane wyniki zamiast tworzyć duplikaty. Błędne operacje nie są
+    zapamiętywane i mogą zostać ponowione po poprawieniu danych.
+    """
+    operations = request.data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return Response({'detail': 'Lista operations jest wymagana'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > BATCH_OPERATION_LIMIT:
+        return Response(
+            {'detail': f'Maksymalnie {BATCH_OPERATION_LIMIT} operacji w jednej partii'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    keys = [operation.get('idempotency_key') if isinstance(operation, dict) else None for operation in operations]
+    if not all(isinstance(key, str) and key for key in keys) or len(set(keys)) != len(keys):
+        return Response(
+            {'detail': 'Każda operacja wymaga unikalnego idempotency_key'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Wyniki operacji wykonanych wcześniej - jedno zapytanie dla całej partii
+    stored = {
+        operation.idempotency_key: operation
+        for operation in ClientOperation.objects.filter(user=request.user, idempotency_key__in=keys)
+    }
+    # ID raportów utworzonych w partii (lub wcześniej) według klucza operacji
+    report_keys = {}
+
+    def resolve_report(payload):
+        report_key = payload.get('report_key')
+        if report_key:
+            if report_key not in report_keys:
+                raise ValidationError({'report_key': [f'Nieznany raport: {report_key}']})
+            return report_keys[report_key]
         try:
-            report = ProgressReport.objects.get(id=report_id)
-        except ProgressReport.DoesNotExist:
-            return Response({'detail': 'Raport nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Usuń istniejące aktywności dla tego raportu
-        ProgressReportActivity.objects.filter(report=report).delete()
-
-        # Dodaj nowe aktywności
-        for activity_data in activities_data:
-            activity_data['report'] = report_id
-            serializer = ProgressReportActivitySerializer(data=activity_data)
-            if serializer.is_valid():
-                serializer.save()
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return int(payload.get('report_id'))
+        except (TypeError, ValueError):
+            raise ValidationError({'report_id': ['Brak lub nieprawidłowe ID raportu']})
+
+    results = []
+    with transaction.atomic():
+        for key, operation in zip(keys, operations):
+            operation_type = operation.get('type')
+            payload = operation.get('payload') or {}
+
+            previous = stored.get(key)
+            if previous is not None:
+                if previous.operation == 'create_progress_report':
+                    report_keys[key] = previous.response.get('id')
+                results.append({
+                    'idempotency_key': key, 'status': 'replayed',
+                    'status_code': previous.status_code, 'data': previous.response
+                })
+                continue
+
+            handler = BATCH_OPERATIONS.get(operation_type)
+            if handler is None or not isinstance(payload, dict):
+                results.append({
+                    'idempotency_key': key, 'status': 'error', 'status_code': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'detail': f'Nieznany typ operacji: {operation_type}'}
+                })
+                continue
 
-        return Response({'detail': 'Aktywności zapisane pomyślnie'}, status=status.HTTP_201_CREATED)
+            try:
+                with transaction.atomic():
+                    status_code, data = handler(request, payload, resolve_report)
+                    try:
+                        with transaction.atomic():
+                            # Unikalny klucz (user, idempotency_key) blokuje równoległe wykonanie tej samej operacji
+                            ClientOperation.objects.create(
+                                user=request.user, idempotency_key=key, operation=operation_type,
+                                status_code=status_code, response=json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+                            )
+                    except IntegrityError:
+                        # Wycofuje też zapis operacji - obowiązuje wynik zapisany przez inne żądanie
+                        raise DuplicateOperation()
+            except (ValidationError, NotFound) as e:
+                results.append({
+                    'idempotency_key': key, 'status': 'error', 'status_code': e.status_code, 'errors': e.detail
+                })
+                continue
+            except IntegrityError:
+                # Konflikt danych samej operacji - błąd tej operacji, nie całej partii
+                results.append({
+                    'idempotency_key': key, 'status': 'error', 'status_code': status.HTTP_409_CONFLICT,
+                    'errors': {'detail': 'Operacja koliduje z danymi zapisanymi równolegle - ponów ją'}
+                })
+                continue
+            except DuplicateOperation:
+                # Ta sama operacja została zapisana równolegle przez inne żądanie. Odczyt blokujący
+                # widzi zatwierdzony wiersz, którego nie widzi migawka transakcji (REPEATABLE READ)
+                previous = ClientOperation.objects.select_for_update().filter(
+                    user=request.user, idempotency_key=key
+                ).first()
+                if previous is None:
+                    raise
+                if previous.operation == 'create_progress_report':
+                    report_keys[key] = previous.response.get('id')
+                results.append({
+                    'idempotency_key': key, 'status': 'replayed',
+                    'status_code': previous.status_code, 'data': previous.response
+                })
+                continue
+
+            if operation_type == 'create_progress_report':
+                report_keys[key] = data['id']
+            results.append({'idempotency_key': key, 'status': 'ok', 'status_code': status_code, 'data': data})
+
+    return Response({'results': results})
 
-    except Exception as e:
-        return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_chunked_upload(request):
+    """
+    Rozpoczęcie przesyłania pliku w częściach.
+
+    Body: {"target": "progress_report_image" | "quarter_image" | "activities_config",
+           "filename": "...", "size": <bajty>, "checksum": "<sha256 całego pliku, opcjonalnie>",
+           "report" / "quarter" / "project_id": <ID celu>, "name", "description"}
+    Części wysyłane są na uploads/<upload_id>/ (PUT) - patrz chunked_upload_detail.
+    """
+    target = request.data.get('target')
+    filename = os.path.basename(str(request.data.get('filename') or '')).strip()
+    checksum = str(request.data.get('checksum') or '').lower()
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+
+    if target not in dict(ChunkedUpload.TARGET_CHOICES):
+        return Response({'detail': 'Nieznany cel przesyłania'}, status=status.HTTP_400_BAD_REQUEST)
+    if not filename or not 0 < size <= chunked_upload.MAX_FILE_SIZE:
+        return Response(
+            {'detail': f'Wymagana nazwa pliku i rozmiar od 1 do {chunked_upload.MAX_FILE_SIZE} bajtów'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if checksum and (len(checksum) != 64 or any(char not in '0123456789abcdef' for char in checksum)):
+        return Response({'detail': 'Suma kontrolna musi być skrótem SHA-256 (hex)'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Cel sprawdzany przed przesłaniem danych, aby nie przesyłać pliku, którego nie da się zapisać
+    if target == 'progress_report_image':
+        target_data = {'report': request.data.get('report'), 'name': request.data.get('name') or filename,
+                       'description': request.data.get('description')}
+        exists = ProgressReport.objects.filter(pk=target_data['report']).exists() if str(target_data['report']).isdigit() else False
+    elif target == 'quarter_image':
+        if not HasModulePrivilege().has_permission(request, QuarterImageViewSet):
+            return Response({'detail': HasModulePrivilege.message}, status=status.HTTP_403_FORBIDDEN)
+        target_data = {'quarter': request.data.get('quarter'), 'name': request.data.get('name') or filename}
+        exists = Quarter.objects.filter(pk=target_data['quarter']).exists() if str(target_data['quarter']).isdigit() else False
+    else:
+        target_data = {'project_id': request.data.get('project_id')}
+        exists = Project.objects.filter(pk=target_data['project_id']).exists() if str(target_data['project_id']).isdigit() else False
+    if not exists:
+        return Response({'detail': 'Obiekt docelowy nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
+
+    upload = ChunkedUpload.objects.create(
+        user=request.user, target=target, target_data=target_data,
+        filename=filename, size=size, checksum=checksum
+    )
+    return Response(chunked_upload.upload_state(upload), status=status.HTTP_201_CREATED)
+
+def attach_chunked_upload(upload, request):
+    """Zapisuje złożony plik w modelu docelowym - zwraca dane utworzonego obiektu"""
+    with chunked_upload.open_assembled(upload) as assembled:
+        if upload.target == 'activities_config':
+            project = Project.objects.get(pk=upload.target_data['project_id'])
+            return save_activities_config(project, assembled, upload.user)
+
+        if upload.target == 'progress_report_image':
+            serializer_class = ProgressReportImageSerializer
+        else:
+            serializer_class = QuarterImageSerializer
+        serializer = serializer_class(data={**upload.target_data, 'image': assembled}, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(created_by=upload.user)
+        return serializer.data
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def chunked_upload_detail(request, upload_id):
+    """
+    Stan przesyłania (GET), wysłanie części (PUT) lub anulowanie (DELETE).
+
+    PUT: surowe bajty części w treści żądania, nagłówki Upload-Offset (przesunięcie,
+    od którego zaczyna się część) i opcjonalnie Upload-Checksum (SHA-256 części).
+    Przesunięcie różne od potwierdzonego zwraca 409 z aktualnym offsetem - klient
+    wznawia od niego. Po ostatniej części plik jest zapisywany w modelu docelowym.
+    """
+    uploads = ChunkedUpload.objects.filter(user=request.user, upload_id=upload_id)
+
+    if request.method == 'GET':
+        upload = uploads.first()
+        if upload is None:
+            return Response({'detail': 'Przesyłanie nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(chunked_upload.upload_state(upload))
+
+    if request.method == 'DELETE':
+        upload = uploads.first()
+        if upload is not None:
+            chunked_upload.remove_file(upload)
+            upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return Response({'detail': 'Nagłówek Upload-Offset jest wymagany'}, status=status.HTTP_400_BAD_REQUEST)
+
+    upload = uploads.first()
+    if upload is None:
+        return Response({'detail': 'Przesyłanie nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
+    # Warunkowy UPDATE rezerwuje część - bez blokady wiersza na czas odbierania danych
+    if not chunked_upload.claim_chunk(upload, offset):
+        upload.refresh_from_db()
+        if upload.status == 'completed':
+            # Ponowienie ostatniej części po utracie odpowiedzi
+            return Response(chunked_upload.upload_state(upload))
+        return Response(
+            {'detail': 'Nieprawidłowe przesunięcie części' if offset != upload.offset
+                       else 'Część jest właśnie zapisywana - ponów żądanie później',
+             'offset': upload.offset},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    try:
+        written_offset = chunked_upload.write_chunk(
+            upload, request.stream, length, request.headers.get('Upload-Checksum')
+        )
+    except chunked_upload.ChunkError as e:
+        chunked_upload.release_chunk(upload)
+        return Response({'detail': str(e), 'offset': upload.offset}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception:
+        # Zerwane połączenie nie blokuje wznowienia do wygaśnięcia rezerwacji
+        chunked_upload.release_chunk(upload)
+        raise
+
+    if written_offset < upload.size:
+        if not chunked_upload.release_chunk(upload, written_offset):
+            upload.refresh_from_db()
+            return Response(
+                {'detail': 'Nieprawidłowe przesunięcie części', 'offset': upload.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(chunked_upload.upload_state(upload))
+
+    upload.offset = written_offset
+    error = None
+    if upload.checksum and chunked_upload.file_checksum(chunked_upload.upload_path(upload)) != upload.checksum:
+        error = {'detail': 'Suma kontrolna pliku jest nieprawidłowa - prześlij plik ponownie'}
+    else:
+        try:
+            # Obiekt docelowy i zakończenie przesyłania zatwierdzane razem
+            with transaction.atomic():
+                upload.result = attach_chunked_upload(upload, request)
+                upload.status = 'completed'
+                upload.claimed_at = None
+                upload.save(update_fields=['offset', 'status', 'result', 'claimed_at', 'updated_at'])
+        except (ValidationError, ObjectDoesNotExist) as e:
+            error = e.detail if isinstance(e, ValidationError) else {'detail': 'Obiekt docelowy nie istnieje'}
+
+    # Plik tymczasowy nie jest już potrzebny (zdjęcie mogło zostać przeniesione do mediów)
+    chunked_upload.remove_file(upload)
+    if error is not None:
+        # Niepoprawnego pliku nie da się dokończyć - klient rozpoczyna przesyłanie od nowa
+        upload.delete()
+        return Response(error, status=status.HTTP_400_BAD_REQUEST)
+    return Response(chunked_upload.upload_state(upload), status=status.HTTP_201_CREATED)
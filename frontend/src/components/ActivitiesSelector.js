@@ -13,7 +13,12 @@ const ActivitiesSelector = ({
   onSaveComplete  // Callback po zapisaniu aktywności
 }) => {
   const [activities, setActivities] = useState([]);
-  const [activityConfig, setActivityConfig] = useState(null);
+  // Fragmenty konfiguracji aktywności pobierane dla kolejnych poziomów wyboru
+  const [activityTypes, setActivityTypes] = useState([]);
+  const [subActivities, setSubActivities] = useState([]);
+  const [zonas, setZonas] = useState([]);
+  const [rows, setRows] = useState([]);
+  const [tables, setTables] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedMainActivity, setSelectedMainActivity] = useState('');
@@ -83,27 +88,33 @@ const ActivitiesSelector = ({
     setIsInitialized(true);
   }, [existingActivities, activities, updateActivities, isInitialized, reportId]);
 
-  // Pobranie konfiguracji aktywności dla projektu
+  // Pobranie fragmentu konfiguracji aktywności (api/project-activities-config/slice/)
+  const fetchConfigSlice = useCallback(async (params) => {
+    const query = new URLSearchParams({ project_id: projectId, ...params });
+    const response = await fetch(`/api/project-activities-config/slice/?${query}`, {
+      credentials: 'same-origin',
+    });
+
+    if (!response.ok) {
+      throw new Error('Nie udało się pobrać konfiguracji aktywności');
+    }
+
+    return response.json();
+  }, [projectId]);
+
+  // Pobranie dostępnych aktywności dla projektu
   useEffect(() => {
     if (!projectId) {
       setLoading(false);
       return;
     }
 
-    const fetchActivityConfig = async () => {
+    const fetchActivityTypes = async () => {
       try {
         setLoading(true);
-        const response = await fetch(`/api/project-activities-config/?project_id=${projectId}`, {
-          credentials: 'same-origin',
-        });
-
-        if (!response.ok) {
-          throw new Error('Nie udało się pobrać konfiguracji aktywności');
-        }
-
-        const data = await response.json();
-        if (data.config_data) {
-          setActivityConfig(data.config_data);
+        const data = await fetchConfigSlice({});
+        if (data.has_config) {
+          setActivityTypes(data.activity_types);
         } else {
           setError('Brak konfiguracji aktywności dla tego projektu');
         }
@@ -115,8 +126,51 @@ const ActivitiesSelector = ({
       }
     };
 
-    fetchActivityConfig();
-  }, [projectId]);
+    fetchActivityTypes();
+  }, [projectId, fetchConfigSlice]);
+
+  // Podaktywności i zony dla wybranej aktywności (zony zawężone do wybranej podaktywności)
+  useEffect(() => {
+    if (!selectedMainActivity) {
+      setSubActivities([]);
+      setZonas([]);
+      return;
+    }
+
+    const params = { activity_type: selectedMainActivity };
+    if (selectedSubActivity) params.sub_activity = selectedSubActivity;
+
+    fetchConfigSlice(params)
+      .then(data => {
+        setSubActivities(data.sub_activities || []);
+        setZonas(data.zonas || []);
+      })
+      .catch(err => console.error('Błąd pobierania zon:', err));
+  }, [selectedMainActivity, selectedSubActivity, fetchConfigSlice]);
+
+  // Rzędy wybranej zony z planowaną ilością dla podaktywności
+  useEffect(() => {
+    if (!selectedMainActivity || !selectedSubActivity || !selectedZona) {
+      setRows([]);
+      return;
+    }
+
+    fetchConfigSlice({ activity_type: selectedMainActivity, sub_activity: selectedSubActivity, zona: selectedZona })
+      .then(data => setRows(data.rows || []))
+      .catch(err => console.error('Błąd pobierania rzędów:', err));
+  }, [selectedMainActivity, selectedSubActivity, selectedZona, fetchConfigSlice]);
+
+  // Stoły wybranego rzędu (tylko moduły)
+  useEffect(() => {
+    if (selectedMainActivity !== 'Moduły' || !selectedZona || !selectedRow) {
+      setTables([]);
+      return;
+    }
+
+    fetchConfigSlice({ activity_type: selectedMainActivity, zona: selectedZona, row: selectedRow })
+      .then(data => setTables(data.tables || []))
+      .catch(err => console.error('Błąd pobierania stołów:', err));
+  }, [selectedMainActivity, selectedZona, selectedRow, fetchConfigSlice]);
 
   // Po zmianie głównej aktywności, zresetuj pozostałe pola
   useEffect(() => {
@@ -153,7 +207,7 @@ const ActivitiesSelector = ({
     setQuantity('');
 
     // Znajdź jednostkę dla wybranej aktywności
-    if (activityConfig && selectedMainActivity && selectedSubActivity) {
+    if (selectedMainActivity && selectedSubActivity) {
       if (selectedMainActivity === 'Logistyka') {
         if (selectedSubActivity === 'Transport słupów') {
           setUnit('sztuki');
@@ -173,102 +227,22 @@ const ActivitiesSelector = ({
       }
     }
 
-    // Znajdź maksymalną ilość dla wybranego rzędu
-    if (activityConfig && selectedMainActivity && selectedSubActivity && selectedZona && selectedRow) {
-      // Znajdź odpowiednią sekcję konfiguracji
-      let configItems = [];
-
-      if (selectedMainActivity === 'Logistyka' && activityConfig.logistyka) {
-        configItems = activityConfig.logistyka;
-      } else if (selectedMainActivity === 'Konstrukcja' && activityConfig.konstrukcja) {
-        // Połącz wszystkie typy konstrukcji
-        Object.values(activityConfig.konstrukcja).forEach(items => {
-          if (Array.isArray(items)) {
-            configItems = [...configItems, ...items];
-          }
-        });
-      } else if (selectedMainActivity === 'Moduły' && activityConfig.moduly) {
-        configItems = activityConfig.moduly;
-      }
-
-      // Znajdź konkretny wiersz dla zony i rzędu
-      const rowData = configItems.find(item =>
-        item.zona === selectedZona && item.rzad === selectedRow
-      );
-
-      if (rowData) {
-        if (selectedMainActivity === 'Logistyka') {
-          if (selectedSubActivity === 'Transport słupów') {
-            setMaxQuantity(rowData.ilość);
-          } else if (selectedSubActivity === 'Transport modułów') {
-            setMaxQuantity(rowData.ilość_palet);
-          } else if (selectedSubActivity === 'Transport kabli') {
-            // Brak limitu dla kabli
-            setMaxQuantity(null);
-          } else if (selectedSubActivity.includes('Transport konstrukcji')) {
-            if (selectedSubActivity.includes('Przedłużki') && rowData.przedłużki !== undefined) {
-              setMaxQuantity(rowData.przedłużki);
-            } else if (selectedSubActivity.includes('Belki główne') && rowData.belki_główne !== undefined) {
-              setMaxQuantity(rowData.belki_główne);
-            } else if (selectedSubActivity.includes('Stężenia ukośne') && rowData.stężenia_ukośne !== undefined) {
-              setMaxQuantity(rowData.stężenia_ukośne);
-            } else if (selectedSubActivity.includes('Płatwie') && rowData.płatwie !== undefined) {
-              setMaxQuantity(rowData.płatwie);
-            } else {
-              setMaxQuantity(null);
-            }
-          }
-        } else if (selectedMainActivity === 'Konstrukcja') {
-          // Dla podaktywności związanych ze strukturą
-          if (selectedSubActivity.includes('Struktura')) {
-            if (selectedSubActivity.includes('Przedłużki') && rowData.przedłużki !== undefined) {
-              setMaxQuantity(rowData.przedłużki);
-            } else if (selectedSubActivity.includes('Belki główne') && rowData.belki_główne !== undefined) {
-              setMaxQuantity(rowData.belki_główne);
-            } else if (selectedSubActivity.includes('Stężenia ukośne') && rowData.stężenia_ukośne !== undefined) {
-              setMaxQuantity(rowData.stężenia_ukośne);
-            } else if (selectedSubActivity.includes('Płatwie') && rowData.płatwie !== undefined) {
-              setMaxQuantity(rowData.płatwie);
-            } else {
-              setMaxQuantity(rowData.ilość);
-            }
-          } else {
-            // Dla innych podaktywności konstrukcji
-            setMaxQuantity(rowData.ilość);
-          }
-        } else if (selectedMainActivity === 'Moduły') {
-          // Dla modułów ustawimy maxQuantity po wybraniu numeru stołu
-          setMaxQuantity(null);
-        }
-      } else {
-        setMaxQuantity(null);
-      }
+    // Maksymalna ilość to planowana ilość rzędu (dla modułów ustawiana po wybraniu numeru stołu)
+    const rowData = rows.find(item => item.row === selectedRow);
+    if (selectedMainActivity !== 'Moduły' && rowData && rowData.planned !== null && rowData.planned !== undefined) {
+      setMaxQuantity(rowData.planned);
     } else {
       setMaxQuantity(null);
     }
-  }, [selectedZona, selectedRow, activityConfig, selectedMainActivity, selectedSubActivity]);
+  }, [selectedRow, rows, selectedMainActivity, selectedSubActivity]);
 
   // Obsługa zmiany numeru stołu dla modułów
   useEffect(() => {
-    // Dodaj kod do ustawienia maxQuantity dla stołów, jeśli selectedTable istnieje
-    if (selectedMainActivity === 'Moduły' && selectedTable && activityConfig?.moduly) {
-      const rowData = activityConfig.moduly.find(item =>
-        (item.zona === parseInt(selectedZona) || item.zona === selectedZona) &&
-        (item.rzad === parseInt(selectedRow) || item.rzad === selectedRow)
-      );
-
-      if (rowData && rowData.stoly) {
-        const tableData = rowData.stoly.find(stol =>
-          stol.numer === parseInt(selectedTable) || stol.numer === selectedTable
-        );
-
-        if (tableData && tableData.ilosc_modulow !== undefined) {
-          setMaxQuantity(tableData.ilosc_modulow);
-          return; // Wyjdź z useEffect, bo znaleźliśmy właściwe dane
-        }
-      }
+    if (selectedMainActivity === 'Moduły' && selectedTable) {
+      const tableData = tables.find(item => item.table === selectedTable);
+      setMaxQuantity(tableData ? tableData.planned : null);
     }
-  }, [selectedTable, selectedMainActivity, selectedZona, selectedRow, activityConfig]);
+  }, [selectedTable, selectedMainActivity, tables]);
 
   // Funkcja sprawdzająca czy wprowadzona ilość jest prawidłowa
   const isQuantityValid = () => {
@@ -421,24 +395,7 @@ const ActivitiesSelector = ({
 
   // Renderowanie opcji dla głównych aktywności
   const renderMainActivityOptions = () => {
-    if (!activityConfig) return null;
-
-    const mainActivities = [];
-
-    if (activityConfig.logistyka && activityConfig.logistyka.length > 0) {
-      mainActivities.push('Logistyka');
-    }
-
-    if (activityConfig.konstrukcja && Object.keys(activityConfig.konstrukcja).length > 0) {
-      mainActivities.push('Konstrukcja');
-    }
-
-    if (activityConfig.moduly && activityConfig.moduly.length > 0) {
-      mainActivities.push('Moduły');
-    }
-
-    // Zawsze dodaj "Zakończenie budowy", nawet jeśli nie ma w konfiguracji
-    mainActivities.push('Zakończenie budowy');
+    if (activityTypes.length === 0) return null;
 
     return (
       <select
@@ -448,7 +405,7 @@ const ActivitiesSelector = ({
         disabled={isDisabled}
       >
         <option value="">Wybierz aktywność</option>
-        {mainActivities.map(activity => (
+        {activityTypes.map(activity => (
           <option key={activity} value={activity}>{activity}</option>
         ))}
       </select>
@@ -457,92 +414,7 @@ const ActivitiesSelector = ({
 
   // Renderowanie opcji dla podaktywności
   const renderSubActivityOptions = () => {
-    if (!activityConfig || !selectedMainActivity) return null;
-
-    let subActivities = [];
-
-    if (selectedMainActivity === 'Logistyka') {
-      subActivities = [
-        'Transport słupów',
-        'Transport modułów',
-        'Transport kabli',
-        'Transport konstrukcji - Przedłużki',
-        'Transport konstrukcji - Belki główne',
-        'Transport konstrukcji - Stężenia ukośne',
-        'Transport konstrukcji - Płatwie'
-      ];
-    } else if (selectedMainActivity === 'Konstrukcja') {
-      if (activityConfig.konstrukcja) {
-        const constructionType = Object.keys(activityConfig.konstrukcja)[0];
-
-        if (constructionType === 'betonowana') {
-          subActivities = [
-            'Tyczenie punktów',
-            'Wiercenie',
-            'Pozycjonowanie słupów - koromysła',
-            'Betonowanie otworów z nogami'
-          ];
-        } else if (constructionType === 'betonowana_z_wbijaniem_slupow') {
-          subActivities = [
-            'Tyczenie punktów zabicia słupów',
-            'Wiercenie',
-            'Betonowanie otworów',
-            'Wbijanie słupów w beton'
-          ];
-        } else if (constructionType === 'massivy') {
-          subActivities = [
-            'Tyczenie punktów',
-            'Zalewanie szalunków',
-            'Wiercenie dziur pod kotwy',
-            'Zalania massivu'
-          ];
-        } else if (constructionType === 'wbijana') {
-          subActivities = [
-            'Tyczenie punktów',
-            'Wbijanie nóg',
-            'Uszkodzony słup',
-            'Wiercenie',
-            'Wylewanie betonowego bloku'
-          ];
-        } else if (constructionType === 'wbijana_z_wierceniem') {
-          subActivities = [
-            'Tyczenie punktów',
-            'Przedwiercenie',
-            'Wbijanie nóg'
-          ];
-        } else if (constructionType === 'wkrecana') {
-          subActivities = [
-            'Tyczenie punktów',
-            'Przedwiercenie',
-            'Wkręcanie nóg'
-          ];
-        } else if (constructionType === 'kruszywo_i_wbijanie') {
-          subActivities = [
-            'Tyczenie punktów',
-            'Wiercenie',
-            'Wypełnienie otworów kruszywem',
-            'Wbicie słupów'
-          ];
-        }
-
-        // Dodaj także aktywności dla struktury
-        subActivities = [
-          ...subActivities,
-          'Struktura - Przedłużki',
-          'Struktura - Belki główne',
-          'Struktura - Stężenia ukośne',
-          'Struktura - Płatwie'
-        ];
-      }
-    } else if (selectedMainActivity === 'Moduły') {
-      subActivities = ['Montaż modułów'];
-    } else if (selectedMainActivity === 'Zakończenie budowy') {
-      subActivities = [
-        'Kontrola jakości',
-        'Markerowanie',
-        'Sprzątanie'
-      ];
-    }
+    if (!selectedMainActivity) return null;
 
     return (
       <select
@@ -559,169 +431,11 @@ const ActivitiesSelector = ({
     );
   };
 
-  // Renderowanie opcji dla stref
+  // Renderowanie opcji dla stref (posortowane po stronie serwera)
   const renderZonaOptions = () => {
-    if (!activityConfig || !selectedMainActivity || !selectedSubActivity) return null;
+    if (!selectedMainActivity || !selectedSubActivity) return null;
 
-    let zonas = [];
-
-    // Funkcja pomocnicza do zbierania unikalnych zon z sekcji
-    const collectZonasFromSection = (section) => {
-      if (!Array.isArray(section)) return [];
-      const zonaSet = new Set();
-      section.forEach(item => {
-        if (item.zona) zonaSet.add(item.zona);
-      });
-      return Array.from(zonaSet);
-    };
-
-    // Pobierz odpowiednią sekcję z konfiguracji
-    if (selectedMainActivity === 'Logistyka') {
-      // Dla transportu może być potrzebne dodatkowe filtrowanie
-      if (selectedSubActivity.includes('Transport konstrukcji')) {
-        // Filtrowanie zon dla transportu elementów konstrukcji
-        const specificKey = selectedSubActivity.includes('Przedłużki') ? 'przedłużki' :
-                          selectedSubActivity.includes('Belki główne') ? 'belki_główne' :
-                          selectedSubActivity.includes('Stężenia ukośne') ? 'stężenia_ukośne' :
-                          selectedSubActivity.includes('Płatwie') ? 'płatwie' : null;
-
-        if (specificKey && Array.isArray(activityConfig.logistyka)) {
-          const filteredSection = activityConfig.logistyka.filter(item => item[specificKey] !== undefined);
-          zonas = collectZonasFromSection(filteredSection);
-        } else {
-          zonas = collectZonasFromSection(activityConfig.logistyka);
-        }
-      }
-      // Dla transportu słupów i modułów
-      else if (selectedSubActivity === 'Transport słupów') {
-        const filteredSection = Array.isArray(activityConfig.logistyka) ?
-          activityConfig.logistyka.filter(item => item.ilość !== undefined) : [];
-        zonas = collectZonasFromSection(filteredSection);
-      }
-      else if (selectedSubActivity === 'Transport modułów') {
-        const filteredSection = Array.isArray(activityConfig.logistyka) ?
-          activityConfig.logistyka.filter(item => item.ilość_palet !== undefined) : [];
-        zonas = collectZonasFromSection(filteredSection);
-      }
-      // Dla pozostałych podaktywności logistyki
-      else {
-        zonas = collectZonasFromSection(activityConfig.logistyka);
-      }
-    }
-    // Dla konstrukcji
-    else if (selectedMainActivity === 'Konstrukcja') {
-      // Znajdź wszystkie zony dla wszystkich typów konstrukcji
-      const zonaSet = new Set();
-
-      if (activityConfig.konstrukcja) {
-        Object.keys(activityConfig.konstrukcja).forEach(type => {
-          const sectionData = activityConfig.konstrukcja[type];
-
-          // Jeśli podaktywność związana ze strukturą, możemy filtrować
-          if (selectedSubActivity.includes('Struktura')) {
-            const specificKey = selectedSubActivity.includes('Przedłużki') ? 'przedłużki' :
-                              selectedSubActivity.includes('Belki główne') ? 'belki_główne' :
-                              selectedSubActivity.includes('Stężenia ukośne') ? 'stężenia_ukośne' :
-                              selectedSubActivity.includes('Płatwie') ? 'płatwie' : null;
-
-            if (specificKey && Array.isArray(sectionData)) {
-              const filteredItems = sectionData.filter(item => item[specificKey] !== undefined);
-              filteredItems.forEach(item => {
-                if (item.zona) zonaSet.add(item.zona);
-              });
-            } else if (Array.isArray(sectionData)) {
-              sectionData.forEach(item => {
-                if (item.zona) zonaSet.add(item.zona);
-              });
-            }
-          }
-          // Dla innych podaktywności konstrukcji
-          else if (Array.isArray(sectionData)) {
-            sectionData.forEach(item => {
-              if (item.zona) zonaSet.add(item.zona);
-            });
-          }
-        });
-      }
-
-      zonas = Array.from(zonaSet);
-    }
-    // Dla modułów
-    else if (selectedMainActivity === 'Moduły') {
-      zonas = collectZonasFromSection(activityConfig.moduly);
-    }
-    // Dla zakończenia budowy - zbierz zony ze wszystkich sekcji
-    else if (selectedMainActivity === 'Zakończenie budowy') {
-      const zonaSet = new Set();
-
-      if (activityConfig.logistyka && Array.isArray(activityConfig.logistyka)) {
-        activityConfig.logistyka.forEach(item => {
-          if (item.zona) zonaSet.add(item.zona);
-        });
-      }
-
-      if (activityConfig.konstrukcja) {
-        Object.values(activityConfig.konstrukcja).forEach(items => {
-          if (Array.isArray(items)) {
-            items.forEach(item => {
-              if (item.zona) zonaSet.add(item.zona);
-            });
-          }
-        });
-      }
-
-      if (activityConfig.moduly && Array.isArray(activityConfig.moduly)) {
-        activityConfig.moduly.forEach(item => {
-          if (item.zona) zonaSet.add(item.zona);
-        });
-      }
-
-      zonas = Array.from(zonaSet);
-    }
-
-    // Jeśli nie znaleziono żadnych zon, spróbuj pobrać je ze wszystkich sekcji
-    if (zonas.length === 0) {
-      const zonaSet = new Set();
-
-      if (activityConfig.logistyka && Array.isArray(activityConfig.logistyka)) {
-        activityConfig.logistyka.forEach(item => {
-          if (item.zona) zonaSet.add(item.zona);
-        });
-      }
-
-      if (activityConfig.konstrukcja) {
-        Object.values(activityConfig.konstrukcja).forEach(items => {
-          if (Array.isArray(items)) {
-            items.forEach(item => {
-              if (item.zona) zonaSet.add(item.zona);
-            });
-          }
-        });
-      }
-
-      if (activityConfig.moduly && Array.isArray(activityConfig.moduly)) {
-        activityConfig.moduly.forEach(item => {
-          if (item.zona) zonaSet.add(item.zona);
-        });
-      }
-
-      zonas = Array.from(zonaSet);
-    }
-
-    zonas.sort((a, b) => {
-      // Spróbuj przekonwertować na liczby, jeśli możliwe
-      const numA = parseInt(a);
-      const numB = parseInt(b);
-
-      if (!isNaN(numA) && !isNaN(numB)) {
-        return numA - numB;
-      }
-
-      // Jeśli nie da się przekonwertować, sortuj alfabetycznie
-      return a.localeCompare(b);
-     });
-
-     return (
+    return (
       <select
         value={selectedZona}
         onChange={(e) => setSelectedZona(e.target.value)}
@@ -733,129 +447,49 @@ const ActivitiesSelector = ({
           <option key={zona} value={zona}>{zona}</option>
         ))}
       </select>
-     );
-     };
-
-     // Renderowanie opcji dla rzędów
-     const renderRowOptions = () => {
-      if (!activityConfig || !selectedMainActivity || !selectedSubActivity || !selectedZona) return null;
-
-      // Zbieramy wszystkie rzędy dla wybranej zony i podaktywności
-      const rowSet = new Set();
-
-      // Znajdź i przetwórz dane dla wybranej kombinacji
-      if (selectedMainActivity === 'Logistyka') {
-        const logistykaData = activityConfig.logistyka;
-
-        if (Array.isArray(logistykaData)) {
-          // Filtruj elementy dla wybranej zony
-          logistykaData.forEach(item => {
-            // Sprawdź, czy item zawiera zonę i czy jest to nasza wybrana zona
-            if (item.zona === parseInt(selectedZona) || item.zona === selectedZona) {
-              // Element ma zonę, sprawdź czy ma rzad
-              if (item.rzad !== undefined) {
-                // Dodaj rzad do zbioru
-                rowSet.add(item.rzad.toString());
-              }
-            }
-          });
-        }
-      } else if (selectedMainActivity === 'Konstrukcja') {
-        // Podobna logika dla konstrukcji
-        if (activityConfig.konstrukcja) {
-          Object.values(activityConfig.konstrukcja).forEach(items => {
-            if (Array.isArray(items)) {
-              items.forEach(item => {
-                if (item.zona === parseInt(selectedZona) || item.zona === selectedZona) {
-                  if (item.rzad !== undefined) {
-                    rowSet.add(item.rzad.toString());
-                  }
-                }
-              });
-            }
-          });
-        }
-      } else if (selectedMainActivity === 'Moduły') {
-        // Podobna logika dla modułów
-        if (Array.isArray(activityConfig.moduly)) {
-          activityConfig.moduly.forEach(item => {
-            if (item.zona === parseInt(selectedZona) || item.zona === selectedZona) {
-              if (item.rzad !== undefined) {
-                rowSet.add(item.rzad.toString());
-              }
-            }
-          });
-        }
-      }
-
-      // Konwertuj Set na tablicę i sortuj
-      let rows = Array.from(rowSet);
-
-      // Sortowanie rzędów
-      rows.sort((a, b) => {
-        // Spróbuj przekonwertować na liczby, jeśli możliwe
-        const numA = parseInt(a);
-        const numB = parseInt(b);
-
-        if (!isNaN(numA) && !isNaN(numB)) {
-          return numA - numB;
-        }
+    );
+  };
 
-        // Jeśli nie da się przekonwertować, sortuj alfabetycznie
-        return a.localeCompare(b);
-      });
+  // Renderowanie opcji dla rzędów
+  const renderRowOptions = () => {
+    if (!selectedMainActivity || !selectedSubActivity || !selectedZona) return null;
 
-      return (
-        <select
-          value={selectedRow}
-          onChange={(e) => setSelectedRow(e.target.value)}
-          className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 disabled:bg-gray-100 disabled:text-gray-500"
-          disabled={isDisabled || !selectedZona}
-        >
-          <option value="">Wybierz rząd</option>
-          {rows.map(row => (
-            <option key={row} value={row}>{row}</option>
-          ))}
-        </select>
-      );
-     };
-
-     // Renderowanie opcji dla numerów stołów
-     const renderTableOptions = () => {
-      if (!activityConfig || !selectedMainActivity || !selectedSubActivity ||
-          !selectedZona || !selectedRow || selectedMainActivity !== 'Moduły') {
-        return null;
-      }
+    return (
+      <select
+        value={selectedRow}
+        onChange={(e) => setSelectedRow(e.target.value)}
+        className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 disabled:bg-gray-100 disabled:text-gray-500"
+        disabled={isDisabled || !selectedZona}
+      >
+        <option value="">Wybierz rząd</option>
+        {rows.map(item => (
+          <option key={item.row} value={item.row}>{item.row}</option>
+        ))}
+      </select>
+    );
+  };
 
-      // Pobierz dane dla wybranej zony i rzędu
-      let tableNumbers = [];
-      if (Array.isArray(activityConfig.moduly)) {
-        // Znajdź odpowiedni rząd i zonę
-        const rowData = activityConfig.moduly.find(item =>
-          (item.zona === parseInt(selectedZona) || item.zona === selectedZona) &&
-          (item.rzad === parseInt(selectedRow) || item.rzad === selectedRow)
-        );
-
-        if (rowData && rowData.stoly && Array.isArray(rowData.stoly)) {
-          // Pobierz numery stołów
-          tableNumbers = rowData.stoly.map(stol => stol.numer);
-        }
-      }
+  // Renderowanie opcji dla numerów stołów
+  const renderTableOptions = () => {
+    if (!selectedMainActivity || !selectedSubActivity ||
+        !selectedZona || !selectedRow || selectedMainActivity !== 'Moduły') {
+      return null;
+    }
 
-      return (
-        <select
-          value={selectedTable}
-          onChange={(e) => setSelectedTable(e.target.value)}
-          className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 disabled:bg-gray-100 disabled:text-gray-500"
-          disabled={isDisabled || tableNumbers.length === 0}
-        >
-          <option value="">Wybierz numer stołu</option>
-          {tableNumbers.map(number => (
-            <option key={number} value={number}>{number}</option>
-          ))}
-        </select>
-      );
-     };
+    return (
+      <select
+        value={selectedTable}
+        onChange={(e) => setSelectedTable(e.target.value)}
+        className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 disabled:bg-gray-100 disabled:text-gray-500"
+        disabled={isDisabled || tables.length === 0}
+      >
+        <option value="">Wybierz numer stołu</option>
+        {tables.map(item => (
+          <option key={item.table} value={item.table}>{item.table}</option>
+        ))}
+      </select>
+    );
+  };
 
      // Renderowanie komponentu
      return (
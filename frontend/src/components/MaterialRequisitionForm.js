@@ -212,9 +212,10 @@ const MaterialRequisitionForm = ({ mode = 'view' }) => {
 
     if (currentItemIndex !== null) {
       // Edycja istniejącego elementu
+      // Zachowujemy ID pozycji, aby backend zaktualizował ją zamiast tworzyć nową
       setRequisition(prev => ({
         ...prev,
-        items: prev.items.map((item, i) => i === currentItemIndex ? newItem : item)
+        items: prev.items.map((item, i) => i === currentItemIndex ? { ...newItem, id: item.id } : item)
       }));
     } else {
       // Dodanie nowego elementu
@@ -254,13 +255,20 @@ const MaterialRequisitionForm = ({ mode = 'view' }) => {
         return;
       }
 
-      // Przygotuj dane zapotrzebowania (bez przedmiotów)
+      // Przygotuj dane zapotrzebowania wraz z pozycjami - backend zapisuje je w jednej transakcji
+      // (pozycje z ID są aktualizowane, bez ID dodawane, a pominięte usuwane)
       const requisitionData = {
         project: requisition.project,
         deadline: requisition.deadline,
         requisition_type: requisition.requisition_type,
         status: requisition.status,
-        comment: requisition.comment || ''
+        comment: requisition.comment || '',
+        items: requisition.items.map(item => ({
+          ...(item.id ? { id: item.id } : {}),
+          item: item.item,
+          quantity: item.quantity,
+          price: parseFloat(item.price)
+        }))
       };
 
       // Określamy ścieżkę odpowiednio do trybu
@@ -272,7 +280,7 @@ const MaterialRequisitionForm = ({ mode = 'view' }) => {
         method = 'PATCH';
       }
 
-      // Krok 1: Zapisz główne zapotrzebowanie
+      // Zapisz zapotrzebowanie wraz z pozycjami
       let response;
       try {
         response = await fetch(url, {
@@ -326,63 +334,6 @@ const MaterialRequisitionForm = ({ mode = 'view' }) => {
         }
       }
 
-      // Pobierz zapisane zapotrzebowanie, aby uzyskać jego ID
-      const savedRequisition = await response.json();
-      const requisitionId = savedRequisition.id || id;
-
-      // Krok 2: Jeśli jesteśmy w trybie edycji, usuń najpierw wszystkie istniejące przedmioty
-      if (mode === 'edit') {
-        // Pobieramy aktualne przedmioty
-        const currentItemsResponse = await fetch(`/api/requisitions/${requisitionId}/`, {
-          credentials: 'same-origin',
-        });
-
-        if (currentItemsResponse.ok) {
-          const currentData = await currentItemsResponse.json();
-
-          // Usuwamy istniejące przedmioty
-          if (currentData.items && currentData.items.length > 0) {
-            for (const item of currentData.items) {
-              if (item.id) {
-                await fetch(`/api/requisition-items/${item.id}/`, {
-                  method: 'DELETE',
-                  headers: {
-                    'X-CSRFToken': getCsrfToken(),
-                  },
-                  credentials: 'same-origin',
-                });
-              }
-            }
-          }
-        }
-      }
-
-      // Krok 3: Dodaj wszystkie przedmioty pojedynczo
-      for (const item of requisition.items) {
-        const itemData = {
-          requisition: requisitionId,
-          item: item.item,
-          quantity: item.quantity,
-          price: parseFloat(item.price)
-        };
-
-        const itemResponse = await fetch('/api/requisition-items/', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'X-CSRFToken': getCsrfToken(),
-          },
-          body: JSON.stringify(itemData),
-          credentials: 'same-origin',
-        });
-
-        if (!itemResponse.ok) {
-          const errorData = await itemResponse.json();
-          console.error('Błąd dodawania przedmiotu:', errorData);
-          // Kontynuujemy mimo błędu, aby spróbować dodać pozostałe przedmioty
-        }
-      }
-
       // Odśwież listę zapotrzebowań w kontekście
       refreshRequisitions();
 
@@ -16,6 +16,7 @@ import {
   Image as ImageIcon
 } from 'lucide-react';
 import { getCsrfToken } from '../../utils/csrfToken';
+import { uploadInChunks } from '../../utils/chunkedUpload';
 
 const QuarterDetailView = () => {
   const { id } = useParams();
@@ -99,23 +100,8 @@ const QuarterDetailView = () => {
     try {
       setUploadingImage(true);
 
-      const formData = new FormData();
-      formData.append('image', file);
-      formData.append('quarter', id);
-      formData.append('name', file.name);
-
-      const response = await fetch('/api/quarter-images/', {
-        method: 'POST',
-        headers: {
-          'X-CSRFToken': getCsrfToken()
-        },
-        body: formData,
-        credentials: 'same-origin',
-      });
-
-      if (!response.ok) {
-        throw new Error('Nie udało się przesłać zdjęcia');
-      }
+      // Przesyłanie w częściach - przerwane połączenie wznawia od ostatniej potwierdzonej części
+      await uploadInChunks(file, 'quarter_image', { quarter: id, name: file.name });
 
       // Pobierz zaktualizowaną listę zdjęć
       fetchQuarterImages();
@@ -355,7 +341,7 @@ const QuarterDetailView = () => {
                     onClick={() => handleImageClick(image)}
                   >
                     <img
-                      src={image.image_url || image.image}
+                      src={image.thumbnail_url || image.image_url || image.image}
                       alt={image.name}
                       className="w-full h-32 object-cover"
                       onError={(e) => {
@@ -393,7 +379,7 @@ const QuarterDetailView = () => {
 
             <div className="p-2">
               <img
-                src={selectedImage.image_url || selectedImage.image}
+                src={selectedImage.medium_url || selectedImage.image_url || selectedImage.image}
                 alt={selectedImage.name}
                 className="max-h-[80vh] max-w-full object-contain"
                 onError={(e) => {
@@ -24,6 +24,7 @@ import {
   Square
 } from 'lucide-react';
 import { getCsrfToken } from '../utils/csrfToken';
+import { uploadInChunks } from '../utils/chunkedUpload';
 import ProgressReportBarChart from '../components/ProgressReportBarChart';
 import ActivitiesSelector from '../components/ActivitiesSelector';
 
@@ -597,23 +598,8 @@ const ProgressReportPage = () => {
     try {
       setUploadingImage(true);
 
-      const formData = new FormData();
-      formData.append('image', file);
-      formData.append('report', reportData.id);
-      formData.append('name', file.name);
-
-      const response = await fetch('/api/progress-report-images/', {
-        method: 'POST',
-        headers: {
-          'X-CSRFToken': getCsrfToken()
-        },
-        body: formData,
-        credentials: 'same-origin',
-      });
-
-      if (!response.ok) {
-        throw new Error('Nie udało się przesłać zdjęcia');
-      }
+      // Przesyłanie w częściach - przerwane połączenie wznawia od ostatniej potwierdzonej części
+      await uploadInChunks(file, 'progress_report_image', { report: reportData.id, name: file.name });
 
       // Pobierz zaktualizowaną listę zdjęć
       fetchReportImages(reportData.id);
@@ -647,25 +633,8 @@ const ProgressReportPage = () => {
 
     for (const tempImage of tempImages) {
       try {
-        const formData = new FormData();
-        formData.append('image', tempImage.file);
-        formData.append('report', reportId);
-        formData.append('name', tempImage.name);
-
-        const response = await fetch('/api/progress-report-images/', {
-          method: 'POST',
-          headers: {
-            'X-CSRFToken': getCsrfToken()
-          },
-          body: formData,
-          credentials: 'same-origin',
-        });
-
-        if (response.ok) {
-          uploadedCount++;
-        } else {
-          errorCount++;
-        }
+        await uploadInChunks(tempImage.file, 'progress_report_image', { report: reportId, name: tempImage.name });
+        uploadedCount++;
       } catch (err) {
         errorCount++;
         console.error("Błąd przesyłania tymczasowego zdjęcia:", err);
@@ -849,18 +818,9 @@ const ProgressReportPage = () => {
         }))
       };
 
-      // Określ URL i metodę w zależności od tego, czy edytujemy istniejący raport
-      let url = '/api/create-progress-report/';
-      let method = 'POST';
-
-      if (isEditingDraft && reportData && reportData.id) {
-        url = `/api/progress-reports/${reportData.id}/`;
-        method = 'PATCH';
-      }
-
-      // Wyślij dane do API
-      const response = await fetch(url, {
-        method: method,
+      // Endpoint tworzy nowy raport albo aktualizuje istniejący (ta sama data i projekt) wraz z wpisami
+      const response = await fetch('/api/create-progress-report/', {
+        method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           'X-CSRFToken': getCsrfToken(),
@@ -1403,7 +1363,7 @@ const ProgressReportPage = () => {
                   onClick={() => handleImageClick(image)}
                 >
                   <img
-                    src={image.image_url || image.image}
+                    src={image.thumbnail_url || image.image_url || image.image}
                     alt={image.name}
                     className="w-full h-32 object-cover"
                     onError={(e) => {
@@ -1442,7 +1402,7 @@ const ProgressReportPage = () => {
 
               <div className="p-2">
                 <img
-                  src={selectedImage.image_url || selectedImage.image}
+                  src={selectedImage.medium_url || selectedImage.image_url || selectedImage.image}
                   alt={selectedImage.name}
                   className="max-h-[80vh] max-w-full object-contain"
                   onError={(e) => {
@@ -60,15 +60,16 @@ const ProgressReportView = () => {
   // Refs
   const searchInputRef = useRef(null);
 
-  // Fetch reports on initial load
+  // Fetch reports on initial load and whenever the server-side filters change
   useEffect(() => {
     fetchReports();
-  }, []);
+  }, [filterPeriod, selectedProject]);
 
-  // Update filtered reports when search term, filter period, or selected project changes
+  // Update filtered reports when reports or search term change
   useEffect(() => {
+    // Server-side filters may return an empty list - always refresh the visible reports
+    applyFilters();
     if (reports.length > 0) {
-      applyFilters();
       generateChartData();
       calculateStats();
 
@@ -84,22 +85,63 @@ const ProgressReportView = () => {
         setAvailableProjects(uniqueProjects);
       }
     }
-  }, [reports, searchTerm, filterPeriod, selectedProject]);
+  }, [reports, searchTerm]);
 
-  // Prepare calendar data when month or reports change
+  // Load calendar aggregates when the calendar is shown, the month or the project changes
   useEffect(() => {
-    if (reports.length > 0) {
-      generateCalendarData();
+    if (viewMode === 'calendar') {
+      fetchCalendarData();
+    }
+  }, [viewMode, currentMonth, selectedProject]);
+
+  /**
+   * Returns the first day (YYYY-MM-DD) of the selected time period, or null for all reports
+   */
+  const getPeriodStart = (period) => {
+    const today = new Date();
+    let cutoffDate;
+
+    switch (period) {
+      case 'last7':
+        cutoffDate = new Date(today);
+        cutoffDate.setDate(today.getDate() - 7);
+        break;
+      case 'last30':
+        cutoffDate = new Date(today);
+        cutoffDate.setDate(today.getDate() - 30);
+        break;
+      case 'last90':
+        cutoffDate = new Date(today);
+        cutoffDate.setDate(today.getDate() - 90);
+        break;
+      case 'thisYear':
+        cutoffDate = new Date(today.getFullYear(), 0, 1);
+        break;
+      case 'all':
+      default:
+        return null;
     }
-  }, [reports, currentMonth]);
+
+    return cutoffDate.toISOString().split('T')[0];
+  };
 
   /**
-   * Fetches all progress reports for the current user
+   * Fetches progress reports for the current user, filtered on the server by period and project.
+   * Summary mode skips image lists - they are loaded when the report details are opened.
    */
   const fetchReports = async () => {
     try {
       setLoading(true);
-      const response = await fetch('/api/progress-reports/', {
+      const params = new URLSearchParams({ summary: '1' });
+      const dateFrom = getPeriodStart(filterPeriod);
+      if (dateFrom) {
+        params.append('date_from', dateFrom);
+      }
+      if (selectedProject !== 'all') {
+        params.append('project', selectedProject);
+      }
+
+      const response = await fetch(`/api/progress-reports/?${params.toString()}`, {
         credentials: 'same-origin',
       });
 
@@ -119,7 +161,7 @@ const ProgressReportView = () => {
   };
 
   /**
-   * Applies the search term, time period, and project filters to the reports
+   * Applies the search term to the reports (period and project are filtered on the server)
    */
   const applyFilters = () => {
     let result = [...reports];
@@ -134,44 +176,6 @@ const ProgressReportView = () => {
       );
     }
 
-    // Apply time period filter
-    const today = new Date();
-    let cutoffDate;
-
-    switch (filterPeriod) {
-      case 'last7':
-        cutoffDate = new Date(today);
-        cutoffDate.setDate(today.getDate() - 7);
-        break;
-      case 'last30':
-        cutoffDate = new Date(today);
-        cutoffDate.setDate(today.getDate() - 30);
-        break;
-      case 'last90':
-        cutoffDate = new Date(today);
-        cutoffDate.setDate(today.getDate() - 90);
-        break;
-      case 'thisYear':
-        cutoffDate = new Date(today.getFullYear(), 0, 1);
-        break;
-      case 'all':
-      default:
-        cutoffDate = null;
-        break;
-    }
-
-    if (cutoffDate) {
-      result = result.filter(report => {
-        const reportDate = new Date(report.date);
-        return reportDate >= cutoffDate;
-      });
-    }
-
-    // Apply project filter
-    if (selectedProject !== 'all') {
-      result = result.filter(report => report.project == selectedProject);
-    }
-
     // Sort by date, newest first
     result.sort((a, b) => new Date(b.date) - new Date(a.date));
 
@@ -332,9 +336,35 @@ const ProgressReportView = () => {
   };
 
   /**
-   * Generates data for the calendar view
+   * Fetches per-day aggregates for the displayed month and builds the calendar grid
+   */
+  const fetchCalendarData = async () => {
+    const year = currentMonth.getFullYear();
+    const month = currentMonth.getMonth();
+    const params = new URLSearchParams({ month: `${year}-${String(month + 1).padStart(2, '0')}` });
+    if (selectedProject !== 'all') {
+      params.append('project', selectedProject);
+    }
+
+    try {
+      const response = await fetch(`/api/progress-report-calendar/?${params.toString()}`, {
+        credentials: 'same-origin',
+      });
+      if (!response.ok) {
+        throw new Error('Nie udało się pobrać kalendarza raportów');
+      }
+      const data = await response.json();
+      generateCalendarData(new Map(data.days.map(day => [day.date, day])));
+    } catch (err) {
+      console.error('Error fetching calendar data:', err);
+      generateCalendarData(new Map());
+    }
+  };
+
+  /**
+   * Generates data for the calendar view from per-day aggregates
    */
-  const generateCalendarData = () => {
+  const generateCalendarData = (daySummaries) => {
     const year = currentMonth.getFullYear();
     const month = currentMonth.getMonth();
 
@@ -351,20 +381,19 @@ const ProgressReportView = () => {
     // Create array with days of the current month
     const currentMonthDays = Array.from({ length: daysInMonth }, (_, i) => {
       const day = i + 1;
-      const date = new Date(year, month, day);
-      const dateString = date.toISOString().split('T')[0];
+      // Local calendar date - toISOString() would shift it to UTC
+      const dateString = `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
 
-      // Find reports for this day
-      const dayReports = reports.filter(report => report.date === dateString);
+      const summary = daySummaries.get(dateString);
 
       return {
         day,
         date: dateString,
-        reports: dayReports,
-        totalHours: dayReports.reduce((total, report) => {
-          if (!report.entries) return total;
-          return total + report.entries.reduce((sum, entry) => sum + (parseFloat(entry.hours_worked) || 0), 0);
-        }, 0),
+        reportCount: summary ? summary.report_count : 0,
+        draftCount: summary ? summary.draft_count : 0,
+        finalCount: summary ? summary.final_count : 0,
+        employeeCount: summary ? summary.employee_count : 0,
+        totalHours: summary ? Math.round(summary.total_hours * 10) / 10 : 0,
         isToday: dateString === new Date().toISOString().split('T')[0]
       };
     });
@@ -391,12 +420,49 @@ const ProgressReportView = () => {
     });
   };
 
+  /**
+   * Opens the first report of the given calendar day
+   */
+  const openDayReports = async (date) => {
+    const params = new URLSearchParams({ summary: '1', date_from: date, date_to: date });
+    if (selectedProject !== 'all') {
+      params.append('project', selectedProject);
+    }
+
+    try {
+      const response = await fetch(`/api/progress-reports/?${params.toString()}`, {
+        credentials: 'same-origin',
+      });
+      if (response.ok) {
+        const dayReports = await response.json();
+        if (dayReports.length > 0) {
+          openReportDetails(dayReports[0]);
+        }
+      }
+    } catch (err) {
+      console.error('Error fetching day reports:', err);
+    }
+  };
+
   /**
    * Opens the report details modal
    */
-  const openReportDetails = (report) => {
+  const openReportDetails = async (report) => {
     setSelectedReport(report);
     setShowReportModal(true);
+
+    // The list is loaded in summary mode - fetch the full report with images
+    try {
+      const response = await fetch(`/api/progress-reports/${report.id}/`, {
+        credentials: 'same-origin',
+      });
+      if (response.ok) {
+        const fullReport = await response.json();
+        setSelectedReport(current => (current && current.id === fullReport.id ? fullReport : current));
+      }
+    } catch (err) {
+      console.error('Error fetching report details:', err);
+    }
   };
 
   /**
@@ -865,7 +931,7 @@ const ProgressReportView = () => {
               <div
                 key={index}
                 className={`min-h-32 bg-white ${dayData ? 'hover:bg-gray-50 cursor-pointer' : ''}`}
-                onClick={() => dayData && dayData.reports.length > 0 && openReportDetails(dayData.reports[0])}
+                onClick={() => dayData && dayData.reportCount > 0 && openDayReports(dayData.date)}
               >
                 {dayData ? (
                   <div className="p-2 h-full">
@@ -873,26 +939,20 @@ const ProgressReportView = () => {
                       {dayData.day}
                     </div>
 
-                    {dayData.reports.length > 0 && (
+                    {dayData.reportCount > 0 && (
                       <div className="mt-2">
-                        {dayData.reports.map(report => (
-                          <div
-                            key={report.id}
-                            className={`mb-1 p-1 text-xs rounded ${report.is_draft ? 'bg-yellow-100' : 'bg-green-100'}`}
-                          >
-                            <div className="font-medium truncate">{report.project_name}</div>
-                            <div className="flex items-center justify-between mt-1">
-                              <span>{getTotalHours(report)} godz.</span>
-                              <span>{report.entries?.length || 0} os.</span>
-                            </div>
+                        <div
+                          className={`mb-1 p-1 text-xs rounded ${dayData.finalCount > 0 ? 'bg-green-100' : 'bg-yellow-100'}`}
+                        >
+                          <div className="font-medium truncate">
+                            Raporty: {dayData.reportCount}
+                            {dayData.draftCount > 0 && dayData.finalCount > 0 && ` (robocze: ${dayData.draftCount})`}
                           </div>
-                        ))}
-                      </div>
-                    )}
-
-                    {dayData.totalHours > 0 && dayData.reports.length > 1 && (
-                      <div className="mt-1 text-xs font-medium text-gray-500">
-                        Łącznie: {dayData.totalHours} godz.
+                          <div className="flex items-center justify-between mt-1">
+                            <span>{dayData.totalHours} godz.</span>
+                            <span>{dayData.employeeCount} os.</span>
+                          </div>
+                        </div>
                       </div>
                     )}
                   </div>
@@ -1091,7 +1151,7 @@ const ProgressReportView = () => {
                         onClick={() => openImageViewer(image)}
                       >
                         <img
-                          src={image.image_url}
+                          src={image.thumbnail_url || image.image_url}
                           alt={image.name || 'Zdjęcie raportu'}
                           className="w-full h-32 object-cover"
                         />
@@ -1140,7 +1200,7 @@ const ProgressReportView = () => {
                 <X size={20} />
               </button>
               <img
-                src={selectedImage.image_url}
+                src={selectedImage.medium_url || selectedImage.image_url}
                 alt={selectedImage.name || 'Podgląd zdjęcia'}
                 className="max-h-[80vh] rounded-lg"
               />
@@ -0,0 +1,106 @@
+// Przesyłanie plików w częściach z wznawianiem (api/uploads/)
+import { getCsrfToken } from './csrfToken';
+
+const MAX_RETRIES = 5;
+
+const wait = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Klucz w localStorage - ten sam plik wysłany do tego samego celu wznawia poprzednie przesyłanie
+const storageKey = (file, target, fields) =>
+  `chunked-upload:${target}:${JSON.stringify(fields)}:${file.name}:${file.size}:${file.lastModified}`;
+
+// SHA-256 części (hex) - tylko w bezpiecznym kontekście (HTTPS), w przeciwnym razie pomijana
+const chunkChecksum = async (chunk) => {
+  if (!window.crypto || !window.crypto.subtle) return null;
+  const digest = await window.crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map(byte => byte.toString(16).padStart(2, '0')).join('');
+};
+
+const fetchState = async (uploadId) => {
+  const response = await fetch(`/api/uploads/${uploadId}/`, { credentials: 'same-origin' });
+  return response.ok ? response.json() : null;
+};
+
+const startUpload = async (file, target, fields) => {
+  const response = await fetch('/api/uploads/', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': getCsrfToken()
+    },
+    body: JSON.stringify({ target, filename: file.name, size: file.size, ...fields }),
+    credentials: 'same-origin',
+  });
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.detail || 'Nie udało się rozpocząć przesyłania');
+  }
+  return response.json();
+};
+
+/**
+ * Przesyła plik w częściach. Po zerwaniu połączenia ponawia część od ostatniego
+ * potwierdzonego przesunięcia, a po ponownym wywołaniu dla tego samego pliku
+ * wznawia przerwane przesyłanie.
+ * @returns {Promise<Object>} dane obiektu utworzonego z przesłanego pliku
+ */
+export async function uploadInChunks(file, target, fields = {}, onProgress) {
+  const key = storageKey(file, target, fields);
+  const savedId = localStorage.getItem(key);
+  let state = savedId ? await fetchState(savedId).catch(() => null) : null;
+
+  if (!state) {
+    state = await startUpload(file, target, fields);
+    localStorage.setItem(key, state.upload_id);
+  }
+
+  let retries = 0;
+  while (state.status !== 'completed') {
+    const chunk = file.slice(state.offset, Math.min(state.offset + state.chunk_size, file.size));
+    const headers = {
+      'Content-Type': 'application/octet-stream',
+      'Upload-Offset': String(state.offset),
+      'X-CSRFToken': getCsrfToken()
+    };
+    const checksum = await chunkChecksum(chunk);
+    if (checksum) headers['Upload-Checksum'] = checksum;
+
+    let response;
+    try {
+      response = await fetch(`/api/uploads/${state.upload_id}/`, {
+        method: 'PUT',
+        headers,
+        body: chunk,
+        credentials: 'same-origin',
+      });
+    } catch (networkError) {
+      if (++retries > MAX_RETRIES) throw networkError;
+      await wait(1000 * 2 ** retries);
+      // Serwer mógł zapisać część mimo utraty odpowiedzi - pobierz potwierdzone przesunięcie
+      state = (await fetchState(state.upload_id).catch(() => null)) || state;
+      continue;
+    }
+
+    const data = await response.json().catch(() => ({}));
+    if (response.status === 409) {
+      state = { ...state, offset: data.offset };
+      continue;
+    }
+    if (!response.ok) {
+      if (response.status === 404 || (response.status === 400 && data.offset === undefined)) {
+        // Przesyłanie odrzucone w całości - kolejna próba zacznie od nowa
+        localStorage.removeItem(key);
+      }
+      throw new Error(data.detail || 'Nie udało się przesłać pliku');
+    }
+
+    retries = 0;
+    state = data;
+    if (onProgress) onProgress(state.offset / state.size);
+  }
+
+  localStorage.removeItem(key);
+  return state.result;
+}
+
+export default uploadInChunks;
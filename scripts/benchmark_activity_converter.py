@@ -0,0 +1,71 @@
+# scripts/benchmark_activity_converter.py
+#
+# Porównuje czas konwersji arkusza implementacją wektorową (process_sheet_data)
+# i wierszową (process_sheet_data_rowwise) na syntetycznym układzie stołów
+# oraz sprawdza, czy obie dają ten sam JSON.
+#
+# Użycie: python scripts/benchmark_activity_converter.py [--rows 100000] [--skip-rowwise]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.utils.activity_converter import NumpyEncoder, process_sheet_data, process_sheet_data_rowwise
+
+
+def synthetic_layout(rows, tables_per_row=20, seed=0):
+    """Układ farmy: zony po 500 rzędów, w każdym rzędzie tables_per_row stołów"""
+    rng = np.random.default_rng(seed)
+    table = np.arange(rows)
+    row_number = table // tables_per_row
+    return pd.DataFrame({
+        'Zona': row_number // 500 + 1,
+        'Rząd': row_number % 500 + 1,
+        'Numer stołu': table + 1,
+        'Ilość modułów': rng.choice([26.0, 28.0, np.nan], rows, p=[0.45, 0.45, 0.1]),
+        'Przedłużki': rng.integers(0, 4, rows),
+        'Belki główne': rng.integers(2, 4, rows),
+        'Stężenia ukośne': rng.choice([2.0, 4.0, np.nan], rows),
+        'Płatwie': np.full(rows, 8),
+        'Typ stołu': rng.choice(['2V13', '2V26'], rows),
+    })
+
+
+def measure(function, df):
+    start = time.perf_counter()
+    result = function(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark konwersji arkusza aktywności")
+    parser.add_argument('--rows', type=int, default=100000, help="Liczba wierszy (stołów) arkusza")
+    parser.add_argument('--skip-rowwise', action='store_true', help="Pomija wolną implementację wierszową")
+    args = parser.parse_args()
+
+    df = synthetic_layout(args.rows)
+    print(f"Wierszy: {len(df)}, grup (Zona, Rząd): {df.groupby(['Zona', 'Rząd']).ngroups}")
+
+    vectorized, vectorized_time = measure(process_sheet_data, df)
+    print(f"process_sheet_data:         {vectorized_time:8.2f} s")
+
+    if args.skip_rowwise:
+        return
+
+    rowwise, rowwise_time = measure(process_sheet_data_rowwise, df)
+    print(f"process_sheet_data_rowwise: {rowwise_time:8.2f} s  (x{rowwise_time / vectorized_time:.1f})")
+
+    same = json.dumps(vectorized, cls=NumpyEncoder) == json.dumps(rowwise, cls=NumpyEncoder)
+    print("Wynik zgodny" if same else "UWAGA: wyniki różnią się")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -125,6 +125,12 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 os.makedirs(STATIC_ROOT, exist_ok=True)
 os.makedirs(os.path.join(BASE_DIR, 'frontend/build/static'), exist_ok=True)
 
+# Konfiguracja Django REST Framework
+REST_FRAMEWORK = {
+    # Paginacja kursorowa (keyset) - włączana parametrem ?cursor= lub ?page_size=
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+}
+
 LOGIN_URL = '/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 
@@ -140,4 +146,13 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 REQUISITION_NOTIFICATION_EMAIL = os.getenv('REQUISITION_NOTIFICATION_EMAIL', '')
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Pomniejszone wersje zdjęć (api/utils/image_variants.py) - liczba wątków puli
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
+# Pliki tymczasowe przesyłania w częściach (api/utils/chunked_upload.py)
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, 'tmp', 'chunked_uploads')
+
+# Równoległe konwersje plików Excel z układem projektu (api/utils/config_import.py)
+ACTIVITY_IMPORT_WORKERS = int(os.getenv('ACTIVITY_IMPORT_WORKERS', 1))